@@ -21,6 +21,7 @@ from helix.progress.progress_calculator import ProgressCalculator, ComputeOn
 from helix.reference.repository import Repository
 from helix.mtDNA.mt_dna import MtDNA
 from helix.utility.samtools import Samtools
+from helix.utility.services import SERVICES
 
 logger = logging.getLogger(__name__)
 
@@ -36,9 +37,9 @@ class AlignmentMapFile:
         self,
         path: Path,
         ignore_meta: bool = False,
-        samtools=Samtools(),
-        repository: Repository = Repository(),
-        mtdna: MtDNA = MtDNA(),
+        samtools: Samtools = None,
+        repository: Repository = None,
+        mtdna: MtDNA = None,
         config=MANAGER_CFG.EXTERNAL,
     ) -> None:
         if isinstance(path, str):
@@ -51,9 +52,9 @@ class AlignmentMapFile:
         self.path: Path = path
         self._ignore_meta = ignore_meta
         self.meta_file: Path = self.path.with_suffix(".pickle")
-        self._repo = repository
-        self._samtools = samtools
-        self._mtdna = mtdna
+        self._repo = SERVICES.resolve(repository, Repository)
+        self._samtools = SERVICES.resolve(samtools, Samtools)
+        self._mtdna = SERVICES.resolve(mtdna, MtDNA)
         self._config = config
         self.header = self._load_header()
         self.file_info = self._initialize_file_info()
@@ -10,6 +10,7 @@ from helix.data.file_type import FileType
 from helix.data.read_type import ReadType
 from helix.utility.external import External
 from helix.utility.sequencers import Sequencers
+from helix.utility.services import SERVICES
 
 
 class AlignmentStatsCalculator:
@@ -17,14 +18,14 @@ class AlignmentStatsCalculator:
         self,
         path: AlignmentMapFileInfo,
         config=MANAGER_CFG.ALIGNMENT_STATS,
-        external: External = External(),
-        sequencers: Sequencers = Sequencers(),
+        external: External = None,
+        sequencers: Sequencers = None,
         logger=logging.getLogger(__name__),
     ) -> None:
         self.aligned_file = path
         self._config = config
-        self._external = external
-        self._sequencers = sequencers
+        self._external = SERVICES.resolve(external, External)
+        self._sequencers = SERVICES.resolve(sequencers, Sequencers)
         self._logger = logger
 
     def get_stats(self):
@@ -11,6 +11,7 @@ from helix.naming.converter import Converter
 from helix.progress.progress_calculator import ProgressCalculator, ComputeOn
 from helix.utility.external import External
 from helix.utility.regions import RegionType, Regions
+from helix.utility.services import SERVICES
 
 
 class CoverageStatsCalculator(Thread):
@@ -18,13 +19,13 @@ class CoverageStatsCalculator(Thread):
         self,
         file: AlignmentMapFile,
         region: RegionType = None,
-        external=External(),
-        regions=Regions(),
+        external: External = None,
+        regions: Regions = None,
         progress=None,
     ) -> None:
-        self._external = external
+        self._external = SERVICES.resolve(external, External)
         self._progress = progress
-        self._regions = regions
+        self._regions = SERVICES.resolve(regions, Regions)
         self._progress_calc = None
         self._file = file
         self._region = region
@@ -38,10 +39,14 @@ class CoverageStatsCalculator(Thread):
     def get_stats(self):
         options = ["depth"]
         if self._region is not None:
+            reference = self._file.file_info.reference_genome.ready_reference
+            # Runs of N can't be covered: leave them out.
+            gaps = reference.bed if reference.bed.exists() else None
             bed_path = self._regions.get_path(
-                self._file.file_info.reference_genome.ready_reference.build,
+                reference.build,
                 self._region,
                 self._file.header.sequences.values(),
+                gaps,
             )
             options.extend(["-b", str(bed_path)])
         else:
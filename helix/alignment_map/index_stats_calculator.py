@@ -4,6 +4,7 @@ from pathlib import Path
 from helix.data.sequence_type import SequenceType
 from helix.utility.external import External
 from helix.naming.converter import Converter
+from helix.utility.services import SERVICES
 
 
 class SequenceStatistics:
@@ -16,12 +17,12 @@ class SequenceStatistics:
 
 
 class IndexStatsCalculator:
-    def __init__(self, file: Path, external=External()) -> None:
+    def __init__(self, file: Path, external: External = None) -> None:
         if not file.exists():
             raise RuntimeError(f"Unable to find file {file.name}")
 
         self._file = file
-        self._external = external
+        self._external = SERVICES.resolve(external, External)
 
     def get_stats(self):
         stats: list[SequenceStatistics] = []
@@ -9,6 +9,8 @@ from helix.progress.progress_calculator import ProgressCalculator, ComputeOn
 from helix.alignment_map.alignment_map_file import AlignmentMapFile
 from helix.configuration import MANAGER_CFG, ExternalConfig, RepositoryConfig
 from helix.utility.external import External
+from helix.utility.regions import RegionType, Regions
+from helix.utility.services import SERVICES
 
 
 class VariantCallingType(enum.Enum):
@@ -32,7 +34,13 @@ class VariantCaller:
             Configuration for external tools. Defaults to MANAGER_CFG.EXTERNAL.
         external (External, optional):
             Object that contains functions to call external tools.
-            Defaults to External().
+            Defaults to the shared instance.
+        region (RegionType, optional):
+            Call only the variants in these regions, without the runs of N
+            of the reference. Defaults to None (everywhere).
+        regions (Regions, optional):
+            Builder of the .bed file of the regions. Defaults to the shared
+            instance.
         progress (Callable[[str, int], optional):
             Function that accept a status message and a percentage,
             for progress tracking. Defaults to None.
@@ -52,11 +60,15 @@ class VariantCaller:
         calling_type: VariantCallingType = VariantCallingType.Both,
         repo_config: RepositoryConfig = MANAGER_CFG.REPOSITORY,
         ext_config: ExternalConfig = MANAGER_CFG.EXTERNAL,
-        external: External = External(),
+        external: External = None,
+        region: RegionType = None,
+        regions: Regions = None,
         progress: Callable[[str, int], None] = None,
         logger: logging.Logger = logging.getLogger(__name__),
     ) -> None:
-        self._external = external
+        self._external = SERVICES.resolve(external, External)
+        self._region = region
+        self._regions = SERVICES.resolve(regions, Regions)
         self._ext_config = ext_config
         self._ploidy = str(repo_config.metadata.joinpath("ploidy.txt"))
         self._is_quitting = False
@@ -66,6 +78,9 @@ class VariantCaller:
         self._logger = logger
         self._input_file = input
         self._calling_type = calling_type
+        self.output_file = self._input_file.path.with_name(
+            f"{self._input_file.path.stem}_{self._calling_type.name}.vcf.gz"
+        )
 
         if self._input_file.file_info.index_stats is None:
             raise RuntimeError("Index stats cannot be None for variant calling")
@@ -92,16 +107,19 @@ class VariantCaller:
         elif self._calling_type == VariantCallingType.SNP:
             skip_variant_opt = "-V indels"
 
-        output_file = self._input_file.path.with_name(
-            f"{self._input_file.path.stem}_{self._calling_type.name}.vcf.gz"
-        )
+        output_file = self.output_file
+
+        regions_opt = ""
+        if self._region is not None:
+            genome = self._input_file.file_info.reference_genome.ready_reference
+            regions_opt = f'-R "{self._get_regions(genome)}"'
 
         pileup_opt = (
-            f"mpileup -B -I -C 50 --threads {self._ext_config.threads}"
-            f'-f "{reference}" -Ou "{input_file}"'
+            f"mpileup -B -I -C 50 --threads {self._ext_config.threads} "
+            f'-f "{reference}" {regions_opt} -Ou "{input_file}"'
         )
         call_opt = (
-            f'call --ploidy-file "{self._ploidy}" {skip_variant_opt} -mv'
+            f'call --ploidy-file "{self._ploidy}" {skip_variant_opt} -mv '
             f'-P 0 --threads {self._ext_config.threads} -Oz -o "{output_file}"'
         )
         tabix_opt = f'-p vcf "{output_file}"'
@@ -147,6 +165,17 @@ class VariantCaller:
         self._current_operation.wait()
         self._quitting_ack = True
 
+    def _get_regions(self, genome) -> str:
+        gaps = genome.bed if genome.bed.exists() else None
+        return str(
+            self._regions.get_path(
+                genome.build,
+                self._region,
+                self._input_file.header.sequences.values(),
+                gaps,
+            )
+        )
+
     def kill(self):
         """Kill a variant calling operation."""
         self._is_quitting = True
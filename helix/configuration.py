@@ -6,7 +6,6 @@ import sys
 
 from helix import metadata, mtDNA
 
-
 if sys.platform == "win32":
     from helix import third_party
 else:
@@ -90,6 +89,24 @@ class RepositoryConfig:
         temporary (Path): Temporary files directory.
         metadata (Path): Root folder for metadata.
         mtdna (Path): Root folder for mtDNA files.
+        download_connections (int): Maximum number of concurrent connections
+            used to download a single file. 1 disables segmented downloads.
+        url_cache_ttl (int): Seconds after which the cached size of a remote
+            file expires.
+        ingestion_downloads (int): Genomes downloaded at the same time when
+            ingesting in batch.
+        ingestion_compressions (int): Genomes compressed to BGZip at the same
+            time when ingesting in batch (each one uses multiple threads).
+        ingestion_indexings (int): Genomes whose companion files (.dict, .gzi)
+            are created at the same time when ingesting in batch.
+        shared_store (str): Folder of a genome store shared between users (see
+            GenomeStore). Empty to disable it.
+        shared_store_links (str): How genomes in the shared store are linked
+            into the repository: "hard" or "symbolic".
+        regions_cache_files (int): Maximum number of .bed files built from
+            templates kept in the temporary folder (see Regions).
+        remote_cache_blocks (int): Maximum number of BGZF blocks of a remote
+            reference kept in the temporary folder (see RemoteReference).
     """
 
     def __init__(self) -> None:
@@ -98,6 +115,15 @@ class RepositoryConfig:
         self.log_path: Path = Path(HelixDefaults.LOCAL_FOLDER, "logs")
         self.metadata: Path = Path(metadata.__file__).parent
         self.mtdna: Path = Path(mtDNA.__file__).parent
+        self.download_connections: int = 4
+        self.url_cache_ttl: int = 24 * 60 * 60
+        self.ingestion_downloads: int = 2
+        self.ingestion_compressions: int = 1
+        self.ingestion_indexings: int = 1
+        self.shared_store: str = ""
+        self.shared_store_links: str = "hard"
+        self.regions_cache_files: int = 32
+        self.remote_cache_blocks: int = 4096
 
 
 class AlignmentStatsConfig:
@@ -1,8 +1,10 @@
 import webbrowser
 from helix.alignment_map.alignment_map_file import AlignmentMapFile
-from helix.alignment_map.variant_caller import VariantCaller
+from helix.alignment_map.variant_caller import VariantCaller, VariantCallingType
 from helix.data.extract_target_format import ExtractTargetFormat
 from helix.data.file_type import FileType
+from helix.data.microarray_converter import MicroarrayConverterTarget
+from helix.microarray.microarray_generator import MicroarrayGenerator
 from helix.progress.worker import Worker
 from helix.renderers.html_aligned_file_report import HTMLAlignedFileReport
 
@@ -74,7 +76,21 @@ class Converter:
         webbrowser.open(target)
 
     def _to_microarray(self):
-        pass
+        if self.current_file is None:
+            return
+
+        # Microarrays have no InDels.
+        caller = VariantCaller(
+            self.current_file, VariantCallingType.SNP, progress=self._progress
+        )
+        generator = MicroarrayGenerator(
+            caller.output_file,
+            self.current_file.file_info.reference_genome,
+            caller=caller,
+            progress=self._progress,
+        )
+        targets = [MicroarrayConverterTarget[x] for x in dict.fromkeys(self.options)]
+        self._worker = Worker(generator, generator.do, targets)
 
     def _to_vcf(self):
         if self.current_file is None:
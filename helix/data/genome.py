@@ -5,6 +5,11 @@ from pathlib import Path
 from helix.data.build import Build
 from helix.data.sequence import Sequence
 
+# Name, length and MD5 of the sequences of a genome.
+SequenceKeys = typing.Optional[
+    typing.List[typing.Tuple[str, int, typing.Optional[str]]]
+]
+
 
 class Genome:
     def __init__(
@@ -23,6 +28,9 @@ class Genome:
         downloaded_md5: str = None,
         decompressed_md5: str = None,
         bgzip_md5: str = None,
+        downloaded_sha256: str = None,
+        decompressed_sha256: str = None,
+        bgzip_sha256: str = None,
         mitochondrial_model=None,
         parent_folder=Path("."),
     ) -> None:
@@ -32,6 +40,7 @@ class Genome:
         self.suffix = suffix
         self.build = build
         self.source = source
+        # See set_sequence_loader()
         self.sequences = sequences
         self.description = description
         self.download_size = download_size
@@ -40,12 +49,49 @@ class Genome:
         self.downloaded_md5 = downloaded_md5
         self.decompressed_md5 = decompressed_md5
         self.bgzip_md5 = bgzip_md5
+        self.downloaded_sha256 = downloaded_sha256
+        self.decompressed_sha256 = decompressed_sha256
+        self.bgzip_sha256 = bgzip_sha256
         self.mitochondrial_model = mitochondrial_model
         # Not serialized as it depends on the config
         self.__parent_folder = parent_folder
         # Not serialized as it's populated at runtime
         self.__parent: Build = None
 
+    @property
+    def sequences(self) -> typing.Optional[typing.List[Sequence]]:
+        if self.__sequence_loader is not None:
+            keys = self.__sequence_loader()
+            self.sequences = None
+            if keys is not None:
+                self.sequences = [Sequence(*x, parent=self) for x in keys]
+        return self.__sequences
+
+    @sequences.setter
+    def sequences(self, value: typing.Optional[typing.List[Sequence]]):
+        self.__sequences = value
+        self.__sequence_loader = None
+
+    def set_sequence_loader(self, loader: typing.Callable[[], SequenceKeys]):
+        """Read the sequences only when they are accessed for the first time
+        (i.e., from the compiled catalog of the genomes).
+
+        Args:
+            loader (Callable[[], SequenceKeys]): Returns the name, length and
+                MD5 of every sequence, or None if they are unknown.
+        """
+        self.__sequences = None
+        self.__sequence_loader = loader
+
+    def get_sequence_keys(self) -> SequenceKeys:
+        """Name, length and MD5 of every sequence, without creating the
+        sequences if they have not been read yet. None if they are unknown."""
+        if self.__sequence_loader is not None:
+            return self.__sequence_loader()
+        if self.__sequences is None:
+            return None
+        return [(x.name, x.length, x.md5) for x in self.__sequences]
+
     @property
     def parent_folder(self):
         return self.__parent_folder
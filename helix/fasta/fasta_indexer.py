@@ -0,0 +1,155 @@
+from pathlib import Path
+
+
+class FASTAIndexEntry:
+    def __init__(self, name: str, offset: int) -> None:
+        self.name = name
+        self.length = 0
+        self.offset = offset
+        self.line_bases = None
+        self.line_width = None
+
+    def get_offset(self, position: int) -> int:
+        """Offset in the uncompressed FASTA file of a base of the sequence.
+
+        Args:
+            position (int): 0-based position of the base in the sequence.
+
+        Returns:
+            int: Offset of the base, accounting for line terminators.
+        """
+        lines, column = divmod(position, self.line_bases)
+        return self.offset + lines * self.line_width + column
+
+    @staticmethod
+    def parse(line: str) -> "FASTAIndexEntry":
+        name, length, offset, line_bases, line_width = line.rstrip("\r\n").split("\t")
+        entry = FASTAIndexEntry(name, int(offset))
+        entry.length = int(length)
+        entry.line_bases = int(line_bases)
+        entry.line_width = int(line_width)
+        return entry
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}\t{self.length}\t{self.offset}\t"
+            f"{self.line_bases}\t{self.line_width}\n"
+        )
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class FASTAIndexer:
+    """Build a FASTA index (.fai) incrementally from a stream of bytes.
+
+    The content of the FASTA file is supplied in chunks of arbitrary size
+    through `update()`, so the index can be built while the file is being
+    written (i.e., while compressing it) without reading it again.
+    Offsets are relative to the uncompressed content, which is what
+    samtools expects for both plain and BGZF-compressed FASTA files.
+
+    Examples:
+        >>> indexer = FASTAIndexer()
+        >>> indexer.update(b">chr1\\nACGT\\nAC")
+        >>> indexer.update(b"GT\\n")
+        >>> indexer.save(Path("genome.fa.gz.fai"))
+    """
+
+    def __init__(self) -> None:
+        self.entries: list[FASTAIndexEntry] = []
+        self._current: FASTAIndexEntry = None
+        self._header: bytearray = None
+        self._first_line = 0
+        self._first_line_bases = 0
+        self._offset = 0
+        self._at_line_start = True
+
+    def update(self, data: bytes):
+        position = 0
+        size = len(data)
+        while position < size:
+            if self._header is not None:
+                end = data.find(b"\n", position)
+                if end == -1:
+                    self._header += data[position:]
+                    self._offset += size - position
+                    return
+                self._header += data[position:end]
+                self._offset += end + 1 - position
+                position = end + 1
+                self._start_sequence()
+                continue
+
+            if self._at_line_start and data[position] == ord(">"):
+                self._finish_sequence()
+                self._header = bytearray()
+                self._offset += 1
+                position += 1
+                continue
+
+            # Everything up to the next header is sequence data.
+            next_header = data.find(b"\n>", position)
+            end = size if next_header == -1 else next_header + 1
+            self._consume(data[position:end])
+            self._offset += end - position
+            self._at_line_start = data[end - 1] == ord("\n")
+            position = end
+
+    def finish(self) -> list[FASTAIndexEntry]:
+        self._finish_sequence()
+        return self.entries
+
+    def save(self, path: Path):
+        self.finish()
+        with path.open("wt", newline="\n") as f:
+            f.writelines(str(x) for x in self.entries)
+
+    @staticmethod
+    def load(path: Path) -> dict[str, FASTAIndexEntry]:
+        """Load a FASTA index (.fai).
+
+        Args:
+            path (Path): Index to load.
+
+        Returns:
+            dict[str, FASTAIndexEntry]: Entries by sequence name, in file order.
+        """
+        with path.open("rt") as f:
+            entries = [FASTAIndexEntry.parse(x) for x in f if x.strip() != ""]
+        return {x.name: x for x in entries}
+
+    def _start_sequence(self):
+        name = bytes(self._header).decode("utf8").strip().split()[0]
+        self._header = None
+        self._first_line = 0
+        self._first_line_bases = 0
+        self._at_line_start = True
+        self._current = FASTAIndexEntry(name, self._offset)
+
+    def _finish_sequence(self):
+        if self._current is None:
+            return
+        if self._current.line_bases is None:
+            # Single line sequence, without a trailing new line.
+            self._current.line_bases = self._first_line_bases
+            self._current.line_width = self._first_line + 1
+        self.entries.append(self._current)
+        self._current = None
+
+    def _consume(self, segment: bytes):
+        if self._current is None:
+            # Data before the first header, nothing to index.
+            return
+        carriage_returns = segment.count(b"\r")
+        self._current.length += len(segment) - segment.count(b"\n") - carriage_returns
+        if self._current.line_bases is not None:
+            return
+        end = segment.find(b"\n")
+        line = segment if end == -1 else segment[:end]
+        self._first_line += len(line)
+        self._first_line_bases += len(line) - line.count(b"\r")
+        if end == -1:
+            return
+        self._current.line_width = self._first_line + 1
+        self._current.line_bases = self._first_line_bases
@@ -3,12 +3,13 @@ from math import sqrt
 from pathlib import Path
 
 from helix.utility.sequencers import Sequencers
+from helix.utility.services import SERVICES
 
 
 class FASTQFile:
-    def __init__(self, path: Path, sequencers: Sequencers = Sequencers()) -> None:
+    def __init__(self, path: Path, sequencers: Sequencers = None) -> None:
         self.path = path
-        self._sequencers = sequencers
+        self._sequencers = SERVICES.resolve(sequencers, Sequencers)
 
     def process_FASTQ(self, paired=True):
         line_count = 0
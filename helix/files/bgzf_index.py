@@ -0,0 +1,102 @@
+import bisect
+import struct
+import zlib
+from pathlib import Path
+
+# A BGZF block is never bigger than 64KB, header and footer included.
+BGZF_MAX_BLOCK_SIZE = 0x10000
+
+
+def get_block_size(data: bytes, offset: int = 0) -> int:
+    """Read the total size of the BGZF block starting at `offset`.
+
+    Args:
+        data (bytes): Buffer containing at least the header of the block.
+        offset (int, optional): Start of the block in the buffer.
+
+    Raises:
+        RuntimeError: The data is not a BGZF block.
+
+    Returns:
+        int: Size of the block, header and footer included.
+    """
+    magic_end = offset + 4
+    if data[offset:magic_end] != b"\x1f\x8b\x08\x04":
+        raise RuntimeError(f"Invalid BGZF block at offset {offset}")
+    (extra_length,) = struct.unpack_from("<H", data, offset + 10)
+    position = offset + 12
+    while position < offset + 12 + extra_length:
+        identifier_end = position + 2
+        identifier = data[position:identifier_end]
+        (length,) = struct.unpack_from("<H", data, position + 2)
+        if identifier == b"BC":
+            (size,) = struct.unpack_from("<H", data, position + 4)
+            return size + 1
+        position += 4 + length
+    raise RuntimeError(f"Missing BSIZE in BGZF block at offset {offset}")
+
+
+def inflate_block(block: bytes) -> bytes:
+    """Decompress a single BGZF block, checking its CRC.
+
+    Args:
+        block (bytes): The whole block, header and footer included.
+
+    Raises:
+        RuntimeError: The block is corrupted.
+
+    Returns:
+        bytes: Uncompressed content of the block.
+    """
+    (extra_length,) = struct.unpack_from("<H", block, 10)
+    crc, size = struct.unpack_from("<II", block, len(block) - 8)
+    data_start, data_end = 12 + extra_length, len(block) - 8
+    data = zlib.decompress(block[data_start:data_end], -15)
+    if len(data) != size or zlib.crc32(data) != crc:
+        raise RuntimeError("Corrupted BGZF block")
+    return data
+
+
+class BGZFIndex:
+    """Map offsets of the uncompressed data to the blocks of a BGZF file.
+
+    Args:
+        boundaries (list[tuple[int, int]]): (compressed, uncompressed) offset
+            of every block except the first one, as stored in a .gzi file.
+    """
+
+    def __init__(self, boundaries: list[tuple[int, int]]) -> None:
+        boundaries = [(0, 0), *boundaries]
+        self.compressed = [x[0] for x in boundaries]
+        self.uncompressed = [x[1] for x in boundaries]
+
+    @staticmethod
+    def load(path: Path) -> "BGZFIndex":
+        with path.open("rb") as f:
+            return BGZFIndex.parse(f.read())
+
+    @staticmethod
+    def parse(data: bytes) -> "BGZFIndex":
+        (count,) = struct.unpack_from("<Q", data)
+        return BGZFIndex(
+            [struct.unpack_from("<QQ", data, 8 + 16 * x) for x in range(count)]
+        )
+
+    def locate(self, offset: int) -> int:
+        """Index of the block containing an uncompressed offset."""
+        return bisect.bisect_right(self.uncompressed, offset) - 1
+
+    def get_blocks(self, start: int, end: int) -> range:
+        """Blocks covering the uncompressed range [start, end)."""
+        return range(self.locate(start), self.locate(max(start, end - 1)) + 1)
+
+    def get_compressed_range(self, block: int) -> tuple[int, int]:
+        """Compressed range [start, end) of a block.
+
+        The end of the last indexed block is not known: the maximum block size
+        is assumed and the real size must be read from the block header.
+        """
+        start = self.compressed[block]
+        if block + 1 < len(self.compressed):
+            return start, self.compressed[block + 1]
+        return start, start + BGZF_MAX_BLOCK_SIZE
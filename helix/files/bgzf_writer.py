@@ -0,0 +1,170 @@
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO
+
+from helix.fasta.fasta_indexer import FASTAIndexer
+from helix.files.hashing_tee import HashingTee
+
+# Same uncompressed block size used by htslib: it guarantees that the
+# compressed block (header + deflated data + footer) always fits in 64KB.
+BGZF_BLOCK_SIZE = 0xFF00
+
+# Empty block that marks the end of a BGZF file.
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+def compress_block(data: bytes, level: int = zlib.Z_DEFAULT_COMPRESSION) -> bytes:
+    """Compress a chunk of data into a single BGZF block.
+
+    Args:
+        data (bytes): Uncompressed data, at most BGZF_BLOCK_SIZE bytes long.
+        level (int, optional): zlib compression level.
+
+    Returns:
+        bytes: The BGZF block.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    deflated = compressor.compress(data) + compressor.flush()
+    # BSIZE is the total block size minus 1: 18 bytes of header,
+    # the deflated data and 8 bytes of footer.
+    header = struct.pack(
+        "<4BI2BH2BHH", 31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, len(deflated) + 25
+    )
+    footer = struct.pack("<II", zlib.crc32(data), len(data))
+    return header + deflated + footer
+
+
+class BGZFWriter:
+    """Write a BGZF file compressing the blocks on multiple threads.
+
+    Data written to this object is split in blocks that are compressed
+    concurrently (zlib releases the GIL) and written to disk in order.
+    While writing, the object also collects everything that would otherwise
+    require another pass on the file: the BGZF index (.gzi), the FASTA index
+    (.fai), the size and the hashes of both the uncompressed and the compressed
+    data.
+
+    Args:
+        output (Path): Path of the BGZF file to write.
+        threads (int, optional): Number of compression threads. Defaults to 1.
+        gzi (Path, optional): Where to save the BGZF index. Defaults to None.
+        fai (Path, optional): Where to save the FASTA index. Defaults to None.
+        level (int, optional): zlib compression level.
+        sha256 (bool, optional): Compute also the SHA-256. Defaults to False.
+
+    Examples:
+        >>> with BGZFWriter(Path("genome.fa.gz"), 4, gzi=Path("genome.fa.gz.gzi")) as w:
+        >>>     shutil.copyfileobj(source, w)
+        >>> w.uncompressed_md5
+    """
+
+    def __init__(
+        self,
+        output: Path,
+        threads: int = 1,
+        gzi: Path = None,
+        fai: Path = None,
+        level: int = zlib.Z_DEFAULT_COMPRESSION,
+        sha256: bool = False,
+    ) -> None:
+        self._output = output
+        self._gzi = gzi
+        self._fai = fai
+        self._level = level
+        self._threads = max(1, int(threads))
+        self._executor = ThreadPoolExecutor(self._threads)
+        self._pending: deque[tuple[Future, int]] = deque()
+        self._buffer = bytearray()
+        self._closed = False
+        self._uncompressed = HashingTee(sha256=sha256)
+        self._indexer = FASTAIndexer() if fai is not None else None
+        # (compressed offset, uncompressed offset) for each block boundary
+        self.blocks: list[tuple[int, int]] = []
+        self.compressed_size = 0
+        self.uncompressed_size = 0
+        self.uncompressed_md5: str = None
+        self.compressed_md5: str = None
+        self.uncompressed_sha256: str = None
+        self.compressed_sha256: str = None
+        self._file: BinaryIO = HashingTee(self._output.open("wb"), sha256)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, _1, _2):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def writable(self):
+        return True
+
+    def write(self, data: bytes) -> int:
+        if self._closed:
+            raise ValueError(f"Writing to closed BGZF file {self._output!s}")
+        self._uncompressed.write(data)
+        if self._indexer is not None:
+            self._indexer.update(data)
+        self._buffer += data
+        while len(self._buffer) >= BGZF_BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:BGZF_BLOCK_SIZE]))
+            del self._buffer[:BGZF_BLOCK_SIZE]
+        return len(data)
+
+    def close(self):
+        if self._closed:
+            return
+        if len(self._buffer) > 0:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        self._drain(0)
+        self._executor.shutdown()
+        self._write(BGZF_EOF, 0)
+        self._file.close()
+        self._closed = True
+
+        self.uncompressed_md5 = self._uncompressed.md5
+        self.compressed_md5 = self._file.md5
+        self.uncompressed_sha256 = self._uncompressed.sha256
+        self.compressed_sha256 = self._file.sha256
+        if self._gzi is not None:
+            self.save_gzi(self._gzi)
+        if self._indexer is not None:
+            self._indexer.save(self._fai)
+
+    def abort(self):
+        """Stop writing and remove the incomplete output."""
+        self._closed = True
+        self._executor.shutdown(cancel_futures=True)
+        self._file.close()
+        if self._output.exists():
+            self._output.unlink()
+
+    def save_gzi(self, path: Path):
+        # Same layout of `bgzip -i`: number of entries followed by the
+        # offsets of every block except the first one, all little-endian uint64.
+        with path.open("wb") as f:
+            f.write(struct.pack("<Q", len(self.blocks)))
+            for compressed, uncompressed in self.blocks:
+                f.write(struct.pack("<QQ", compressed, uncompressed))
+
+    def _submit(self, data: bytes):
+        future = self._executor.submit(compress_block, data, self._level)
+        self._pending.append((future, len(data)))
+        # Bound the amount of blocks kept in memory.
+        self._drain(self._threads * 4)
+
+    def _drain(self, keep: int):
+        while len(self._pending) > keep:
+            future, size = self._pending.popleft()
+            self._write(future.result(), size)
+            self.blocks.append((self.compressed_size, self.uncompressed_size))
+
+    def _write(self, block: bytes, size: int):
+        self._file.write(block)
+        self.compressed_size += len(block)
+        self.uncompressed_size += size
@@ -1,10 +1,13 @@
 import enum
+import typing
 from pathlib import Path
 
 from helix.configuration import MANAGER_CFG
+from helix.files.bgzf_writer import BGZFWriter
 from helix.reference.genome_metadata_loader import Genome
 from helix.utility.external import External
 from helix.files.file_type_checker import FileType, FileTypeChecker
+from helix.utility.services import SERVICES
 
 
 class BgzipAction(enum.Enum):
@@ -16,12 +19,14 @@ class BgzipAction(enum.Enum):
 class BGzip:
     def __init__(
         self,
-        external: External = External(),
-        file_type_checker=FileTypeChecker(),
+        external: External = None,
+        file_type_checker: FileTypeChecker = None,
         config=MANAGER_CFG.EXTERNAL,
+        sha256: bool = False,
     ) -> None:
-        self._type_checker = file_type_checker
-        self._external = external
+        self._type_checker = SERVICES.resolve(file_type_checker, FileTypeChecker)
+        self._sha256 = sha256
+        self._external = SERVICES.resolve(external, External)
         self._config = config
 
     def perform(
@@ -41,6 +46,41 @@ class BGzip:
             return self.bgzip_wrapper(file, genome.fasta)
         raise RuntimeError("Trying to compress a file that is not decompressed")
 
+    def compress_stream(
+        self,
+        genome: Genome,
+        stream: typing.BinaryIO,
+        chunk_size: int = 4 * 1024 * 1024,
+    ) -> BGZFWriter:
+        """Compress a stream of decompressed FASTA data to BGZF.
+
+        The compression is done in-process on multiple threads. The BGZF index
+        (.gzi) and the FASTA index (.fai) are generated at the same time, so
+        the output never needs to be read again.
+
+        Args:
+            genome (Genome): Genome to compress. Output files are the ones
+                specified by genome.fasta, genome.gzi and genome.fai.
+            stream (typing.BinaryIO): Decompressed FASTA content.
+            chunk_size (int, optional): Bytes read at a time from the stream.
+
+        Returns:
+            BGZFWriter: The closed writer, with sizes and hashes of the
+                compressed and uncompressed content.
+        """
+        if genome.fasta.exists():
+            genome.fasta.unlink()
+        with BGZFWriter(
+            genome.fasta,
+            self._config.threads,
+            gzi=genome.gzi,
+            fai=genome.fai,
+            sha256=self._sha256,
+        ) as writer:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                writer.write(chunk)
+        return writer
+
     def _gzip_filename(self, input: Path, action: BgzipAction):
         if action == BgzipAction.Compress:
             return Path(str(input) + ".gz")
@@ -1,26 +1,209 @@
-import gzip
-import hashlib
+import bz2
+import io
 import logging
 import shutil
+import subprocess
 import typing
 import zipfile
+import zlib
 from pathlib import Path
 
-from helix.files.gzip import GZip, GZipAction
+from helix.files.hashing_tee import HashingTee
 from helix.reference.genome_metadata_loader import Genome
 from helix.files.file_type_checker import FileType, FileTypeChecker
+from helix.utility.external import which
+from helix.utility.services import SERVICES
+
+# Functions opening a stream of the content of a 7z archive, in order of
+# preference. A backend returns None if it's not available.
+SEVENZIP_BACKENDS: typing.List[
+    typing.Callable[[Path], typing.Optional[typing.BinaryIO]]
+] = []
+
+
+def sevenzip_backend(f):
+    SEVENZIP_BACKENDS.append(f)
+    return f
+
+
+class GZipStreamReader(io.RawIOBase):
+    """Decompress a gzip file while it's being read.
+
+    Concatenated gzip members are decompressed one after the other. Anything
+    that follows the last member and that is not a gzip member (i.e., the
+    index at the end of a RAZF file) is ignored instead of raising an error.
+
+    Args:
+        file (typing.BinaryIO): Compressed input.
+        chunk_size (int, optional): Bytes read at a time from the input, and
+            most bytes decompressed at a time (runs of N compress so well that
+            a chunk could otherwise inflate to hundreds of MB).
+    """
+
+    def __init__(self, file: typing.BinaryIO, chunk_size=1024 * 1024) -> None:
+        super().__init__()
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decompressor = zlib.decompressobj(31)
+        self._buffer = b""
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._buffer) == 0 and not self._eof:
+            self._buffer = self._inflate()
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def _inflate(self) -> bytes:
+        if self._decompressor.eof:
+            unused = self._decompressor.unused_data
+            if len(unused) < 2:
+                unused += self._file.read(self._chunk_size)
+            if not unused.startswith(b"\x1f\x8b"):
+                # End of the stream or trailing garbage.
+                self._eof = True
+                return b""
+            self._decompressor = zlib.decompressobj(31)
+            return self._decompressor.decompress(unused, self._chunk_size)
+
+        # Input left over when the last call hit the size limit.
+        tail = self._decompressor.unconsumed_tail
+        if len(tail) > 0:
+            return self._decompressor.decompress(tail, self._chunk_size)
+
+        chunk = self._file.read(self._chunk_size)
+        if len(chunk) == 0:
+            # Output held back by the size limit.
+            pending = self._decompressor.decompress(b"", self._chunk_size)
+            if len(pending) > 0 or self._decompressor.eof:
+                return pending
+            raise EOFError("Compressed file ended before the end of the stream")
+        return self._decompressor.decompress(chunk, self._chunk_size)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class ProcessStreamReader(io.RawIOBase):
+    """Read the standard output of a process.
+
+    Args:
+        args (list[str]): Command line of the process.
+
+    Raises:
+        RuntimeError: When closed, if the process failed.
+    """
+
+    def __init__(self, args: typing.List[str]) -> None:
+        super().__init__()
+        self._args = args
+        self._process = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._process.stdout.readinto(buffer)
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self._process.stdout.close()
+        err = self._process.stderr.read()
+        self._process.stderr.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(
+                f"Error calling {self._args[0]}: {err.decode(errors='replace')}"
+            )
+
+
+def _single_member(archive: Path, names: typing.List[str]) -> str:
+    if len(names) != 1:
+        raise RuntimeError(
+            f"Error decompressing {archive!s}: archive contains more than 1 file"
+        )
+    return names[0]
+
+
+def _sevenzip_names(binary: str, archive: Path) -> typing.List[str]:
+    # Technical listing (-slt): a "Path = " line for every member after the
+    # "----------" separator, folders have "Folder = +".
+    listing = subprocess.run(
+        [binary, "l", "-slt", str(archive)], capture_output=True, text=True
+    )
+    if listing.returncode != 0:
+        raise RuntimeError(f"Error calling {binary}: {listing.stderr}")
+    members = listing.stdout.partition("\n----------\n")[2]
+    names = []
+    for member in members.split("\n\n"):
+        fields = dict(x.partition(" = ")[0::2] for x in member.splitlines())
+        if "Path" in fields and fields.get("Folder") != "+":
+            names.append(fields["Path"])
+    return names
+
+
+@sevenzip_backend
+def _sevenzip_binary(archive: Path) -> typing.Optional[typing.BinaryIO]:
+    # 7-Zip writes the content of the archive to stdout (-so) without
+    # creating any file.
+    for name in ["7z", "7za", "7zr"]:
+        binary = which(name)
+        if binary is not None:
+            member = _single_member(archive, _sevenzip_names(binary, archive))
+            return ProcessStreamReader(
+                [binary, "e", "-so", "-bd", str(archive), member]
+            )
+    return None
+
+
+@sevenzip_backend
+def _sevenzip_py7zr(archive: Path) -> typing.Optional[typing.BinaryIO]:
+    try:
+        import py7zr
+    except ImportError:
+        return None
+
+    # py7zr can't stream: extract the only member next to the archive and
+    # delete it once it has been read.
+    folder = archive.with_name(archive.name + ".extracted")
+    with py7zr.SevenZipFile(archive, "r") as f:
+        name = _single_member(archive, f.getnames())
+        f.extract(folder, targets=[name])
+    extracted = folder.joinpath(name)
+    stream = extracted.open("rb")
+    close = stream.close
+
+    def close_and_delete():
+        close()
+        shutil.rmtree(folder, ignore_errors=True)
+
+    stream.close = close_and_delete
+    return stream
 
 
 class Decompressor:
     def __init__(
         self,
-        type_checker: FileTypeChecker = FileTypeChecker(),
-        gzip_compressor=GZip(),
+        type_checker: FileTypeChecker = None,
+        sha256: bool = False,
     ) -> None:
-        self._gzip_compressor = gzip_compressor
-        self._type_checker = type_checker
+        self._type_checker = SERVICES.resolve(type_checker, FileTypeChecker)
+        self._sha256 = sha256
 
-        self._handlers: typing.Dict[FileType, typing.Callable[[Path, Path], None]] = {
+        # Handlers return the hashes of the output when they can compute them
+        # while writing it, None otherwise.
+        self._handlers: typing.Dict[
+            FileType, typing.Callable[[Path, Path], typing.Optional[HashingTee]]
+        ] = {
             FileType.GZIP: Decompressor.razf_gzip,
             FileType.RAZF_GZIP: Decompressor.razf_gzip,
             FileType.ZIP: Decompressor.zip,
@@ -38,17 +221,12 @@ class Decompressor:
                 output_file.unlink()
             input_file.rename(output_file)
 
-    def gz(self, input_file: Path, output_file: Path):
-        # Not reliable with RAZF and currently not used.
-        with gzip.open(str(input_file), "rb") as f_in:
-            with open(output_file, "wb") as f_out:
-                shutil.copyfileobj(f_in, f_out)
-
     def sevenzip(self, input_file: Path, output_file: Path):
-        raise NotImplementedError()
+        return self._copy(self.open_sevenzip(input_file), output_file)
 
     def bzip(self, input_file: Path, output_file: Path):
-        raise NotImplementedError()
+        # BZ2File also handles files made of multiple streams (i.e., pbzip2).
+        return self._copy(bz2.open(input_file, "rb"), output_file)
 
     def zip(self, input_file: Path, output_file: Path):
         with zipfile.ZipFile(str(input_file), "r") as f:
@@ -57,22 +235,106 @@ class Decompressor:
                 raise RuntimeError(
                     f"Error decompressing {input_file!s}: zip contains more than 1 file"
                 )
-            extracted = Path(f.extract(files[0], output_file.parent))
-            if extracted != output_file:
-                extracted.rename(output_file)
+            return self._copy(f.open(files[0], "r"), output_file)
 
     def razf_gzip(self, input_file: Path, output_file: Path):
-        self._gzip_compressor.gzip(input_file, output_file, GZipAction.Decompress)
-
-    def calculate_md5_hash(self, filename: Path, chunk_size=4096):
-        md5_hash = hashlib.md5()
-        with filename.open("rb") as f:
-            while True:
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                md5_hash.update(chunk)
-        return md5_hash.hexdigest()
+        return self._copy(GZipStreamReader(input_file.open("rb")), output_file)
+
+    def open_sevenzip(self, input_file: Path) -> typing.BinaryIO:
+        """Open a stream of the content of a 7z archive with the first available
+        backend in SEVENZIP_BACKENDS.
+
+        Raises:
+            RuntimeError: No backend is available.
+        """
+        for backend in SEVENZIP_BACKENDS:
+            stream = backend(input_file)
+            if stream is not None:
+                return stream
+        raise RuntimeError(
+            f"Error decompressing {input_file!s}: 7z archives need 7-Zip or py7zr"
+        )
+
+    def _copy(self, stream: typing.BinaryIO, output_file: Path) -> HashingTee:
+        with stream as f_in:
+            with HashingTee(output_file.open("wb"), self._sha256) as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        return f_out
+
+    def stream(self, genome: Genome, downloaded: Path) -> typing.BinaryIO:
+        """Open a downloaded file and return a stream of its decompressed content.
+
+        Args:
+            genome (Genome): Genome the file belongs to.
+            downloaded (Path): Downloaded file.
+
+        Raises:
+            FileNotFoundError: The downloaded file does not exist.
+            RuntimeError: The compression format is not supported for streaming.
+
+        Returns:
+            typing.BinaryIO: A readable binary stream.
+        """
+        if not downloaded.exists():
+            raise FileNotFoundError(
+                f"Error decompressing {str(genome)}: "
+                f"unable to find input file {downloaded!s}"
+            )
+        type = self._type_checker.get_type(downloaded)
+        logging.debug(f"Streaming {downloaded!s}. {type} compression detected.")
+        if type in [FileType.GZIP, FileType.RAZF_GZIP, FileType.BGZIP]:
+            # BGZF is a valid multi-member gzip.
+            return GZipStreamReader(downloaded.open("rb"))
+        elif type == FileType.BZIP:
+            return bz2.open(downloaded, "rb")
+        elif type == FileType.SEVENZIP:
+            return self.open_sevenzip(downloaded)
+        elif type == FileType.ZIP:
+            archive = zipfile.ZipFile(str(downloaded), "r")
+            files = archive.namelist()
+            if len(files) > 1:
+                archive.close()
+                raise RuntimeError(
+                    f"Error decompressing {downloaded!s}: zip contains more than 1 file"
+                )
+            return archive.open(files[0], "r")
+        elif type == FileType.DECOMPRESSED:
+            return downloaded.open("rb")
+        raise RuntimeError(
+            f"Error decompressing {str(genome)}: unsupported type {type}"
+        )
+
+    def verify(self, genome: Genome, size: int, md5: str, sha256: str = None):
+        """Check (or assign, if unknown) size and hashes of the decompressed content.
+
+        Args:
+            genome (Genome): Genome to check.
+            size (int): Size of the decompressed content.
+            md5 (str): MD5 of the decompressed content.
+            sha256 (str, optional): SHA-256 of the decompressed content.
+
+        Raises:
+            RuntimeError: Size or hashes don't match the ones in the genome.
+        """
+        if genome.decompressed_size is None:
+            genome.decompressed_size = size
+        elif genome.decompressed_size != size:
+            raise RuntimeError(f"Error decompressing {str(genome)}: size mismatch")
+
+        if genome.decompressed_md5 is None:
+            genome.decompressed_md5 = md5
+        elif genome.decompressed_md5 != md5:
+            raise RuntimeError(f"Error decompressing {str(genome)}: MD5 mismatch")
+
+        if sha256 is None:
+            return
+        if genome.decompressed_sha256 is None:
+            genome.decompressed_sha256 = sha256
+        elif genome.decompressed_sha256 != sha256:
+            raise RuntimeError(f"Error decompressing {str(genome)}: SHA-256 mismatch")
+
+    def calculate_md5_hash(self, filename: Path, chunk_size=1024 * 1024):
+        return HashingTee().hash_file(filename, chunk_size).md5
 
     def perform(self, genome: Genome, downloaded: Path = None):
         if not downloaded.exists():
@@ -91,7 +353,7 @@ class Decompressor:
         logging.debug(
             f"Decompressing {downloaded!s}. {type.name} compression detected."
         )
-        handler(self, downloaded, target)
+        digest = handler(self, downloaded, target)
         if not target.exists():
             raise RuntimeError(
                 f"Error decompressing {str(genome)}: Decompressed file not found"
@@ -103,14 +365,10 @@ class Decompressor:
             # If we've a bgzip, the file is never decompressed.
             return target
 
-        if genome.decompressed_size is None:
-            genome.decompressed_size = target.stat().st_size
-        elif genome.decompressed_size != target.stat().st_size:
-            raise RuntimeError(f"Error decompressing {str(genome)}: size mismatch")
-
-        if genome.decompressed_md5 is None:
-            genome.decompressed_md5 = self.calculate_md5_hash(target)
-        elif genome.decompressed_md5 != self.calculate_md5_hash(target):
-            raise RuntimeError(f"Error decompressing {str(genome)}: MD5 mismatch")
-
+        if genome.decompressed_size is not None:
+            if genome.decompressed_size != target.stat().st_size:
+                raise RuntimeError(f"Error decompressing {str(genome)}: size mismatch")
+        if digest is None:
+            digest = HashingTee(sha256=self._sha256).hash_file(target)
+        self.verify(genome, target.stat().st_size, digest.md5, digest.sha256)
         return target
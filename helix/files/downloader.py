@@ -1,18 +1,21 @@
-import hashlib
+import base64
 import logging
 import os
 from pathlib import Path
 
 import certifi
 import pycurl
-from google.cloud import storage
 
 from helix.configuration import MANAGER_CFG
 from helix.progress.progress_calculator import ProgressCalculator, ComputeOn
 from helix.progress.file_size_monitor import FileSizeMonitor
 from helix.reference.genome_metadata_loader import Genome
 from helix.files.file_type_checker import FileTypeChecker
+from helix.files.hashing_tee import HashingTee
+from helix.files.segmented_download import SegmentedDownload, SegmentedDownloadError
+from helix.files.size_prober import SizeProber, UrlMetadataCache
 from helix.utility.unit_prefix import UnitPrefix
+from helix.utility.services import SERVICES
 
 HANDLERS = {}
 SIZE_HANDLERS = {}
@@ -41,15 +44,19 @@ class Downloader:
     def __init__(
         self,
         config=MANAGER_CFG.REPOSITORY,
-        file_type_checker: FileTypeChecker = FileTypeChecker(),
+        file_type_checker: FileTypeChecker = None,
         curl_class=pycurl.Curl,
+        sha256: bool = False,
+        multi_class=pycurl.CurlMulti,
+        segment_size: int = 32 * 1024 * 1024,
     ) -> None:
-        if file_type_checker is None:
-            raise RuntimeError("FileTypeChecker cannot be None.")
-
         self._config = config
         self._curl_class = curl_class
-        self.file_type_checker = file_type_checker
+        self._sha256 = sha256
+        self._multi_class = multi_class
+        self._segment_size = segment_size
+        self._prober: SizeProber = None
+        self.file_type_checker = SERVICES.resolve(file_type_checker, FileTypeChecker)
         self._logger = logging.getLogger("downloader")
 
     def size_pycurl(self, url: str):
@@ -70,18 +77,49 @@ class Downloader:
                 return SIZE_HANDLERS[handler](self, url)
         return self.size_pycurl(url)
 
-    def calculate_md5_hash(self, filename: Path, chunk_size=4096):
-        md5_hash = hashlib.md5()
-        with filename.open("rb") as f:
-            for chunk in iter(lambda: f.read(chunk_size), b""):
-                md5_hash.update(chunk)
-        return md5_hash.hexdigest()
+    def get_file_sizes(self, urls: list[str]) -> dict[str, int]:
+        """Get the size of many files at once.
+
+        Files served by pycurl are probed concurrently and the results are cached
+        on disk for `url_cache_ttl` seconds.
+
+        Args:
+            urls (list[str]): URLs of the files.
+
+        Returns:
+            dict[str, int]: Size of every file, None if unavailable.
+        """
+        sizes = {}
+        pycurl_urls = []
+        for url in urls:
+            handlers = [x for x in SIZE_HANDLERS.keys() if url.startswith(x)]
+            if len(handlers) > 0:
+                sizes[url] = SIZE_HANDLERS[handlers[0]](self, url)
+            else:
+                pycurl_urls.append(url)
+
+        if self._prober is None:
+            cache = UrlMetadataCache(
+                self._config.temporary.joinpath("url_metadata.json"),
+                self._config.url_cache_ttl,
+            )
+            self._prober = SizeProber(
+                cache, curl_class=self._curl_class, multi_class=self._multi_class
+            )
+        sizes.update(self._prober.probe(pycurl_urls))
+        return sizes
+
+    def calculate_md5_hash(self, filename: Path, chunk_size=1024 * 1024):
+        return HashingTee().hash_file(filename, chunk_size).md5
 
     @size_handler("https://storage.cloud.google.com")
     @size_handler("gs://")
-    def size_google(self, genome: Genome):
+    def size_google(self, url: str):
+        # Imported here as it's slow to import and rarely needed.
+        from google.cloud import storage
+
         storage_client = storage.Client.create_anonymous_client()
-        uri = genome.fasta_url.strip()
+        uri = url.strip()
         if not uri.startswith("gs://"):
             uri = "gs://" + uri.replace("https://storage.cloud.google.com/", "")
 
@@ -92,6 +130,8 @@ class Downloader:
     @uri_handler("https://storage.cloud.google.com")
     @uri_handler("gs://")
     def download_google(self, genome: Genome, callback: any):
+        from google.cloud import storage
+
         storage_client = storage.Client.create_anonymous_client()
         uri = genome.fasta_url.strip()
         if not uri.startswith("gs://"):
@@ -101,8 +141,9 @@ class Downloader:
         blob.reload()
         if genome.download_size is None:
             genome.download_size = blob.size
-        if genome.downloaded_md5 is None:
-            genome.downloaded_md5 = blob.md5_hash
+        if genome.downloaded_md5 is None and blob.md5_hash is not None:
+            # GCS reports the MD5 base64 encoded.
+            genome.downloaded_md5 = base64.b64decode(blob.md5_hash).hex()
 
         target = self._config.temporary.joinpath(genome.name_only)
 
@@ -113,18 +154,45 @@ class Downloader:
             callback, genome.download_size, ComputeOn.Write, "Download"
         )
         monitor = FileSizeMonitor(target, base_calc.compute, genome.download_size)
-        blob.download_to_filename(target)
+        with HashingTee(target.open("wb"), self._sha256) as tee:
+            blob.download_to_file(tee)
         monitor.quit()
-        return self.post_download_action(genome, target)
+        return self.post_download_action(genome, target, tee)
 
-    def post_download_action(self, genome: Genome, downloaded: Path):
-        md5 = self.calculate_md5_hash(downloaded)
+    def post_download_action(
+        self, genome: Genome, downloaded: Path, digest: HashingTee = None
+    ):
+        """Verify the hashes of a downloaded file and give it the right extension.
+
+        Args:
+            genome (Genome): Genome that was downloaded.
+            downloaded (Path): Downloaded file.
+            digest (HashingTee, optional): Hashes computed while downloading.
+                If None, the file is read again to compute them.
+
+        Raises:
+            RuntimeError: Hashes are not matching the ones in the genome.
+
+        Returns:
+            Path: Path of the downloaded file.
+        """
+        if digest is None:
+            digest = HashingTee(sha256=self._sha256).hash_file(downloaded)
         if genome.downloaded_md5 is None:
-            genome.downloaded_md5 = md5
-        elif genome.downloaded_md5 != md5:
+            genome.downloaded_md5 = digest.md5
+        elif genome.downloaded_md5 != digest.md5:
             downloaded.unlink()
             raise RuntimeError(f"MD5 for {genome} is not matching and was deleted.")
 
+        if digest.sha256 is not None:
+            if genome.downloaded_sha256 is None:
+                genome.downloaded_sha256 = digest.sha256
+            elif genome.downloaded_sha256 != digest.sha256:
+                downloaded.unlink()
+                raise RuntimeError(
+                    f"SHA-256 for {genome} is not matching and was deleted."
+                )
+
         extension = self.file_type_checker.get_extension(downloaded)
 
         if extension is None:
@@ -157,9 +225,12 @@ class Downloader:
                 raise RuntimeError(f"Unable to download file {genome.fasta_url}")
 
         target = self._config.temporary.joinpath(genome.name_only)
+        # A segmented download preallocates the file: its size is meaningful
+        # only when there's no manifest of the segments left to download.
+        manifest = SegmentedDownload.manifest_path(target)
 
         resume_from = None
-        if target is not None and target.exists():
+        if target is not None and target.exists() and not manifest.exists():
             if target.stat().st_size == genome.download_size:
                 return self.post_download_action(genome, target)
             else:
@@ -171,6 +242,28 @@ class Downloader:
                 progress, genome.download_size, ComputeOn.Proxy, "Download"
             )
 
+        if self._use_segments(genome.fasta_url, genome.download_size, resume_from):
+            try:
+                SegmentedDownload(
+                    genome.fasta_url,
+                    target,
+                    genome.download_size,
+                    self._config.download_connections,
+                    self._segment_size,
+                    curl_class=self._curl_class,
+                    multi_class=self._multi_class,
+                ).perform(progress_calc)
+                # Segments are written out of order: hash the file afterwards.
+                return self.post_download_action(genome, target)
+            except SegmentedDownloadError as e:
+                self._logger.warning(
+                    f"Segmented download failed, using a single connection: {e!s}"
+                )
+                if manifest.exists():
+                    manifest.unlink()
+                if target.exists():
+                    target.unlink()
+
         total = UnitPrefix.convert_bytes(genome.download_size)
         resume = UnitPrefix.convert_bytes(resume_from if resume_from is not None else 0)
         url = genome.fasta_url
@@ -179,8 +272,19 @@ class Downloader:
             % (url, resume, total)
         )
 
-        self.download_file(genome.fasta_url, target, resume_from, progress_calc)
-        return self.post_download_action(genome, target)
+        digest = self.download_file(
+            genome.fasta_url, target, resume_from, progress_calc
+        )
+        return self.post_download_action(genome, target, digest)
+
+    def _use_segments(self, url: str, size: int, resume_from: int = None):
+        # Range requests are only meaningful on remote http(s) resources. Also,
+        # don't mix it with a download started on a single connection.
+        if self._config.download_connections <= 1 or resume_from is not None:
+            return False
+        if not url.startswith("http://") and not url.startswith("https://"):
+            return False
+        return size > self._segment_size
 
     def download_file(
         self,
@@ -188,7 +292,20 @@ class Downloader:
         target: Path,
         resume_from: int = None,
         progress_calc: ProgressCalculator = None,
-    ):
+    ) -> HashingTee:
+        """Download a file with pycurl, hashing it while it's written.
+
+        Args:
+            url (str): URL to download.
+            target (Path): Destination file.
+            resume_from (int, optional): Append to `target` starting from this
+                offset. Defaults to None.
+            progress_calc (ProgressCalculator, optional): Progress reporting.
+
+        Returns:
+            HashingTee: Hashes of the whole file (including the part that was
+                already on disk when resuming).
+        """
         curl = self._curl_class()
         curl.setopt(pycurl.URL, url)
         curl.setopt(pycurl.FOLLOWLOCATION, True)
@@ -206,9 +323,13 @@ class Downloader:
 
         try:
             with target.open("wb" if resume_from is None else "ab") as f:
-                curl.setopt(pycurl.WRITEDATA, f)
+                tee = HashingTee(f, self._sha256)
+                if resume_from is not None:
+                    tee.hash_file(target)
+                curl.setopt(pycurl.WRITEFUNCTION, tee.write)
                 curl.perform()
                 curl.close()
         finally:
             if progress_calc is not None:
                 progress_calc.compute(None)
+        return tee
@@ -1,7 +1,11 @@
 import enum
+import logging
+import struct
 from pathlib import Path
+from typing import Optional
 
 from helix.utility.external import External
+from helix.utility.services import SERVICES
 
 
 class FileType(enum.Enum):
@@ -15,12 +19,60 @@ class FileType(enum.Enum):
     DECOMPRESSED = 6
 
 
+# Bytes read from the start of a file to detect its type.
+SNIFF_SIZE = 4096
+
+
+def sniff(header: bytes) -> Optional[FileType]:
+    """Detect the type of a file from its first bytes (magic numbers).
+
+    Like `htsfile`, plain gzip files are reported as RAZF_GZIP.
+
+    Args:
+        header (bytes): First bytes of the file (see SNIFF_SIZE).
+
+    Returns:
+        Optional[FileType]: Type, or None if it's not recognized.
+    """
+    if header.startswith((b"PK\x03\x04", b"PK\x05\x06", b"PK\x07\x08")):
+        return FileType.ZIP
+    if header.startswith(b"7z\xbc\xaf\x27\x1c"):
+        return FileType.SEVENZIP
+    if header[:3] == b"BZh" and header[3:4].isdigit() and header[3:4] != b"0":
+        return FileType.BZIP
+    if header.startswith(b"\x1f\x8b\x08"):
+        return _sniff_gzip(header)
+    text = header.lstrip()
+    if text.startswith(b">") and text.isascii():
+        return FileType.DECOMPRESSED
+    return None
+
+
+def _sniff_gzip(header: bytes) -> FileType:
+    # BGZF and RAZF are gzip files with a specific extra field (FEXTRA flag).
+    if len(header) < 12 or not header[3] & 0x04:
+        return FileType.RAZF_GZIP
+    if header[12:16] == b"RAZF":
+        return FileType.RAZF_GZIP
+    (extra_length,) = struct.unpack_from("<H", header, 10)
+    position = 12
+    while position + 4 <= min(12 + extra_length, len(header)):
+        end = position + 2
+        identifier = header[position:end]
+        (length,) = struct.unpack_from("<H", header, position + 2)
+        if identifier == b"BC" and length == 2:
+            return FileType.BGZIP
+        position += 4 + length
+    return FileType.RAZF_GZIP
+
+
 class FileTypeChecker:
     """Gets the type of a file trying to not relying on its extension (if possible)
 
-    This class uses the utility `htsfile` to get the type of a file. If it fails to
-    get the type of a file using `htsfile`, it will try to guess its type based on its
-    extension.
+    The type is detected from the magic numbers at the start of the file. If
+    they are not recognized, the utility `htsfile` is used and, if it fails too,
+    the type is guessed from the extension. Results are memoized per path,
+    size and modification time, so checking the same file again is free.
 
     Examples:
         >>> input = Path("file.fasta")
@@ -57,8 +109,10 @@ class FileTypeChecker:
         "FASTA": FileType.DECOMPRESSED,
     }
 
-    def __init__(self, external: External = External()) -> None:
-        self._external = external
+    def __init__(self, external: External = None) -> None:
+        self._external = SERVICES.resolve(external, External)
+        self._logger = logging.getLogger(__name__)
+        self._types: dict[tuple[str, int, int], Optional[FileType]] = {}
 
     def get_type(self, file: Path) -> FileType:
         """Get a Type starting from a file path.
@@ -69,12 +123,27 @@ class FileTypeChecker:
         Returns:
             Type | None: Type or None if the type is unknown.
         """
-        # Extensions can be wrong or misleading; Use htsfile and
+        stat = file.stat()
+        key = (str(file.absolute()), stat.st_size, stat.st_mtime_ns)
+        if key not in self._types:
+            self._types[key] = self._detect(file)
+        return self._types[key]
+
+    def _detect(self, file: Path) -> Optional[FileType]:
+        # Extensions can be wrong or misleading; Use the content and
         # eventually fallback on extension.
-
-        file_type = self._external.htsfile([str(file)], wait=True, text=True)
+        with file.open("rb") as f:
+            file_type = sniff(f.read(SNIFF_SIZE))
+        if file_type is not None:
+            return file_type
+
+        try:
+            output = self._external.htsfile([str(file)], wait=True, text=True)
+        except (FileNotFoundError, RuntimeError) as e:
+            self._logger.debug(f"htsfile failed on {file!s}: {e!s}")
+            output = ""
         for key, value in FileTypeChecker._HTSFILE_TO_TYPE.items():
-            if key in file_type:
+            if key in output:
                 return value
 
         # TODO: starting from .gz in _EXT_TO_TYPE, htsfile should really
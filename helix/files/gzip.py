@@ -2,6 +2,7 @@ import enum
 from pathlib import Path
 
 from helix.utility.external import External
+from helix.utility.services import SERVICES
 
 
 class GZipAction(enum.Enum):
@@ -10,8 +11,8 @@ class GZipAction(enum.Enum):
 
 
 class GZip:
-    def __init__(self, external=External()) -> None:
-        self._external = external
+    def __init__(self, external: External = None) -> None:
+        self._external = SERVICES.resolve(external, External)
 
     def _gzip_filename(self, input: Path, action: GZipAction):
         if action == GZipAction.Compress:
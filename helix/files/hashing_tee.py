@@ -0,0 +1,89 @@
+import hashlib
+from pathlib import Path
+from typing import BinaryIO
+
+
+class HashingTee:
+    """Compute hashes of the data while it is being written.
+
+    Every byte written to this object is forwarded to `file` (if any) and used
+    to update the hashes, so that the hash of a file is available as soon as
+    the file is written, without reading it again.
+
+    Args:
+        file (BinaryIO, optional): Where to forward the data. If None, the data
+            is only hashed.
+        sha256 (bool, optional): Compute also the SHA-256. Defaults to False.
+
+    Examples:
+        >>> with HashingTee(Path("file").open("wb")) as tee:
+        >>>     tee.write(b"foo")
+        >>> tee.md5
+        'acbd18db4cc2f85cedef654fccc4a4d8'
+    """
+
+    def __init__(self, file: BinaryIO = None, sha256: bool = False) -> None:
+        self._file = file
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256() if sha256 else None
+        self.size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _, _1, _2):
+        self.close()
+
+    def writable(self):
+        return True
+
+    def write(self, data: bytes) -> int:
+        if self._file is not None:
+            self._file.write(data)
+        self._update(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def md5(self) -> str:
+        return self._md5.hexdigest()
+
+    @property
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            return None
+        return self._sha256.hexdigest()
+
+    def hash_file(self, path: Path, chunk_size: int = 1024 * 1024) -> "HashingTee":
+        """Update the hashes with the content of a file, without forwarding it.
+
+        Useful to hash a file that already exists on disk, or the part of a
+        file that was written before resuming an operation.
+
+        Args:
+            path (Path): File to hash.
+            chunk_size (int, optional): Bytes read at a time.
+
+        Returns:
+            HashingTee: This object.
+        """
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                self._update(chunk)
+        return self
+
+    def _update(self, data: bytes):
+        self._md5.update(data)
+        if self._sha256 is not None:
+            self._sha256.update(data)
+        self.size += len(data)
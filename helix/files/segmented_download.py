@@ -0,0 +1,225 @@
+import json
+import logging
+from pathlib import Path
+from typing import BinaryIO
+
+import certifi
+import pycurl
+
+from helix.progress.progress_calculator import ProgressCalculator
+
+
+class SegmentedDownloadError(RuntimeError):
+    """The server does not support range requests, or a segment failed too many
+    times."""
+
+
+class _Segment:
+    def __init__(self, index: int, start: int, end: int) -> None:
+        self.index = index
+        self.start = start
+        # Inclusive, as in the HTTP Range header.
+        self.end = end
+        self.written = 0
+        self.attempts = 0
+        self.range_ignored = False
+
+    @property
+    def length(self):
+        return self.end - self.start + 1
+
+
+class SegmentedDownload:
+    """Download a file with concurrent range requests on multiple connections.
+
+    The target file is preallocated and every segment is written at its own
+    offset. Completed segments are tracked in a small sidecar manifest
+    (`<target>.segments`), so an interrupted download can be resumed without
+    downloading again the segments that were already completed.
+
+    Args:
+        url (str): URL to download.
+        target (Path): Destination file.
+        size (int): Size of the file to download.
+        connections (int, optional): Maximum number of concurrent connections.
+        segment_size (int, optional): Size of a single range request.
+        retries (int, optional): Attempts for each segment before giving up.
+        curl_class (optional): Class used to create the easy handles.
+        multi_class (optional): Class used to create the multi handle.
+
+    Examples:
+        >>> download = SegmentedDownload(url, Path("genome.fa.gz"), size, 4)
+        >>> download.perform()
+    """
+
+    def __init__(
+        self,
+        url: str,
+        target: Path,
+        size: int,
+        connections: int = 4,
+        segment_size: int = 32 * 1024 * 1024,
+        retries: int = 3,
+        curl_class=pycurl.Curl,
+        multi_class=pycurl.CurlMulti,
+    ) -> None:
+        self.url = url
+        self.target = target
+        self.size = size
+        self.manifest = SegmentedDownload.manifest_path(target)
+        self._connections = max(1, connections)
+        self._segment_size = segment_size
+        self._retries = retries
+        self._curl_class = curl_class
+        self._multi_class = multi_class
+        self._logger = logging.getLogger("downloader")
+        self._segments = [
+            _Segment(index, start, min(start + segment_size, size) - 1)
+            for index, start in enumerate(range(0, size, segment_size))
+        ]
+
+    @staticmethod
+    def manifest_path(target: Path) -> Path:
+        return Path(str(target) + ".segments")
+
+    def perform(self, progress_calc: ProgressCalculator = None):
+        """Download all the segments that are not completed yet.
+
+        Args:
+            progress_calc (ProgressCalculator, optional): Progress reporting.
+
+        Raises:
+            SegmentedDownloadError: The server does not honour range requests
+                or a segment failed more than `retries` times.
+        """
+        completed = self._load_manifest()
+        if len(completed) == 0 or not self.target.exists():
+            completed = set()
+            with self.target.open("wb") as f:
+                f.truncate(self.size)
+            self._save_manifest(completed)
+
+        pending = [x for x in self._segments if x.index not in completed]
+        self._logger.info(
+            f"Downloading {len(pending)}/{len(self._segments)} segments of "
+            f"{self.url} on {self._connections} connections."
+        )
+        downloaded = sum(x.length for x in self._segments if x.index in completed)
+        multi = self._multi_class()
+        active: dict[pycurl.Curl, _Segment] = {}
+        try:
+            with self.target.open("r+b") as f:
+                while len(pending) > 0 or len(active) > 0:
+                    while len(pending) > 0 and len(active) < self._connections:
+                        segment = pending.pop(0)
+                        curl = self._create_handle(f, segment)
+                        multi.add_handle(curl)
+                        active[curl] = segment
+
+                    while True:
+                        ret, _ = multi.perform()
+                        if ret != pycurl.E_CALL_MULTI_PERFORM:
+                            break
+
+                    _, succeeded, failed = multi.info_read()
+                    for curl in succeeded:
+                        segment = active.pop(curl)
+                        multi.remove_handle(curl)
+                        status = curl.getinfo(pycurl.RESPONSE_CODE)
+                        curl.close()
+                        if segment.written != segment.length or status not in [
+                            0,
+                            200 if segment.length == self.size else 206,
+                        ]:
+                            self._retry(segment, pending, f"status {status}")
+                            continue
+                        completed.add(segment.index)
+                        downloaded += segment.length
+                        self._save_manifest(completed)
+                    for curl, _, message in failed:
+                        segment = active.pop(curl)
+                        multi.remove_handle(curl)
+                        curl.close()
+                        if segment.range_ignored:
+                            raise SegmentedDownloadError(
+                                f"Range requests are not supported for {self.url}"
+                            )
+                        self._retry(segment, pending, message)
+
+                    if progress_calc is not None:
+                        in_flight = sum(x.written for x in active.values())
+                        progress_calc.compute(downloaded + in_flight)
+                    if len(active) > 0:
+                        multi.select(1.0)
+        finally:
+            for curl in active:
+                multi.remove_handle(curl)
+                curl.close()
+            multi.close()
+            if progress_calc is not None:
+                progress_calc.compute(None)
+        self.manifest.unlink()
+
+    def _retry(self, segment: _Segment, pending: list[_Segment], reason: str):
+        segment.attempts += 1
+        if segment.attempts >= self._retries:
+            raise SegmentedDownloadError(
+                f"Segment {segment.index} of {self.url} failed "
+                f"{segment.attempts} times: {reason}"
+            )
+        self._logger.warning(
+            f"Segment {segment.index} of {self.url} failed ({reason}), retrying."
+        )
+        segment.written = 0
+        pending.append(segment)
+
+    def _create_handle(self, file: BinaryIO, segment: _Segment):
+        segment.written = 0
+
+        def write(data: bytes):
+            if segment.written + len(data) > segment.length:
+                # The server is ignoring the range: abort the transfer
+                # instead of writing outside of the segment.
+                segment.range_ignored = True
+                return 0
+            file.seek(segment.start + segment.written)
+            file.write(data)
+            segment.written += len(data)
+
+        curl = self._curl_class()
+        curl.setopt(pycurl.URL, self.url)
+        curl.setopt(pycurl.FOLLOWLOCATION, True)
+        curl.setopt(pycurl.CAINFO, certifi.where())
+        curl.setopt(pycurl.RANGE, f"{segment.start}-{segment.end}")
+        curl.setopt(pycurl.WRITEFUNCTION, write)
+        return curl
+
+    def _load_manifest(self) -> set[int]:
+        if not self.manifest.exists():
+            return set()
+        try:
+            with self.manifest.open("rt") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            self._logger.warning(f"Ignoring invalid manifest {self.manifest!s}: {e!s}")
+            return set()
+        if (
+            manifest.get("url") != self.url
+            or manifest.get("size") != self.size
+            or manifest.get("segment_size") != self._segment_size
+        ):
+            return set()
+        return set(manifest.get("completed", []))
+
+    def _save_manifest(self, completed: set[int]):
+        manifest = {
+            "url": self.url,
+            "size": self.size,
+            "segment_size": self._segment_size,
+            "completed": sorted(completed),
+        }
+        # Write and rename, so that a crash never leaves a truncated manifest.
+        temporary = Path(str(self.manifest) + ".tmp")
+        with temporary.open("wt") as f:
+            json.dump(manifest, f)
+        temporary.replace(self.manifest)
@@ -0,0 +1,196 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Optional
+
+import certifi
+import pycurl
+
+
+class UrlMetadataCache:
+    """Persistent cache of size and ETag of remote files.
+
+    Entries older than `ttl` seconds are considered expired. A missing remote
+    file is cached as well (with a size of None), so that optional companion
+    files (.fai, .gzi) that don't exist are not probed over and over. Only
+    definitive answers are cached: see SizeProber.
+
+    Args:
+        path (Path): JSON file where the cache is stored.
+        ttl (int, optional): Validity of an entry in seconds. Defaults to 1 day.
+    """
+
+    def __init__(self, path: Path, ttl: int = 24 * 60 * 60) -> None:
+        self._path = path
+        self._ttl = ttl
+        self._logger = logging.getLogger(__name__)
+        self._entries: dict[str, dict] = self._load()
+
+    def _load(self) -> dict[str, dict]:
+        if not self._path.exists():
+            return {}
+        try:
+            with self._path.open("rt") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self._logger.warning(f"Ignoring invalid cache {self._path!s}: {e!s}")
+            return {}
+
+    def save(self):
+        temporary = Path(str(self._path) + ".tmp")
+        with temporary.open("wt") as f:
+            json.dump(self._entries, f)
+        temporary.replace(self._path)
+
+    def __contains__(self, url: str) -> bool:
+        entry = self._entries.get(url)
+        if entry is None:
+            return False
+        return time.time() - entry["timestamp"] < self._ttl
+
+    def get(self, url: str) -> Optional[dict]:
+        if url not in self:
+            return None
+        return self._entries[url]
+
+    def put(self, url: str, size: Optional[int], etag: Optional[str] = None):
+        self._entries[url] = {"size": size, "etag": etag, "timestamp": time.time()}
+
+
+class SizeProber:
+    """Get the size of many remote files with concurrent HEAD requests.
+
+    A fixed pool of curl handles is attached to a single multi handle, so
+    connections are reused across requests to the same host.
+
+    Only definitive answers are cached: success, 404 and 410. Network errors,
+    server errors and rate limiting (429) may be temporary, so those URLs are
+    probed again next time.
+
+    Args:
+        cache (UrlMetadataCache, optional): Cache to use. Defaults to None.
+        connections (int, optional): Maximum concurrent requests. Defaults to 8.
+        curl_class (optional): Class used to create the easy handles.
+        multi_class (optional): Class used to create the multi handle.
+
+    Examples:
+        >>> prober = SizeProber(UrlMetadataCache(Path("cache.json")))
+        >>> sizes = prober.probe([url + ".fai", url + ".gzi", url])
+    """
+
+    def __init__(
+        self,
+        cache: UrlMetadataCache = None,
+        connections: int = 8,
+        curl_class=pycurl.Curl,
+        multi_class=pycurl.CurlMulti,
+    ) -> None:
+        self._cache = cache
+        self._connections = max(1, connections)
+        self._curl_class = curl_class
+        self._multi_class = multi_class
+        self._logger = logging.getLogger(__name__)
+
+    def probe(self, urls: list[str]) -> dict[str, Optional[int]]:
+        """Get the size of the remote files.
+
+        Args:
+            urls (list[str]): URLs to probe.
+
+        Returns:
+            dict[str, Optional[int]]: Size for every URL. None if the file is
+                not available or its size is unknown.
+        """
+        sizes = {}
+        pending = []
+        for url in dict.fromkeys(urls):
+            cached = self._cache.get(url) if self._cache is not None else None
+            if cached is not None:
+                sizes[url] = cached["size"]
+            else:
+                pending.append(url)
+
+        if len(pending) > 0:
+            sizes.update(self._head(pending))
+            if self._cache is not None:
+                self._cache.save()
+        return sizes
+
+    def _head(self, urls: list[str]) -> dict[str, Optional[int]]:
+        sizes = {}
+        urls = list(urls)
+        multi = self._multi_class()
+        idle = [self._curl_class() for _ in range(min(self._connections, len(urls)))]
+        active: dict[pycurl.Curl, tuple[str, dict]] = {}
+        try:
+            while len(urls) > 0 or len(active) > 0:
+                while len(urls) > 0 and len(idle) > 0:
+                    url = urls.pop()
+                    curl = idle.pop()
+                    headers = {}
+                    self._setup(curl, url, headers)
+                    multi.add_handle(curl)
+                    active[curl] = (url, headers)
+
+                while True:
+                    ret, _ = multi.perform()
+                    if ret != pycurl.E_CALL_MULTI_PERFORM:
+                        break
+
+                _, succeeded, failed = multi.info_read()
+                for curl in succeeded:
+                    url, headers = active.pop(curl)
+                    multi.remove_handle(curl)
+                    status = curl.getinfo(pycurl.RESPONSE_CODE)
+                    sizes[url] = self._size(curl, status)
+                    if not self._is_definitive(status):
+                        self._logger.warning(
+                            f"Unable to get the size of {url}: {status}"
+                        )
+                    elif self._cache is not None:
+                        self._cache.put(url, sizes[url], headers.get("etag"))
+                    idle.append(curl)
+                for curl, _, message in failed:
+                    url, _ = active.pop(curl)
+                    multi.remove_handle(curl)
+                    # Network errors are not cached: they may be temporary.
+                    self._logger.warning(f"Unable to get the size of {url}: {message}")
+                    sizes[url] = None
+                    idle.append(curl)
+
+                if len(active) > 0:
+                    multi.select(1.0)
+        finally:
+            for curl in active:
+                multi.remove_handle(curl)
+            for curl in [*idle, *active]:
+                curl.close()
+            multi.close()
+        return sizes
+
+    def _setup(self, curl: pycurl.Curl, url: str, headers: dict):
+        def header(line: bytes):
+            line = line.decode("iso-8859-1")
+            if ":" not in line:
+                return
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+        curl.setopt(pycurl.URL, url)
+        curl.setopt(pycurl.NOBODY, 1)
+        curl.setopt(pycurl.FOLLOWLOCATION, True)
+        curl.setopt(pycurl.CAINFO, certifi.where())
+        curl.setopt(pycurl.HEADERFUNCTION, header)
+
+    def _is_definitive(self, status: int) -> bool:
+        # file:// URLs have no status code.
+        return status < 300 or status in [404, 410]
+
+    def _size(self, curl: pycurl.Curl, status: int) -> Optional[int]:
+        if status >= 400:
+            return None
+        length = int(curl.getinfo(pycurl.CONTENT_LENGTH_DOWNLOAD))
+        if length <= 0:
+            return None
+        return length
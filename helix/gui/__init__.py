@@ -1,16 +1,30 @@
 import sys
 
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 
 from helix.gui.main import HelixWindow
+from helix.utility.startup_profiler import StartupProfiler
 
 
-def main():
+def _on_first_window(exit_after_startup: bool):
+    profiler = StartupProfiler.active
+    if profiler is not None:
+        profiler.mark("first_window")
+        profiler.stop()
+        profiler.save()
+    if exit_after_startup:
+        QApplication.quit()
+
+
+def main(exit_after_startup: bool = False):
     app = QApplication(sys.argv)
     # Use a less broken UI style
     app.setStyle("fusion")
     widget = HelixWindow()
     widget.show()
+    # Runs as soon as the event loop processed the first events.
+    QTimer.singleShot(0, lambda: _on_first_window(exit_after_startup))
     sys.exit(app.exec())
 
 
@@ -101,7 +101,7 @@ class ExtractWizard(QDialog):
         selected = [x for x in self._microarray_selection.checkboxes if x.isChecked()]
         if len(selected) == 0:
             return
-        self.options = [x.text() for x in selected]
+        self.options = [x.objectName() for x in selected]
         self.close()
 
     def _sequence_selected(self):
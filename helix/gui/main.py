@@ -34,7 +34,6 @@ from helix.configuration import MANAGER_CFG
 from helix.converter import Converter
 from helix.data.sorting import Sorting
 from helix.data.tabular_data import TabularData, TabularDataRow
-from helix.reference.genome_metadata_loader import MetadataLoader
 from helix.reference.reference import ReferenceStatus
 from helix.gui.extract.extract_wizard import ExtractWizard
 from helix.gui.table_dialog import ListTableDialog, TableDialog
@@ -46,6 +45,7 @@ from helix.utility.samtools import Samtools
 from helix.utility.shortcut import Shortcut
 from helix.progress.worker import Worker
 from helix.utility.updater import Updater
+from helix.utility.services import SERVICES
 
 
 class GUIState(enum.Enum):
@@ -73,21 +73,21 @@ class HelixWindow(QMainWindow):
         self,
         config=MANAGER_CFG.GENERAL,
         repo_config=MANAGER_CFG.REPOSITORY,
-        external=External(),
-        samtools=Samtools(),
-        repository=Repository(),
-        updater=Updater(),
-        shortcut=Shortcut(),
+        external: External = None,
+        samtools: Samtools = None,
+        repository: Repository = None,
+        updater: Updater = None,
+        shortcut: Shortcut = None,
         logger=logging.getLogger(__name__),
     ):
         super().__init__()
         self.config = config
         self.repo_config = repo_config
-        self._external = external
-        self._samtools = samtools
-        self._repository = repository
-        self._updater = updater
-        self._shortcut = shortcut
+        self._external = SERVICES.resolve(external, External)
+        self._samtools = SERVICES.resolve(samtools, Samtools)
+        self._repository = SERVICES.resolve(repository, Repository)
+        self._updater = SERVICES.resolve(updater, Updater)
+        self._shortcut = SERVICES.resolve(shortcut, Shortcut)
         self._logger = logger
         self.current_file = None
         self.current_label = QLabel()
@@ -112,7 +112,7 @@ class HelixWindow(QMainWindow):
     def open_genomes(self):
         dialog = ListTableDialog("Genomes", self)
         dialog.set_data(
-            {str(x): GenomeAdapter.adapt(x) for x in MetadataLoader().load()}
+            {str(x): GenomeAdapter.adapt(x) for x in self._repository.genomes}
         )
         dialog.show()
 
@@ -1,16 +1,35 @@
-import sentry_sdk
-
-import helix.gui
-from helix.utility.check_prerequisites import CheckPrerequisites
+import sys
 
+from helix.utility.startup_profiler import StartupProfiler
 
 SENTRY = "https://7942f481884f55dfc85350ef336b3299@o4507282907856896.ingest.de.sentry.io/4507282933874768"  # noqa: E501
 
+
+def main():
+    # Started before importing anything else, to measure the imports too.
+    profiler = StartupProfiler.from_arguments(sys.argv)
+    # Used by the startup benchmark: quit as soon as the window is shown.
+    exit_after_startup = "--exit-after-startup" in sys.argv
+
+    import sentry_sdk
+
+    import helix.gui
+    from helix.utility.check_prerequisites import CheckPrerequisites
+
+    if not exit_after_startup:
+        sentry_sdk.init(
+            dsn=SENTRY,
+            traces_sample_rate=1.0,
+            profiles_sample_rate=1.0,
+        )
+    if profiler is not None:
+        profiler.mark("imports")
+        with profiler.phase("prerequisites"):
+            CheckPrerequisites().check_prerequisites()
+    else:
+        CheckPrerequisites().check_prerequisites()
+    helix.gui.main(exit_after_startup)
+
+
 if __name__ == "__main__":
-    sentry_sdk.init(
-        dsn=SENTRY,
-        traces_sample_rate=1.0,
-        profiles_sample_rate=1.0,
-    )
-    CheckPrerequisites().check_prerequisites()
-    helix.gui.main()
+    main()
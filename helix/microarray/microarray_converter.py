@@ -1,12 +1,19 @@
-import gzip
+import bisect
+import logging
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Iterator, Optional, Union
 
 from helix.configuration import MANAGER_CFG
 from helix.data.microarray_converter import MicroarrayConverterTarget
-from helix.microarray.raw_file import RawEntry, RawFile
+from helix.microarray.microarray_line_formatter import TARGET_FORMATTER_MAP
+from helix.microarray.raw_file import RawFile, RawReader, RawTable
+from helix.microarray.template_bundle import TemplateBundle, get_bundle_path
+from helix.microarray.templates_importer import TemplatesImporter
 from helix.naming.converter import Converter
 
+# Format a line of the output: id, chromosome, position, result -> line.
+Formatter = Callable[[str, str, int, str], str]
+
 
 class MicroarrayConverter:
     def __init__(self, config=MANAGER_CFG.REPOSITORY) -> None:
@@ -28,77 +35,201 @@ class MicroarrayConverter:
         return "--"
 
     def ingest(self, input: Path, progress: Callable[[str, float], None] = None):
-        name_noext = input.name.removesuffix("".join(input.suffixes))
-        target = self._template_folder.joinpath(name_noext).with_suffix(".txt.gz")
-
-        if target == input:
-            raise ValueError(f"Input file is the same as the target: {input!s}")
-
-        if not input.exists():
-            raise FileNotFoundError(
-                f"Unable to find body file for microarray template at {input!s}"
-            )
-
-        rawfile = RawFile(input)
-        template = rawfile.load()
-
-        entries = []
-        with gzip.open(target, "wt") as file:
-            if template.meta is not None:
-                file.write(f"##{template.meta.model_dump_json()}\n")
-            file.writelines(template.comments)
-            for chromosome in Converter.sort(list(template.grouped_entries.keys())):
-                ordered_positions = list(template.grouped_entries[chromosome].keys())
-                ordered_positions.sort()
-                for position in ordered_positions:
-                    entries = template.grouped_entries[chromosome][position]
-                    for entry in entries:
-                        file.write(template.meta.input_format.format(**entry.__dict__))
-        return target
+        return TemplatesImporter(self._template_folder).ingest(input, progress)
 
     def convert(self, input: Path, target: Path):
         if not target.exists():
             raise FileNotFoundError(
                 f"Unable to find body file for microarray template at {target!s}"
             )
-
-        template = RawFile(target).load()
-        query_entries = RawFile(input).load()
-
-        lines = []
-        for chromosome in template.grouped_entries:
-            for position in template.grouped_entries[chromosome]:
-                template_entries: set[RawEntry] = template.grouped_entries[chromosome][
-                    position
-                ]
-                query_entry = None
-                if chromosome not in query_entries.grouped_entries:
-                    query_entry = template.meta.undetermined
-                elif position not in query_entries.grouped_entries[chromosome]:
-                    query_entry = template.meta.undetermined
-                else:
-                    if len(query_entries.grouped_entries[chromosome][position]) == 0:
-                        raise RuntimeError(
-                            f"Bug: could not find a query entry for {chromosome} {position}"
-                        )
-                    entries = query_entries.grouped_entries[chromosome][position]
-                    entries = list(entries)
-                    query_entry = entries[0].result
-
-                for template_entry in template_entries:
-                    output_line = template.meta.output_format.format(
-                        id=template_entry.id,
-                        chromosome=template_entry.chromosome,
-                        position=template_entry.position,
-                        result=query_entry,
-                    )
-                    lines.append(output_line)
-
-        suffix = template.meta.file_extension
+        return self.convert_many(input, [target])[0]
+
+    def convert_many(
+        self,
+        input: Path,
+        templates: list[Path],
+        formatters: dict[Path, Formatter] = None,
+        outputs: dict[Path, Path] = None,
+        query: RawTable = None,
+    ) -> list[Path]:
+        """Convert a genotype file to many microarray formats.
+
+        The genotypes are loaded once and shared by all the templates. Every
+        template is then joined with them in a single sequential pass, as both
+        are sorted by chromosome and position.
+
+        Args:
+            input (Path): Genotypes (i.e., a combined kit).
+            templates (list[Path]): Templates to convert to.
+            formatters (dict[Path, Formatter], optional): Function formatting
+                the lines of a template (see MicroarrayLineFormatter). Defaults
+                to the output format in the metadata of the template.
+            outputs (dict[Path, Path], optional): Output file of a template.
+                Defaults to a file next to the input named after the template.
+            query (RawTable, optional): Genotypes already loaded. Defaults to
+                loading them from the input.
+
+        Raises:
+            FileNotFoundError: A template does not exist.
+
+        Returns:
+            list[Path]: Output files, in the same order as the templates.
+        """
+        formatters = formatters or {}
+        outputs = outputs or {}
+        for template in templates:
+            if not template.exists():
+                raise FileNotFoundError(
+                    f"Unable to find body file for microarray template at {template!s}"
+                )
+
+        if query is None:
+            query = RawFile(input).load_table()
+        return [
+            self._write(
+                input, template, query, formatters.get(template), outputs.get(template)
+            )
+            for template in templates
+        ]
+
+    def export(
+        self,
+        input: Path,
+        targets: list[MicroarrayConverterTarget],
+        query: RawTable = None,
+    ) -> list[Path]:
+        """Convert a genotype file to many microarray targets, loading the
+        genotypes only once.
+
+        The template of a target is `<target name>.txt.gz` in the templates
+        folder and its lines are formatted by MicroarrayLineFormatter.
+
+        Args:
+            input (Path): Genotypes (i.e., a combined kit).
+            targets (list[MicroarrayConverterTarget]): Targets to export.
+                MicroarrayConverterTarget.All selects every target with a
+                template.
+            query (RawTable, optional): Genotypes already loaded. Defaults to
+                loading them from the input.
+
+        Returns:
+            list[Path]: Output files, one for every target.
+        """
+        targets = self.get_targets(targets)
         stem = input.stem.replace("_CombinedKit", "")
-        output = input.with_name(f"{stem}_{target.name}{suffix}")
+        templates, formatters, outputs = [], {}, {}
+        for target in targets:
+            template = self.get_template(target)
+            formatter, extension = TARGET_FORMATTER_MAP[target]
+            templates.append(template)
+            formatters[template] = formatter
+            outputs[template] = input.with_name(
+                f"{stem}_{target.name}{extension.value}"
+            )
+        return self.convert_many(input, templates, formatters, outputs, query)
+
+    def get_targets(
+        self, targets: list[MicroarrayConverterTarget]
+    ) -> list[MicroarrayConverterTarget]:
+        """Targets that can be exported, as they have a formatter and a
+        template. MicroarrayConverterTarget.All is replaced by all of them, the
+        other targets are dropped with a warning.
+
+        Raises:
+            RuntimeError: None of the targets can be exported.
+        """
+        requested = list(targets)
+        if MicroarrayConverterTarget.All in requested:
+            requested = list(MicroarrayConverterTarget)
+        supported = [
+            x
+            for x in requested
+            if x in TARGET_FORMATTER_MAP and self.get_template(x).exists()
+        ]
+        if MicroarrayConverterTarget.All not in targets:
+            unsupported = [x.name for x in requested if x not in supported]
+            if len(unsupported) > 0:
+                logging.warning(
+                    f"Unable to export {', '.join(unsupported)}: format not supported"
+                    " or template not installed."
+                )
+        if len(supported) == 0:
+            raise RuntimeError(
+                "None of the selected microarray formats can be exported: install"
+                " their templates first."
+            )
+        return supported
+
+    def get_template(self, target: MicroarrayConverterTarget) -> Path:
+        return self._template_folder.joinpath(f"{target.name}.txt.gz")
+
+    def _write(
+        self,
+        input: Path,
+        target: Path,
+        query: RawTable,
+        formatter: Optional[Formatter],
+        output: Optional[Path],
+    ) -> Path:
+        with self.open_template(target) as template:
+            if output is None:
+                suffix = template.meta.file_extension
+                stem = input.stem.replace("_CombinedKit", "")
+                output = input.with_name(f"{stem}_{target.name}{suffix}")
+            if formatter is None:
+                output_format = template.meta.output_format
+
+                def formatter(id, chromosome, position, result):
+                    return output_format.format(
+                        id=id, chromosome=chromosome, position=position, result=result
+                    )
 
-        with output.open("a", newline="\n") as f:
-            f.writelines(template.comments)
-            f.writelines(lines)
+            with output.open("a", newline="\n", buffering=1024 * 1024) as f:
+                f.writelines(template.comments)
+                f.writelines(formatter(*x) for x in self._join(template, query))
         return output
+
+    def open_template(self, template: Path) -> Union[TemplateBundle, RawReader]:
+        """The compiled bundle of a template if it's up to date, the text
+        template otherwise."""
+        bundle = get_bundle_path(template)
+        if bundle.exists() and bundle.stat().st_mtime >= template.stat().st_mtime:
+            try:
+                return TemplateBundle(bundle)
+            except (RuntimeError, OSError) as e:
+                logging.warning(f"Ignoring the template bundle: {e!s}")
+        return RawFile(template).open()
+
+    def _join(
+        self, template: Union[TemplateBundle, RawReader], query: RawTable
+    ) -> Iterator[tuple[str, str, int, str]]:
+        """Result of the query for every entry of the template.
+
+        Both are sorted by chromosome and position, so they are walked together
+        in a single pass. A template that is not sorted is still handled, by
+        searching the query every time it goes back.
+        """
+        undetermined = template.meta.undetermined
+        canonical = {}
+        current = None
+        positions, results = [], []
+        cursor = previous = 0
+        for id, chromosome, position, _ in template:
+            if chromosome != current:
+                current = chromosome
+                if chromosome not in canonical:
+                    canonical[chromosome] = Converter.canonicalize(chromosome)
+                entries = query.get(canonical[chromosome])
+                positions = [] if entries is None else entries.positions
+                results = [] if entries is None else entries.results
+                cursor = bisect.bisect_left(positions, position)
+            elif position < previous:
+                cursor = bisect.bisect_left(positions, position)
+            previous = position
+
+            while cursor < len(positions) and positions[cursor] < position:
+                cursor += 1
+            if cursor < len(positions) and positions[cursor] == position:
+                yield id, chromosome, position, results[cursor]
+            else:
+                yield id, chromosome, position, undetermined
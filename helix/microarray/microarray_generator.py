@@ -1,26 +1,226 @@
+import gzip
+import logging
+from array import array
 from pathlib import Path
+from typing import Callable, Optional
 
+from helix.alignment_map.variant_caller import VariantCaller
+from helix.configuration import MANAGER_CFG
+from helix.data.microarray_converter import MicroarrayConverterTarget
+from helix.microarray.microarray_converter import MicroarrayConverter
+from helix.microarray.raw_file import MicroarrayMeta, RawChromosome, RawTable
+from helix.naming.converter import Converter
 from helix.reference.reference import Reference
-from helix.utility.external import External
+from helix.reference.reference_reader import ReferenceReader
+
+# Chromosomes with a single copy: their genotypes have a single letter.
+HAPLOID = ["Y", "M"]
+BASES = {"A", "C", "G", "T"}
 
 
 class MicroarrayGenerator:
+    """Generate microarray files from the variants called on an alignment map.
+
+    Only the positions found in the templates of the targets are kept while
+    the VCF is streamed, so its size doesn't matter. Positions of a template
+    without a variant are homozygous reference: their genotype is read from
+    the reference genome. Chromosomes without any variant (i.e., Y for a
+    female) are left undetermined.
+
+    Args:
+        vcf_file (Path): Variants, as called by VariantCaller.
+        reference (Reference): Reference genome of the variants.
+        caller (VariantCaller, optional): Called to create the VCF if it
+            does not exist. Defaults to None.
+        config (optional): Repository configuration, for the templates.
+        progress (Callable[[str, int], None], optional): Function that accepts
+            a status message and a percentage. Defaults to None.
+
+    Examples:
+        >>> generator = MicroarrayGenerator(vcf, reference)
+        >>> generator.do([MicroarrayConverterTarget.TwentyThreeAndMe_v5])
+    """
+
     def __init__(
-        self, vcf_file: Path, reference: Reference, external: External
+        self,
+        vcf_file: Path,
+        reference: Reference,
+        caller: VariantCaller = None,
+        config=MANAGER_CFG.REPOSITORY,
+        progress: Callable[[str, int], None] = None,
+        logger: logging.Logger = logging.getLogger(__name__),
     ) -> None:
         self.input = vcf_file
-        self._external = external
         self._reference = reference
+        self._caller = caller
+        self._config = config
+        self._progress = progress
+        self._logger = logger
+        self._is_quitting = False
+        self._calling = False
+
+    def do(
+        self,
+        targets: list[MicroarrayConverterTarget] = None,
+    ) -> list[Path]:
+        """Create a microarray file for every target.
+
+        Args:
+            targets (list[MicroarrayConverterTarget], optional): Targets to
+                generate. Defaults to every target with a template.
+
+        Raises:
+            FileNotFoundError: The VCF does not exist and there's no caller.
+            RuntimeError: None of the targets can be exported (checked before
+                calling the variants) or the reference genome is not available.
+
+        Returns:
+            list[Path]: Output files, one for every target. Empty if killed.
+        """
+        if targets is None:
+            targets = [MicroarrayConverterTarget.All]
+        converter = MicroarrayConverter(self._config)
+        targets = converter.get_targets(targets)
+        if not self.input.exists():
+            if self._caller is None:
+                raise FileNotFoundError(f"Unable to find the variants {self.input!s}")
+            self._calling = True
+            self._caller.run()
+            self._calling = False
+        if self._is_quitting:
+            return []
+
+        self._report("[1/4] Loading templates", 0)
+        sites = self._get_sites(converter, targets)
+        self._report("[2/4] Reading variants", 25)
+        calls = self._read_calls(sites)
+        if self._is_quitting:
+            return []
+        self._report("[3/4] Reading the reference", 50)
+        self._fill_reference(sites, calls)
+        if self._is_quitting:
+            return []
+        self._report("[4/4] Writing", 75)
+        # Only the extensions of the VCF are removed (i.e., sample.v2.vcf.gz
+        # gives sample.v2), and export() names the outputs after the stem.
+        name = self.input.name.removesuffix(".gz").removesuffix(".vcf")
+        outputs = converter.export(
+            self.input.with_name(name + ".vcf"), targets, self._to_table(calls)
+        )
+        self._report(None, None)
+        return outputs
+
+    def kill(self):
+        self._is_quitting = True
+        if self._calling:
+            self._caller.kill()
+
+    def _report(self, message: Optional[str], percentage: Optional[int]):
+        if self._progress is not None:
+            self._progress(message, percentage)
+
+    def _get_sites(
+        self, converter: MicroarrayConverter, targets: list[MicroarrayConverterTarget]
+    ) -> dict[str, set[int]]:
+        """Positions of all the templates, by canonical chromosome name."""
+        sites: dict[str, set[int]] = {}
+        for target in targets:
+            with converter.open_template(converter.get_template(target)) as template:
+                current = None
+                for _, chromosome, position, _ in template:
+                    if chromosome != current:
+                        current = chromosome
+                        canonical = Converter.canonicalize(chromosome)
+                        positions = sites.setdefault(canonical, set())
+                    positions.add(position)
+        return sites
+
+    def _read_calls(
+        self, sites: dict[str, set[int]]
+    ) -> dict[str, dict[int, Optional[str]]]:
+        """Genotypes of the variants at the positions of the templates, by
+        canonical chromosome name. Every chromosome with a variant is present,
+        even if none of its variants is in a template. A genotype is None if
+        it can't be represented in a microarray file (i.e., no-calls, InDels).
+        """
+        calls: dict[str, dict[int, Optional[str]]] = {}
+        # Chromosome name in the VCF -> positions to keep and genotypes found.
+        chromosomes: dict[str, tuple[set[int], dict[int, Optional[str]]]] = {}
+        if self.input.suffix == ".gz":
+            file = gzip.open(self.input, "rt")
+        else:
+            file = self.input.open("rt")
+        with file:
+            for count, line in enumerate(file):
+                if line.startswith("#"):
+                    continue
+                if count % 100000 == 0 and self._is_quitting:
+                    break
+                # Split the rest of the line only at the positions to keep.
+                chromosome, position, rest = line.split("\t", 2)
+                if chromosome not in chromosomes:
+                    canonical = Converter.canonicalize(chromosome)
+                    chromosomes[chromosome] = (
+                        sites.get(canonical, set()),
+                        calls.setdefault(canonical, {}),
+                    )
+                positions, found = chromosomes[chromosome]
+                position = int(position)
+                if position not in positions:
+                    continue
+                # A SNP and an InDel at the same position: keep the SNP.
+                if found.get(position) is None:
+                    found[position] = self._get_genotype(rest)
+        return calls
+
+    def _get_genotype(self, fields: str) -> Optional[str]:
+        # ID, REF, ALT, QUAL, FILTER, INFO, FORMAT and the first sample.
+        fields = fields.rstrip("\r\n").split("\t")
+        if len(fields) < 8:
+            return None
+        keys = fields[6].split(":")
+        if "GT" not in keys:
+            return None
+        genotype = fields[7].split(":")[keys.index("GT")]
+        alleles = [fields[1], *fields[2].split(",")]
+        bases = []
+        for index in genotype.replace("|", "/").split("/"):
+            if not index.isdigit() or int(index) >= len(alleles):
+                return None
+            base = alleles[int(index)].upper()
+            if base not in BASES:
+                return None
+            bases.append(base)
+        return "".join(sorted(bases))
+
+    def _fill_reference(
+        self, sites: dict[str, set[int]], calls: dict[str, dict[int, Optional[str]]]
+    ):
+        """Set the positions of the templates without variants to the
+        homozygous reference genotype."""
+        genome = self._reference.ready_reference
+        if genome is None:
+            raise RuntimeError("The reference genome is not available")
+        with ReferenceReader(genome) as reader:
+            for chromosome, found in calls.items():
+                sequence = reader.find_sequence(chromosome)
+                if sequence is None:
+                    continue
+                missing = [x for x in sites.get(chromosome, []) if x not in found]
+                bases = reader.get_bases(sequence, [x - 1 for x in missing])
+                copies = 1 if chromosome in HAPLOID else 2
+                for position, base in zip(missing, bases):
+                    if base is not None and base.upper() in BASES:
+                        found[position] = base.upper() * copies
 
-    def do(self):
-        # output = ""
-        # destination = ""
-        # tabix_opt = f"-p vcf {self.input}"
-        # bcftools_opt = f"annotate -Oz -a
-        # {self._reference.ready_reference} -c CHROM,POS,ID {self.input}"
-        # bcftools_opt = (
-        # f"query -f '%ID\tCHROM\t%POS[\t%TGT\n' {output} -o {destination} "
-        # )
-        pass
-
-    # VCF -> Indexing -> Annotate -> Indexing -> Query
+    def _to_table(self, calls: dict[str, dict[int, Optional[str]]]) -> RawTable:
+        chromosomes = {}
+        for chromosome, found in calls.items():
+            positions = sorted(x for x, y in found.items() if y is not None)
+            chromosomes[chromosome] = RawChromosome(
+                array("q", positions),
+                ["."] * len(positions),
+                [chromosome] * len(positions),
+                [found[x] for x in positions],
+            )
+        return RawTable(chromosomes, [], MicroarrayMeta())
@@ -51,6 +51,9 @@ class MicroarrayLineFormatter:
         map_results = {"--": "00", "CT": "TC", "GT": "TG"}
         if result in map_results:
             result = map_results[result]
+        # Haploid calls (Y, MT) have a single letter: Ancestry repeats it.
+        if len(result) == 1:
+            result = result * 2
         return f"{id}\t{chromosome}\t{position}\t{result[0]}\t{result[1]}\n"
 
     @target(MicroarrayConverterTarget.MyHeritage_v1, MicroarrayConverterExtensions.CSV)
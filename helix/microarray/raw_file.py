@@ -1,11 +1,17 @@
+import bisect
 import gzip
+import itertools
 import logging
+import re
+import string
+import sys
+from array import array
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
-from parse import parse
 from pydantic import BaseModel
 
+from helix.naming.contig_order import ContigOrder
 from helix.naming.converter import Converter
 
 
@@ -40,6 +46,211 @@ class ParsedMicroarrayFile(BaseModel):
     meta: Optional[MicroarrayMeta] = None
 
 
+class RawChromosome:
+    """Entries of a chromosome, sorted by position.
+
+    Entries are stored column by column (positions in an array, strings in
+    lists) instead of one object per entry.
+    """
+
+    def __init__(
+        self,
+        positions: array,
+        ids: list[str],
+        chromosomes: list[str],
+        results: list[Optional[str]],
+    ) -> None:
+        self.positions = positions
+        self.ids = ids
+        # Name of the chromosome as it appears in the file.
+        self.chromosomes = chromosomes
+        self.results = results
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __iter__(self) -> Iterator[tuple[str, str, int, Optional[str]]]:
+        """Id, chromosome, position and result of every entry."""
+        return zip(self.ids, self.chromosomes, self.positions, self.results)
+
+    def find(self, position: int) -> range:
+        """Indexes of the entries at a position."""
+        start = bisect.bisect_left(self.positions, position)
+        end = bisect.bisect_right(self.positions, position, lo=start)
+        return range(start, end)
+
+
+class RawTable:
+    """Entries of a microarray file, grouped by canonical chromosome name."""
+
+    def __init__(
+        self,
+        chromosomes: dict[str, RawChromosome],
+        comments: list[str],
+        meta: MicroarrayMeta,
+    ) -> None:
+        self.chromosomes = chromosomes
+        self.comments = comments
+        self.meta = meta
+        self._order = ContigOrder(chromosomes.keys())
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.chromosomes.values())
+
+    def __iter__(self) -> Iterator[tuple[str, RawChromosome]]:
+        """Chromosomes in canonical order (see Converter.sort)."""
+        for name in self._order:
+            yield name, self.chromosomes[name]
+
+    def get(self, chromosome: str) -> Optional[RawChromosome]:
+        return self.chromosomes.get(chromosome)
+
+
+def compile_format(
+    input_format: str,
+) -> tuple[list[str], Callable[[str], Optional[list[str]]]]:
+    """Compile a format string (i.e., "{id}\\t{chromosome}\\t{position}\\n") into
+    a function splitting a line into the values of its fields.
+
+    Formats where all the fields are divided by the same separator are split
+    with str.split(), the others with a regular expression.
+
+    Args:
+        input_format (str): Format string.
+
+    Returns:
+        tuple[list[str], Callable[[str], Optional[list[str]]]]: Name of the
+            fields and the function, which returns the value of every field or
+            None if the line doesn't match the format.
+    """
+    pieces = list(string.Formatter().parse(input_format))
+    fields = [x[1] for x in pieces if x[1] is not None]
+    literals = [x[0] for x in pieces]
+    suffix = literals[-1] if pieces[-1][1] is None else ""
+    count = len(fields)
+    separators = literals[1:count]
+    specs = [x[2] for x in pieces if x[1] is not None]
+
+    if (
+        literals[0] == ""
+        and suffix in ["", "\n"]
+        and len(set(separators)) == 1
+        and separators[0] != ""
+        and all(x == "" for x in specs)
+    ):
+        separator = separators[0]
+
+        def split(line: str) -> Optional[list[str]]:
+            values = line.rstrip("\r\n").split(separator, count - 1)
+            return values if len(values) == count else None
+
+        return fields, split
+
+    pattern = ""
+    for literal, field, spec, _ in pieces:
+        pattern += re.escape(literal.rstrip("\n") if field is None else literal)
+        if field is not None:
+            pattern += r"([-+]?\d+)" if spec == "d" else "(.+?)"
+    regex = re.compile(pattern)
+
+    def match(line: str) -> Optional[list[str]]:
+        matched = regex.fullmatch(line.rstrip("\r\n"))
+        return None if matched is None else list(matched.groups())
+
+    return fields, match
+
+
+class RawReader:
+    """Stream the entries of a microarray file, in file order.
+
+    Comments and metadata are read when the reader is opened, so that they
+    are available before the entries.
+
+    Args:
+        raw_file (RawFile): File to read.
+
+    Raises:
+        RuntimeError: The input format has no id, chromosome or position.
+
+    Examples:
+        >>> with RawFile(Path("kit.txt")).open() as reader:
+        >>>     for id, chromosome, position, result in reader:
+        >>>         ...
+    """
+
+    def __init__(self, raw_file: "RawFile") -> None:
+        self._raw_file = raw_file
+        self.comments: list[str] = []
+        self._file = None
+        self._first: Optional[str] = None
+
+    @property
+    def meta(self) -> MicroarrayMeta:
+        return self._raw_file.meta
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        self._file = self._raw_file.open_file()
+        self._first = self._raw_file._read_header(self._file, self.comments)
+        self._raw_file._set_extension()
+        self._fields, self._split = compile_format(self.meta.input_format)
+        for field in ["id", "chromosome", "position"]:
+            if field not in self._fields:
+                self.close()
+                raise RuntimeError(
+                    f"Invalid input format for {self._raw_file.path!s}: "
+                    f"missing {field}"
+                )
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __iter__(self) -> Iterator[tuple[str, str, int, Optional[str]]]:
+        """Id, chromosome (as it appears in the file), position and result of
+        every valid entry."""
+        split = self._split
+        id_index = self._fields.index("id")
+        chromosome_index = self._fields.index("chromosome")
+        position_index = self._fields.index("position")
+        result_index = (
+            self._fields.index("result") if "result" in self._fields else None
+        )
+        strings: dict[Optional[str], Optional[str]] = {None: None}
+
+        skip = self.meta.skip
+        lines = self._file
+        if self._first is not None:
+            lines = itertools.chain([self._first], lines)
+        for line in lines:
+            if skip > 0:
+                skip -= 1
+                continue
+            values = split(line)
+            try:
+                position = int(values[position_index])
+            except (TypeError, ValueError):
+                self._raw_file._logger.warning(
+                    f"Found invalid line in {self._raw_file.path!s}: "
+                    f"{self.meta.input_format!r}!={line!r}"
+                )
+                continue
+            chromosome = values[chromosome_index]
+            result = None if result_index is None else values[result_index]
+            yield (
+                sys.intern(values[id_index]),
+                strings.setdefault(chromosome, chromosome),
+                position,
+                strings.setdefault(result, result),
+            )
+
+
 class RawFile:
     def __init__(self, path: Path) -> None:
         self.path = path
@@ -50,75 +261,112 @@ class RawFile:
         else:
             self.open_file = lambda: self.path.open("rt")
 
-    def load(self) -> ParsedMicroarrayFile:
-        grouped: dict[str, dict[int, set[RawEntry]]] = dict()
-        meta: MicroarrayMeta = None
-        comments = []
-
-        # Comments are only at the beginning of the file: Parse the
-        # comments and do another cycle to to parse the rest to avoid
-        # the overhead of these intial if line.startswith() which are
-        # REALLY slow (Python 3.12).
-        with self.open_file() as file:
-            for line in file:
-                if line.startswith("##"):
-                    line = line.removeprefix("##")
-                    if meta is not None:
-                        self._logger.warning(
-                            f"Duplicate metadata line found in {self.path!s}"
-                        )
-                    meta = MicroarrayMeta.model_validate_json(line)
-                    continue
-                elif line.startswith("#"):
-                    comments.append(line)
-                    continue
-                else:
-                    break
-            canonicalized = {}
-            index = 0
-            # If no metadata was found, just create a default object
-            if meta is not None:
-                self.meta = meta
-
-            for line in file:
-                if index < self.meta.skip:
-                    index += 1
-                    continue
-                break
+    def open(self) -> "RawReader":
+        """Open the file to stream its entries (see RawReader)."""
+        reader = RawReader(self)
+        reader.open()
+        return reader
 
-            for line in file:
-                parsed = parse(self.meta.input_format, line)
-                if parsed is None:
+    def load_table(self) -> RawTable:
+        """Load the file, with entries sorted by chromosome and position.
+
+        Raises:
+            RuntimeError: The input format has no id, chromosome or position.
+
+        Returns:
+            RawTable: Entries, comments and metadata of the file.
+        """
+        # Raw chromosome name -> positions, ids and results.
+        columns: dict[str, tuple[list[int], list[str], list[Optional[str]]]] = {}
+        with self.open() as reader:
+            for id, chromosome, position, result in reader:
+                if chromosome not in columns:
+                    columns[chromosome] = ([], [], [])
+                positions, ids, results = columns[chromosome]
+                positions.append(position)
+                ids.append(id)
+                results.append(result)
+        return RawTable(self._sort(columns), reader.comments, self.meta)
+
+    def _read_header(self, file, comments: list[str]) -> Optional[str]:
+        # Comments are only at the beginning of the file. Return the first
+        # line that is not a comment, if any.
+        meta: MicroarrayMeta = None
+        for line in file:
+            if line.startswith("##"):
+                if meta is not None:
                     self._logger.warning(
-                        f"Found invalid line in {self.path!s}: {self.meta.input_format}!={line}"
+                        f"Duplicate metadata line found in {self.path!s}"
                     )
-                    continue
+                meta = MicroarrayMeta.model_validate_json(line.removeprefix("##"))
+            elif line.startswith("#"):
+                comments.append(line)
+            else:
+                break
+        else:
+            line = None
+        # If no metadata was found, keep the default object
+        if meta is not None:
+            self.meta = meta
+        return line
 
-                entry = RawEntry(
-                    id=parsed["id"],
-                    chromosome=parsed["chromosome"],
-                    position=parsed["position"],
-                    result=parsed["result"] if "result" in parsed else None,
-                )
-                if entry.chromosome not in canonicalized:
-                    canonicalized[entry.chromosome] = Converter.canonicalize(
-                        entry.chromosome
-                    )
-                chromosome = canonicalized[entry.chromosome]
-                if chromosome not in grouped:
-                    grouped[chromosome] = dict()
-                if entry.position not in grouped[chromosome]:
-                    grouped[chromosome][entry.position] = set()
-                grouped[chromosome][entry.position].add(entry)
+    def _sort(self, columns) -> dict[str, RawChromosome]:
+        # Different names of the same chromosome (i.e., "chr1" and "1") are
+        # grouped together.
+        canonical: dict[str, list[str]] = {}
+        for name, converted in zip(columns, Converter.canonicalize_many(columns)):
+            canonical.setdefault(converted, []).append(name)
 
+        chromosomes = {}
+        for name, raw_names in canonical.items():
+            positions, ids, names, results = [], [], [], []
+            for raw_name in raw_names:
+                positions.extend(columns[raw_name][0])
+                ids.extend(columns[raw_name][1])
+                names.extend([sys.intern(raw_name)] * len(columns[raw_name][0]))
+                results.extend(columns[raw_name][2])
+
+            # Stable sort: entries at the same position keep the file order.
+            # Identical entries are kept only once.
+            order = sorted(range(len(positions)), key=positions.__getitem__)
+            unique = []
+            seen = set()
+            for index, item in enumerate(order):
+                if index > 0 and positions[item] != positions[order[index - 1]]:
+                    seen.clear()
+                key = (ids[item], names[item], results[item])
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(item)
+
+            chromosomes[name] = RawChromosome(
+                array("q", (positions[x] for x in unique)),
+                [ids[x] for x in unique],
+                [names[x] for x in unique],
+                [results[x] for x in unique],
+            )
+        return chromosomes
+
+    def _set_extension(self):
         if self.meta.file_extension is None:
             if len(self.path.suffixes) > 1 and self.path.suffixes[-1] == ".gz":
                 self.meta.file_extension = self.path.suffixes[-2]
             elif len(self.path.suffixes) > 0:
                 self.meta.file_extension = self.path.suffixes[-1]
 
+    def load(self) -> ParsedMicroarrayFile:
+        table = self.load_table()
+        grouped: dict[str, dict[int, set[RawEntry]]] = dict()
+        for name, chromosome in table:
+            positions = grouped.setdefault(name, dict())
+            for id, raw_name, position, result in chromosome:
+                positions.setdefault(position, set()).add(
+                    RawEntry(
+                        id=id, chromosome=raw_name, position=position, result=result
+                    )
+                )
         return ParsedMicroarrayFile(
             grouped_entries=grouped,
-            comments=comments,
-            meta=self.meta,
+            comments=table.comments,
+            meta=table.meta,
         )
@@ -0,0 +1,260 @@
+import sys
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import Iterator, Optional
+
+from helix.microarray.raw_file import MicroarrayMeta, RawTable
+
+BUNDLE_MAGIC = b"HXMT"
+BUNDLE_VERSION = 2
+BUNDLE_SUFFIX = ".hxt"
+
+# Magic, version, then the number of strings, chromosomes and entries and the
+# size of the metadata and of the comments.
+_HEADER = struct.Struct("<4sHxxIIQII")
+# Canonical name (string), first entry and number of entries of a chromosome.
+_CHROMOSOME = struct.Struct("<IQQ")
+_NONE = 0xFFFFFFFF
+
+
+def _align(position: int) -> int:
+    return position + -position % 8
+
+
+def get_bundle_path(template: Path) -> Path:
+    """Bundle compiled from a text template (i.e., v5.txt.gz -> v5.hxt)."""
+    return template.with_name(
+        template.name.removesuffix("".join(template.suffixes)) + BUNDLE_SUFFIX
+    )
+
+
+class TemplateBundle:
+    """Compiled, memory mapped microarray template.
+
+    A bundle contains the metadata and the comments of a template, ready to
+    be used, and its entries sorted by chromosome and position, stored column
+    by column: positions, then ids, chromosome names and results (as indexes
+    in a table of strings). Opening it costs nothing and reading it doesn't
+    need any parsing.
+
+    Args:
+        path (Path): Bundle file.
+
+    Raises:
+        RuntimeError: The file is not a bundle, its version is not supported or
+            it's truncated.
+
+    Examples:
+        >>> TemplateBundle.compile(RawFile(Path("v5.txt")).load_table(), bundle)
+        >>> with TemplateBundle(bundle) as template:
+        >>>     for id, chromosome, position, result in template:
+        >>>         ...
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.meta: MicroarrayMeta = None
+        self.comments: list[str] = []
+        self._file = None
+        self._map: mmap.mmap = None
+        self.open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.entry_count
+
+    def open(self):
+        self._file = self.path.open("rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_layout()
+        except (ValueError, struct.error) as e:
+            # Empty (can't be mapped) or truncated files, invalid metadata.
+            self.close()
+            raise RuntimeError(
+                f"{self.path!s} is not a valid template bundle: {e!s}"
+            ) from e
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_layout(self):
+        (
+            magic,
+            version,
+            self.string_count,
+            self.chromosome_count,
+            self.entry_count,
+            meta_size,
+            comments_size,
+        ) = _HEADER.unpack_from(self._map)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError(f"unknown format or version (not {BUNDLE_VERSION})")
+
+        position = _HEADER.size
+        end = position + meta_size
+        self.meta = MicroarrayMeta.model_validate_json(self._map[position:end])
+        position, end = end, end + comments_size
+        self.comments = str(self._map[position:end], "utf8").splitlines(keepends=True)
+        position = _align(end)
+
+        self._chromosomes = position
+        position = _align(position + _CHROMOSOME.size * self.chromosome_count)
+        # Arrays are 8 bytes aligned, as they are padded after the metadata,
+        # the comments and the table of the chromosomes.
+        self._positions = position
+        position += 8 * self.entry_count
+        self._string_offsets = position
+        position += 8 * (self.string_count + 1)
+        self._ids = position
+        position += 4 * self.entry_count
+        self._names = position
+        position += 4 * self.entry_count
+        self._results = position
+        position += 4 * self.entry_count
+        self._blob = position
+        if len(self._map) < self._blob:
+            raise ValueError("the file is truncated")
+        (size,) = struct.unpack_from(
+            "<Q", self._map, self._string_offsets + 8 * self.string_count
+        )
+        if len(self._map) < self._blob + size:
+            raise ValueError("the file is truncated")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __iter__(self) -> Iterator[tuple[str, str, int, Optional[str]]]:
+        """Id, chromosome, position and result of every entry, sorted by
+        chromosome and position."""
+        positions = self._view(self._positions, self.entry_count, "q")
+        ids = self._view(self._ids, self.entry_count, "I")
+        names = self._view(self._names, self.entry_count, "I")
+        results = self._view(self._results, self.entry_count, "I")
+        offsets = self._view(self._string_offsets, self.string_count + 1, "Q")
+        data = self._map
+        blob = self._blob
+        # Chromosome names and results repeat a lot: decode them only once.
+        strings: dict[int, Optional[str]] = {_NONE: None}
+        try:
+            for index in range(self.entry_count):
+                id = ids[index]
+                name = names[index]
+                result = results[index]
+                if name not in strings:
+                    strings[name] = self.get_string(name)
+                if result not in strings:
+                    strings[result] = self.get_string(result)
+                start = blob + offsets[id]
+                end = blob + offsets[id + 1]
+                yield (
+                    str(data[start:end], "utf8"),
+                    strings[name],
+                    positions[index],
+                    strings[result],
+                )
+        finally:
+            # Release the views before the map can be closed.
+            positions.release()
+            ids.release()
+            names.release()
+            results.release()
+            offsets.release()
+
+    def get_chromosomes(self) -> dict[str, range]:
+        """Entries of every chromosome, by canonical name."""
+        chromosomes = {}
+        for index in range(self.chromosome_count):
+            name, start, count = _CHROMOSOME.unpack_from(
+                self._map, self._chromosomes + _CHROMOSOME.size * index
+            )
+            chromosomes[self.get_string(name)] = range(start, start + count)
+        return chromosomes
+
+    def get_string(self, index: int) -> Optional[str]:
+        if index == _NONE:
+            return None
+        start, end = struct.unpack_from(
+            "<QQ", self._map, self._string_offsets + 8 * index
+        )
+        start, end = self._blob + start, self._blob + end
+        return str(self._map[start:end], "utf8")
+
+    def _view(self, offset: int, count: int, format: str) -> memoryview:
+        end = offset + struct.calcsize(format) * count
+        return memoryview(self._map)[offset:end].cast(format)
+
+    @staticmethod
+    def compile(table: RawTable, path: Path):
+        """Compile a loaded template into a bundle.
+
+        Args:
+            table (RawTable): Template to compile.
+            path (Path): Output bundle.
+        """
+        strings: dict[str, int] = {}
+
+        def intern(value: Optional[str]) -> int:
+            if value is None:
+                return _NONE
+            return strings.setdefault(value, len(strings))
+
+        chromosomes = bytearray()
+        positions = array("q")
+        ids = array("I")
+        names = array("I")
+        results = array("I")
+        for name, entries in table:
+            chromosomes += _CHROMOSOME.pack(intern(name), len(positions), len(entries))
+            positions.extend(entries.positions)
+            ids.extend(intern(x) for x in entries.ids)
+            names.extend(intern(x) for x in entries.chromosomes)
+            results.extend(intern(x) for x in entries.results)
+
+        encoded = [x.encode("utf8") for x in strings]
+        offsets = array("Q", [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        meta = table.meta.model_dump_json().encode("utf8")
+        comments = "".join(table.comments).encode("utf8")
+
+        data = bytearray()
+        data += _HEADER.pack(
+            BUNDLE_MAGIC,
+            BUNDLE_VERSION,
+            len(encoded),
+            len(chromosomes) // _CHROMOSOME.size,
+            len(positions),
+            len(meta),
+            len(comments),
+        )
+        data += meta
+        data += comments
+        data += bytes(_align(len(data)) - len(data))
+        data += chromosomes
+        data += bytes(_align(len(data)) - len(data))
+        for column in [positions, offsets, ids, names, results]:
+            if column.itemsize != struct.calcsize(column.typecode):
+                raise RuntimeError(f"Unexpected size of {column.typecode} arrays")
+            if sys.byteorder != "little":
+                column.byteswap()
+            data += column.tobytes()
+        data += b"".join(encoded)
+
+        # Write and rename, so that a reader never sees a partial bundle.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = Path(str(path) + ".tmp")
+        temporary.write_bytes(data)
+        temporary.replace(path)
@@ -5,7 +5,7 @@ import sys
 from typing import Callable
 
 from helix.microarray.raw_file import RawFile
-from helix.naming.converter import Converter
+from helix.microarray.template_bundle import TemplateBundle, get_bundle_path
 
 
 class TemplatesImporter:
@@ -24,21 +24,21 @@ class TemplatesImporter:
                 f"Unable to find body file for microarray template at {input!s}"
             )
 
-        rawfile = RawFile(input)
-        template = rawfile.load()
+        template = RawFile(input).load_table()
+        input_format = template.meta.input_format
 
-        entries = []
         with gzip.open(target, "wt") as file:
-            if template.meta is not None:
-                file.write(f"##{template.meta.model_dump_json()}\n")
+            file.write(f"##{template.meta.model_dump_json()}\n")
             file.writelines(template.comments)
-            for chromosome in Converter.sort(list(template.grouped_entries.keys())):
-                ordered_positions = list(template.grouped_entries[chromosome].keys())
-                ordered_positions.sort()
-                for position in ordered_positions:
-                    entries = template.grouped_entries[chromosome][position]
-                    for entry in entries:
-                        file.write(template.meta.input_format.format(**entry.__dict__))
+            for _, entries in template:
+                file.writelines(
+                    input_format.format(
+                        id=id, chromosome=chromosome, position=position, result=result
+                    )
+                    for id, chromosome, position, result in entries
+                )
+        # The converter reads the compiled bundle, the text is for humans.
+        TemplateBundle.compile(template, get_bundle_path(target))
         return target
 
 
@@ -0,0 +1,65 @@
+from typing import Any, Callable, Iterable, Iterator
+
+from helix.naming.converter import Converter
+
+
+class ContigOrder:
+    """Order of the sequences of a header (or of a dictionary, a template...),
+    computed once.
+
+    Every name gets an integer rank, so sorting records by sequence doesn't
+    convert any name. Names that are not part of the order go last.
+
+    Args:
+        names (Iterable[str]): Sequence names.
+        others (bool, optional): Keep other sequences and unmapped reads
+            (see Converter.sort). Defaults to True.
+
+    Examples:
+        >>> order = ContigOrder(x.name for x in header.sequences.values())
+        >>> order.sort(rows, lambda x: x[0], lambda x: x[1])
+    """
+
+    def __init__(self, names: Iterable[str], others: bool = True) -> None:
+        self.names: list[str] = Converter.sort(dict.fromkeys(names), others)
+        self.ranks: dict[str, int] = {x: i for i, x in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ranks
+
+    def rank(self, name: str) -> int:
+        return self.ranks.get(name, len(self.names))
+
+    def sort(
+        self,
+        items: Iterable[Any],
+        contig: Callable[[Any], str] = None,
+        position: Callable[[Any], int] = None,
+    ) -> list:
+        """Sort records by sequence and, optionally, by position.
+
+        Args:
+            items (Iterable[Any]): Records to sort.
+            contig (Callable[[Any], str], optional): Sequence name of a record.
+                Defaults to the record itself.
+            position (Callable[[Any], int], optional): Position of a record.
+                Defaults to None, keeping the order within a sequence.
+
+        Returns:
+            list: Sorted records.
+        """
+        ranks, last = self.ranks, len(self.names)
+        if contig is None:
+
+            def contig(x):
+                return x
+
+        if position is None:
+            return sorted(items, key=lambda x: ranks.get(contig(x), last))
+        return sorted(items, key=lambda x: (ranks.get(contig(x), last), position(x)))
@@ -1,4 +1,6 @@
-from typing import Iterable
+import functools
+from typing import Iterable, Optional
+
 from helix.data.chromosome_name_type import ChromosomeNameType
 from helix.data.sequence_type import SequenceType
 from helix.naming.lookup_tables import (
@@ -12,6 +14,54 @@ from helix.naming.lookup_tables import (
     REFSEQ_TO_NUMBER,
 )
 
+# Names seen in a run are few (sequences of a header, chromosomes of a file)
+# but they are converted over and over.
+_CACHE_SIZE = 1 << 16
+
+
+class _PrefixTrie:
+    """Find which key of a lookup table a string starts with, walking the
+    string once instead of trying every key.
+
+    Args:
+        tables (list[dict[str, str]]): Lookup tables. Keys are unique and no
+            key is a prefix of another one.
+    """
+
+    def __init__(self, tables: list[dict[str, str]]) -> None:
+        self._root: dict = {}
+        for table in tables:
+            for key, value in table.items():
+                node = self._root
+                for character in key:
+                    node = node.setdefault(character, {})
+                node[None] = value
+
+    def find(self, text: str) -> Optional[str]:
+        """Value of the key `text` starts with, None if there's none."""
+        node = self._root
+        for character in text:
+            node = node.get(character)
+            if node is None:
+                return None
+            if None in node:
+                return node[None]
+        return None
+
+
+_TYPE_ORDER = {
+    SequenceType.Autosome: 0,
+    SequenceType.X: 1,
+    SequenceType.Y: 2,
+    SequenceType.Mitochondrial: 3,
+    SequenceType.Other: 4,
+    SequenceType.Unmapped: 5,
+}
+
+_REFSEQ_TRIE = _PrefixTrie([REFSEQ_TO_NUMBER, REFSEQ_T2T_TO_NUMBER])
+_GENBANK_TRIE = _PrefixTrie([GENBANK_TO_NUMBER])
+_GENBANK_T2T_TRIE = _PrefixTrie([GENBANK_T2T_TO_NUMBER])
+
 
 class Converter:
     def canonicalize(sequence_name: str) -> str:
@@ -31,6 +81,21 @@ class Converter:
         """
         return Converter.convert(sequence_name, ChromosomeNameType.Number)
 
+    def canonicalize_many(sequence_names: Iterable[str]) -> list[str]:
+        """Canonicalize many sequence names, converting every distinct name
+        once (see canonicalize).
+
+        Args:
+            sequence_names (Iterable[str]): Sequences to convert.
+
+        Returns:
+            list[str]: Converted names, in the same order.
+        """
+        names = list(sequence_names)
+        converted = {x: Converter.canonicalize(x) for x in dict.fromkeys(names)}
+        return [converted[x] for x in names]
+
+    @functools.lru_cache(maxsize=_CACHE_SIZE)
     def get_type(sequence_name: str) -> SequenceType:
         canonical_name = Converter.canonicalize(sequence_name)
         if canonical_name.isnumeric():
@@ -45,29 +110,37 @@ class Converter:
             return SequenceType.Unmapped
         return SequenceType.Other
 
+    @functools.lru_cache(maxsize=_CACHE_SIZE)
+    def get_sort_key(sequence_name: str) -> tuple[int, int]:
+        """Key sorting sequences as Converter.sort does: autosomes by number,
+        then X, Y, mitochondrial, other sequences and unmapped reads."""
+        sequence_type = Converter.get_type(sequence_name)
+        if sequence_type == SequenceType.Autosome:
+            return _TYPE_ORDER[sequence_type], int(
+                Converter.canonicalize(sequence_name)
+            )
+        return _TYPE_ORDER[sequence_type], 0
+
     def sort(sequence_names: Iterable[str], others: bool = True) -> list[str]:
-        name_type_map = {x: [] for x in SequenceType}
-        for name in sequence_names:
-            name_type_map[Converter.get_type(name)].append(name)
-
-        ordered = [x for x in name_type_map[SequenceType.Autosome]]
-        ordered.sort(key=lambda x: int(Converter.canonicalize(x)))
-        ordered.extend(name_type_map[SequenceType.X])
-        ordered.extend(name_type_map[SequenceType.Y])
-        ordered.extend(name_type_map[SequenceType.Mitochondrial])
-        if others:
-            ordered.extend(name_type_map[SequenceType.Other])
-            ordered.extend(name_type_map[SequenceType.Unmapped])
-        return ordered
-
-    def _find_in_table(input, table):
-        normalized = input
-        for key in table:
-            if input.startswith(key):
-                normalized = table[key]
-                break
-        return normalized
+        """Sort sequence names (see get_sort_key). Sequences of the same
+        type that are not autosomes keep their order.
+
+        Args:
+            sequence_names (Iterable[str]): Sequences to sort.
+            others (bool, optional): Keep other sequences and unmapped reads.
+                Defaults to True.
+
+        Returns:
+            list[str]: Sorted names.
+        """
+        if not others:
+            excluded = SequenceType.Other | SequenceType.Unmapped
+            sequence_names = [
+                x for x in sequence_names if Converter.get_type(x) not in excluded
+            ]
+        return sorted(sequence_names, key=Converter.get_sort_key)
 
+    @functools.lru_cache(maxsize=_CACHE_SIZE)
     def convert(input: str, target: ChromosomeNameType) -> str:
         # Chr to Number (e.g., chr1 -> 1; chrMT->MT)
         normalized = input.upper()
@@ -80,13 +153,15 @@ class Converter:
             normalized = normalized.replace("MT", "M", 1)
 
         #  Accession to Number (e.g., NC_000001 -> 1)
+        trie = None
         if input.startswith("NC_"):
-            normalized = Converter._find_in_table(normalized, REFSEQ_TO_NUMBER)
-            normalized = Converter._find_in_table(normalized, REFSEQ_T2T_TO_NUMBER)
+            trie = _REFSEQ_TRIE
         elif input.startswith("CM") or input.startswith("J"):
-            normalized = Converter._find_in_table(normalized, GENBANK_TO_NUMBER)
+            trie = _GENBANK_TRIE
         elif input.startswith("CP"):
-            normalized = Converter._find_in_table(normalized, GENBANK_T2T_TO_NUMBER)
+            trie = _GENBANK_T2T_TRIE
+        if trie is not None:
+            normalized = trie.find(normalized) or normalized
 
         # Convert from Number format to target
         normalized = normalized.upper()
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import logging
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import Optional
+
+CATALOG_MAGIC = b"HXGC"
+CATALOG_VERSION = 2
+
+# Magic, version, mtime (ns), size and MD5 of the JSON the catalog was compiled
+# from, then the number of strings, genomes and sequences and the attributes of
+# every genome (a string).
+_HEADER = struct.Struct("<4sHxxQQ16sIIII")
+# Offset of the mtime and size in the header.
+_STAMP = struct.Struct("<QQ")
+_STAMP_OFFSET = 8
+# Name (string), MD5 (string), length.
+_SEQUENCE = struct.Struct("<IIQ")
+# First sequence and number of sequences of a genome.
+_RANGE = struct.Struct("<II")
+_NONE = 0xFFFFFFFF
+
+
+class GenomeCatalog:
+    """Compiled, memory mapped version of references.json.
+
+    The catalog is a packed binary table of every sequence of every genome,
+    with all the strings (names, MD5s) stored only once, so that the sequences
+    of a genome can be read only when they are needed. The file is compiled
+    the first time it's opened and compiled again only when the modification
+    time (or the content, if the modification time changed) of the JSON it was
+    created from changes.
+
+    Args:
+        source (Path): references.json to compile.
+        path (Path): Where to store the compiled catalog.
+
+    Examples:
+        >>> with GenomeCatalog(Path("references.json"), Path("references.cat")) as c:
+        >>>     for index, genome in enumerate(c.get_genomes()):
+        >>>         sequences = c.get_sequences(index)
+    """
+
+    def __init__(self, source: Path, path: Path) -> None:
+        self.source = source
+        self.path = path
+        self._logger = logging.getLogger(__name__)
+        self._map: mmap.mmap = None
+        self._strings: list[Optional[str]] = []
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        if not self._is_current():
+            self.compile()
+        # The map keeps its own handle: the file can be closed right away.
+        with self.path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            _,
+            _,
+            _,
+            _,
+            _,
+            self.string_count,
+            self.genome_count,
+            self.sequence_count,
+            self._attributes,
+        ) = _HEADER.unpack_from(self._map)
+        self._strings = [None] * self.string_count
+
+        position = _HEADER.size
+        self._string_offsets = self._view(position, self.string_count + 1, "Q")
+        position += 8 * (self.string_count + 1)
+        self._ranges = position
+        position += _RANGE.size * self.genome_count
+        self._sequences = position
+        position += _SEQUENCE.size * self.sequence_count
+        self._blob = position
+
+    def close(self):
+        # Release the view before closing the map it points to.
+        self._string_offsets = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def get_genomes(self) -> list[dict]:
+        """Attributes of every genome, except their sequences."""
+        return json.loads(self.get_string(self._attributes))
+
+    def get_sequence_range(self, genome: int) -> Optional[range]:
+        """Indexes of the sequences of a genome, None if they are unknown."""
+        offset = self._ranges + _RANGE.size * genome
+        start, count = _RANGE.unpack_from(self._map, offset)
+        if start == _NONE:
+            return None
+        return range(start, start + count)
+
+    def get_sequences(self, genome: int) -> Optional[list[tuple[str, int, str]]]:
+        """Name, length and MD5 of every sequence of a genome, None if unknown."""
+        sequences = self.get_sequence_range(genome)
+        if sequences is None:
+            return None
+        start = self._sequences + _SEQUENCE.size * sequences.start
+        end = self._sequences + _SEQUENCE.size * sequences.stop
+        get_string = self.get_string
+        return [
+            (get_string(name), length, get_string(md5))
+            for name, md5, length in _SEQUENCE.iter_unpack(self._map[start:end])
+        ]
+
+    def get_sequence(self, index: int) -> tuple[str, int, Optional[str]]:
+        """Name, length and MD5 of a sequence."""
+        name, md5, length = _SEQUENCE.unpack_from(
+            self._map, self._sequences + _SEQUENCE.size * index
+        )
+        return self.get_string(name), length, self.get_string(md5)
+
+    def get_string(self, index: int) -> Optional[str]:
+        if index == _NONE:
+            return None
+        string = self._strings[index]
+        if string is None:
+            start = self._blob + self._string_offsets[index]
+            end = self._blob + self._string_offsets[index + 1]
+            string = sys.intern(str(self._map[start:end], "utf8"))
+            self._strings[index] = string
+        return string
+
+    def _view(self, offset: int, count: int, format: str) -> memoryview:
+        end = offset + struct.calcsize(format) * count
+        return memoryview(self._map)[offset:end].cast(format)
+
+    def _stamp(self) -> tuple[int, int]:
+        stat = self.source.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _is_current(self) -> bool:
+        if not self.path.is_file():
+            return False
+        with self.path.open("rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return False
+        magic, version, mtime, size, md5, *_ = _HEADER.unpack(header)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+            return False
+        if (mtime, size) == self._stamp():
+            return True
+        # The JSON was touched: compile again only if the content changed.
+        if hashlib.md5(self.source.read_bytes()).digest() != md5:
+            return False
+        data = bytearray(self.path.read_bytes())
+        _STAMP.pack_into(data, _STAMP_OFFSET, *self._stamp())
+        self._write(data)
+        return True
+
+    def compile(self):
+        """Compile the JSON metadata into the binary catalog."""
+        self._logger.debug(f"Compiling {self.source!s} into {self.path!s}.")
+        mtime, size = self._stamp()
+        content = self.source.read_bytes()
+        decoded = json.loads(content)
+
+        strings: dict[str, int] = {}
+
+        def intern(value: Optional[str]) -> int:
+            if value is None:
+                return _NONE
+            return strings.setdefault(value, len(strings))
+
+        genomes = []
+        ranges = []
+        sequences = []
+        for genome in decoded:
+            genomes.append({k: v for k, v in genome.items() if k != "sequences"})
+            if genome.get("sequences") is None:
+                ranges.append((_NONE, 0))
+                continue
+            ranges.append((len(sequences), len(genome["sequences"])))
+            for sequence in genome["sequences"]:
+                sequences.append(
+                    (
+                        intern(sequence["name"]),
+                        intern(sequence.get("md5")),
+                        int(sequence["length"]),
+                    )
+                )
+        attributes = intern(json.dumps(genomes))
+
+        encoded = [x.encode("utf8") for x in strings]
+        offsets = [0]
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+
+        data = bytearray()
+        data += _HEADER.pack(
+            CATALOG_MAGIC,
+            CATALOG_VERSION,
+            mtime,
+            size,
+            hashlib.md5(content).digest(),
+            len(encoded),
+            len(genomes),
+            len(sequences),
+            attributes,
+        )
+        data += struct.pack(f"<{len(offsets)}Q", *offsets)
+        for range_ in ranges:
+            data += _RANGE.pack(*range_)
+        for sequence in sequences:
+            data += _SEQUENCE.pack(*sequence)
+        data += b"".join(encoded)
+        self._write(data)
+
+    def _write(self, data: bytes):
+        # Write and rename, so that a reader never sees a partial catalog.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = Path(str(self.path) + ".tmp")
+        temporary.write_bytes(data)
+        temporary.replace(self.path)
@@ -1,4 +1,7 @@
+import functools
 import json
+import logging
+import struct
 import typing
 
 from helix.configuration import MANAGER_CFG
@@ -6,6 +9,7 @@ from helix.data.build import Build
 from helix.data.genome import Genome
 from helix.data.sequence import Sequence
 from helix.data.source import Source
+from helix.reference.genome_catalog import GenomeCatalog
 
 
 class MetadataLoader:
@@ -33,6 +37,9 @@ class MetadataLoader:
                         # non trivial.
                         if hasattr(value, "__dict__"):
                             self.seen.add(id(value))
+                if isinstance(obj, Genome) and obj.sequences is not None:
+                    # A property: the sequences are read on first access.
+                    obj_dict["sequences"] = obj.sequences
                 return {k: v for k, v in obj_dict.items() if not k.startswith("_")}
             return super().default(obj)
 
@@ -41,6 +48,7 @@ class MetadataLoader:
         self.genome_root = self._config.genomes
         self.references_path = self._config.metadata.joinpath("references.json")
         self.sources_path = self._config.metadata.joinpath("sources.json")
+        self.catalog_path = self._config.temporary.joinpath("references.catalog")
 
         if not self.genome_root.is_dir():
             raise FileNotFoundError(
@@ -74,31 +82,63 @@ class MetadataLoader:
         return sources
 
     def load(self) -> typing.List[Genome]:
-        with self.references_path.open("rt") as f:
-            decoded = json.load(f)
-        genomes = []
-        for genome in [Genome(**x) for x in decoded]:
-            genomes.append(genome)
-            genome.parent_folder = self.genome_root
+        # The catalog stays mapped as long as its genomes exist.
+        catalog = GenomeCatalog(self.references_path, self.catalog_path)
+        try:
+            catalog.open()
+            return self._load_catalog(catalog)
+        except (OSError, ValueError, struct.error) as e:
+            catalog.close()
+            logging.warning(f"Unable to use the compiled catalog: {e!s}")
+            with self.references_path.open("rt") as f:
+                return [self.decode(x) for x in json.load(f)]
+
+    def _attach(self, genome: Genome):
+        # Link a genome to its runtime context (folder, source).
+        genome.parent_folder = self.genome_root
+
+        if genome.source in self.source_meta:
+            genome.parent = self.source_meta[genome.source]
+        else:
+            genome.parent = Source(
+                genome.source, [], [], "Metadata for this source is not available."
+            )
 
-            if genome.source in self.source_meta:
-                genome.parent = self.source_meta[genome.source]
-            else:
-                genome.parent = Source(
-                    genome.source, [], [], "Metadata for this source is not available."
+    def encode(self, genome: Genome) -> dict:
+        """Serialize a genome as it's stored in references.json."""
+        return json.loads(
+            json.dumps(genome, cls=MetadataLoader._CircularReferenceEncoder)
+        )
+
+    def decode(self, item: dict) -> Genome:
+        """Build a genome from its serialized form (see encode())."""
+        genome = Genome(**item)
+        if genome.sequences is not None:
+            genome.sequences = [Sequence(**x, parent=genome) for x in genome.sequences]
+        self._attach(genome)
+        return genome
+
+    def _load_catalog(self, catalog: GenomeCatalog) -> typing.List[Genome]:
+        genomes = []
+        for index, attributes in enumerate(catalog.get_genomes()):
+            genome = Genome(**attributes)
+            if catalog.get_sequence_range(index) is not None:
+                # Most genomes are never looked at: read their sequences later.
+                genome.set_sequence_loader(
+                    functools.partial(catalog.get_sequences, index)
                 )
-            if genome.sequences is None:
-                continue
-            genome.sequences = [Sequence(**x) for x in genome.sequences]
-            for sequence in genome.sequences:
-                sequence.parent = genome
+            self._attach(genome)
+            genomes.append(genome)
         return genomes
 
     def save(self, source: typing.List[Genome]):
-        with self.references_path.open("wt") as f:
+        # Write and rename, so that a crash never leaves a partial file.
+        temporary = self.references_path.with_name(self.references_path.name + ".tmp")
+        with temporary.open("wt") as f:
             json.dump(
                 source,
                 f,
                 cls=MetadataLoader._CircularReferenceEncoder,
                 default=lambda o: o.__dict__,
             )
+        temporary.replace(self.references_path)
@@ -0,0 +1,143 @@
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from helix.data.genome import Genome
+from helix.utility.file_lock import FileLock, set_mode
+
+# Permissions of the folders (setgid: new files inherit the group of the
+# store) and of the lock files.
+FOLDER_MODE = 0o2775
+LOCK_MODE = 0o664
+
+
+class GenomeStore:
+    """Content-addressed storage of reference genomes, shared between users.
+
+    Files are stored by the MD5 of the decompressed FASTA, so identical
+    genomes downloaded from different URLs are stored once. Every user sees
+    the files in their own repository, under the usual names, through hard
+    links (or symbolic links, if hard links are not possible, i.e. the store is
+    on a different file system).
+
+    Operations on the same genome must be done while holding its lock.
+    Folders and lock files are made writable by the group whatever the umask
+    of the user creating them, so that every user of the store can add
+    genomes.
+
+    Args:
+        root (Path): Root folder of the store.
+        links (str, optional): "hard" or "symbolic". Defaults to "hard".
+
+    Examples:
+        >>> store = GenomeStore(Path("/shared/genomes"))
+        >>> with store.lock(genome.decompressed_md5):
+        >>>     if not store.link_into(genome):
+        >>>         repository.acquire(genome)
+        >>>         store.publish(genome)
+    """
+
+    def __init__(self, root: Path, links: str = "hard") -> None:
+        if links not in ["hard", "symbolic"]:
+            raise RuntimeError(f"Unknown link type {links}")
+        self.root = root
+        self._links = links
+        self._logger = logging.getLogger(__name__)
+
+    def get_path(self, md5: str, suffix: str) -> Path:
+        return self.root.joinpath(md5[0:2], md5 + suffix)
+
+    def lock(self, md5: str) -> FileLock:
+        folder = self.root.joinpath("locks")
+        self._make_folder(folder)
+        return FileLock(folder.joinpath(md5 + ".lock"), LOCK_MODE)
+
+    def link_into(self, genome: Genome, md5: str = None) -> bool:
+        """Link the stored files of a genome into its repository folder.
+
+        Args:
+            genome (Genome): Genome to link.
+            md5 (str, optional): MD5 of the decompressed FASTA. Defaults to
+                genome.decompressed_md5, which is set if the genome is found.
+
+        Returns:
+            bool: True if the FASTA is in the store (companion files may be
+                missing), False otherwise.
+        """
+        md5 = md5 if md5 is not None else genome.decompressed_md5
+        if md5 is None or not self.get_path(md5, ".fa.gz").exists():
+            return False
+        genome.decompressed_md5 = md5
+        self._logger.info(f"Reusing {genome} from the shared store.")
+        for path, suffix in self._get_files(genome):
+            stored = self.get_path(md5, suffix)
+            if stored.exists() and not self._is_same(path, stored):
+                self._link(stored, path)
+        return True
+
+    def publish(self, genome: Genome):
+        """Add the files of a genome to the store. Files that are already
+        stored replace the ones in the repository folder, which become links.
+        """
+        md5 = genome.decompressed_md5
+        if md5 is None:
+            return
+        for path, suffix in self._get_files(genome):
+            stored = self.get_path(md5, suffix)
+            if stored.exists():
+                if path.exists() and not self._is_same(path, stored):
+                    self._link(stored, path)
+            elif path.exists():
+                self._make_folder(stored.parent)
+                if self._links == "hard" and self._link(path, stored):
+                    continue
+                # The store keeps the only real copy.
+                temporary = stored.with_name(stored.name + ".tmp")
+                shutil.move(path, temporary)
+                os.replace(temporary, stored)
+                self._link(stored, path)
+
+    def _get_files(self, genome: Genome) -> list[tuple[Path, str]]:
+        return [
+            (genome.fasta, ".fa.gz"),
+            (genome.gzi, ".fa.gz.gzi"),
+            (genome.fai, ".fa.gz.fai"),
+            (genome.dict, ".dict"),
+        ]
+
+    def _make_folder(self, folder: Path):
+        folder.mkdir(parents=True, exist_ok=True)
+        set_mode(folder, FOLDER_MODE)
+
+    def _is_same(self, path: Path, stored: Path) -> bool:
+        return path.exists() and os.path.samefile(path, stored)
+
+    def _link(self, source: Path, target: Path) -> bool:
+        """Make `target` a link to `source`, replacing it atomically.
+
+        Returns:
+            bool: True for a hard link, False for a symbolic link.
+        """
+        temporary = target.with_name(target.name + ".link")
+        if temporary.exists() or temporary.is_symlink():
+            temporary.unlink()
+        hard = False
+        if self._links == "hard":
+            try:
+                os.link(source, temporary)
+                hard = True
+            except OSError as e:
+                self._logger.debug(f"Hard link to {source!s} failed: {e!s}")
+        if not hard:
+            temporary.symlink_to(source.absolute())
+        os.replace(temporary, target)
+        return hard
+
+    @staticmethod
+    def from_config(config) -> Optional["GenomeStore"]:
+        """The store set in a RepositoryConfig, None if it's not enabled."""
+        if config.shared_store == "":
+            return None
+        return GenomeStore(Path(config.shared_store), config.shared_store_links)
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+class IngestionJournal:
+    """Append-only log of the genomes whose ingestion is complete.
+
+    Every entry is flushed to disk as soon as it's recorded, so that a crash
+    (or a restart) in the middle of a long batch only loses the genomes that
+    were being processed. The journal is cleared once the metadata is saved.
+
+    Args:
+        path (Path): Journal file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, dict]:
+        """Entries recorded so far, by key.
+
+        A partially written entry (i.e., the process died while writing it)
+        is ignored.
+        """
+        entries = {}
+        if not self.path.exists():
+            return entries
+        with self.path.open("rt", encoding="utf8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"Ignoring a truncated entry in {self.path!s}")
+                    continue
+                entries[entry["key"]] = entry["value"]
+        return entries
+
+    def record(self, key: str, value: dict):
+        line = json.dumps({"key": key, "value": value}) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("at", encoding="utf8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        with self._lock:
+            if self.path.exists():
+                self.path.unlink()
+
+
+class IngestionScheduler:
+    """Run multi-stage jobs on many items, overlapping the stages of different
+    items (i.e., download an item while the previous one is being compressed).
+
+    Every stage uses a resource (i.e., "network", "cpu", "disk") and the number
+    of stages running at the same time on a resource is bounded by its limit.
+    A failure in a stage stops the job of that item only.
+
+    Args:
+        limits (dict[str, int]): Maximum concurrent stages for every resource.
+
+    Examples:
+        >>> scheduler = IngestionScheduler({"network": 2, "cpu": 1})
+        >>> scheduler.run(
+        >>>     urls,
+        >>>     [("network", download), ("cpu", compress)],
+        >>>     lambda url, output: print(url, output),
+        >>> )
+    """
+
+    def __init__(self, limits: dict[str, int]) -> None:
+        self._limits = {k: max(1, v) for k, v in limits.items()}
+        self._semaphores = {
+            k: threading.BoundedSemaphore(v) for k, v in self._limits.items()
+        }
+
+    def run(
+        self,
+        items: list,
+        stages: list[tuple[str, Callable[[Any], Any]]],
+        on_done: Optional[Callable[[Any, Any], None]] = None,
+    ) -> dict[int, BaseException]:
+        """Process every item through the stages.
+
+        Args:
+            items (list): Items to process.
+            stages (list[tuple[str, Callable[[Any], Any]]]): Resource and function
+                of every stage. The first stage receives the item, the following
+                ones the value returned by the previous stage.
+            on_done (Callable[[Any, Any], None], optional): Called, one call at
+                a time, with the item and the value returned by the last stage.
+
+        Returns:
+            dict[int, BaseException]: Errors, by index of the failed item.
+        """
+        for resource, _ in stages:
+            if resource not in self._semaphores:
+                raise RuntimeError(f"No limit set for the resource {resource}")
+
+        errors: dict[int, BaseException] = {}
+        done_lock = threading.Lock()
+
+        def job(index: int, item):
+            try:
+                value = item
+                for resource, stage in stages:
+                    with self._semaphores[resource]:
+                        value = stage(value)
+                if on_done is not None:
+                    with done_lock:
+                        on_done(item, value)
+            except Exception as e:
+                logging.critical(f"Unable to process {item}: {e!s}")
+                errors[index] = e
+
+        # One worker for every stage that can run at the same time: an item
+        # waiting for a resource never blocks the items behind it.
+        workers = sum(self._limits[x] for x in {x[0] for x in stages})
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for index, item in enumerate(items):
+                executor.submit(job, index, item)
+        return errors
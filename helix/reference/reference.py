@@ -15,15 +15,26 @@ class ReferenceStatus(enum.Enum):
 
 
 class Reference:
-    """This class represent a reference genome."""
+    """This class represent a reference genome.
+
+    Args:
+        reference_map (OrderedDict[Sequence, list[Sequence]]): Known sequences
+            matching every input sequence.
+        logger (optional): Logger to use.
+        candidates (set[Genome], optional): Only genomes that can possibly be
+            a perfect match, as found by `Repository.score`. Defaults to None,
+            checking every genome.
+    """
 
     def __init__(
         self,
         reference_map: OrderedDict[Sequence, list[Sequence]],
         logger=logging.getLogger(__name__),
+        candidates: set[Genome] = None,
     ):
         self._logger = logger
         self.reference_map = reference_map
+        self._candidates = candidates
         self._genome_map = self._index_by_genome()
         self.matching: list[Genome] = self._get_matching_genomes()
         sorted = list([x for x in self._genome_map.keys() if x is not None])
@@ -76,20 +87,20 @@ class Reference:
         Returns:
             dict[Genome, dict[Sequence, Sequence]]: Map Genome <-> Sequences.
         """
-        parents: set[Genome] = set(
-            x.parent for y in self.reference_map.values() for x in y
-        )
-        genome_map = {x: {y: None for y in x.sequences} for x in parents}
-        for parent in parents:
-            genome_map[parent][None] = []
-            for sequence in parent.sequences:
-                for query_sequence, match_sequences in self.reference_map.items():
-                    if sequence in match_sequences:
-                        genome_map[parent][sequence] = query_sequence
-                        break
-            for query_sequence in self.reference_map.keys():
-                if query_sequence not in genome_map[parent].values():
-                    genome_map[parent][None].append(query_sequence)
+        # A genome sequence is assigned to the first input sequence matching it:
+        # update the assignment in reverse order so that the first one wins.
+        # This avoids scanning every match list for every sequence of every genome.
+        assigned: dict[Sequence, Sequence] = {}
+        for query_sequence, match_sequences in reversed(self.reference_map.items()):
+            assigned.update(dict.fromkeys(match_sequences, query_sequence))
+
+        genome_map = {}
+        for parent in set(x.parent for x in assigned):
+            genome_map[parent] = {x: assigned.get(x) for x in parent.sequences}
+            matched = set(genome_map[parent].values())
+            genome_map[parent][None] = [
+                x for x in self.reference_map.keys() if x not in matched
+            ]
         return genome_map
 
     def _get_matching_genomes(self):
@@ -107,6 +118,8 @@ class Reference:
         for genome, matches in self._genome_map.items():
             if len(matches[None]) > 0:
                 continue
+            if self._candidates is not None and genome not in self._candidates:
+                continue
             matching = True
             for genome_sequence, query_sequence in matches.items():
                 if genome_sequence is None:
@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from helix.data.genome import Genome
+from helix.fasta.fasta_indexer import FASTAIndexEntry, FASTAIndexer
+from helix.files.bgzf_index import BGZFIndex, get_block_size, inflate_block
+from helix.naming.converter import Converter
+
+
+class ReferenceReader:
+    """Random access to the bases of a local BGZF-compressed reference.
+
+    The FASTA index (.fai) maps positions to offsets of the uncompressed
+    content and the BGZF index (.gzi) maps those to the compressed blocks, so
+    only the blocks containing the requested bases are decompressed. The last
+    decompressed blocks are kept in a LRU cache.
+
+    Args:
+        genome (Genome): Genome to read, with its .fai and .gzi.
+        cached_blocks (int, optional): Maximum number of decompressed blocks
+            (up to 64KB each) kept in memory. Defaults to 256.
+
+    Raises:
+        RuntimeError: The FASTA or its indexes are not available.
+
+    Examples:
+        >>> with ReferenceReader(genome) as reader:
+        >>>     reader.fetch("chrM", 0, 100)
+        >>>     reader.get_bases("chr1", [10000, 20000, 30000])
+    """
+
+    def __init__(self, genome: Genome, cached_blocks: int = 256) -> None:
+        for path in [genome.fasta, genome.fai, genome.gzi]:
+            if not path.exists():
+                raise RuntimeError(f"Unable to read {genome}: missing {path!s}")
+        self.genome = genome
+        self.sequences: dict[str, FASTAIndexEntry] = FASTAIndexer.load(genome.fai)
+        self._canonical = dict(
+            zip(Converter.canonicalize_many(self.sequences), self.sequences)
+        )
+        self._index = BGZFIndex.load(genome.gzi)
+        self._cached_blocks = max(1, cached_blocks)
+        self._blocks: OrderedDict[int, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._file = genome.fasta.open("rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def find_sequence(self, name: str) -> Optional[str]:
+        """Name in the .fai of a sequence, also if it's named differently
+        (i.e., "1" for "chr1"). None if the reference doesn't have it."""
+        if name in self.sequences:
+            return name
+        return self._canonical.get(Converter.canonicalize(name))
+
+    def fetch(self, name: str, start: int = 0, end: int = None) -> str:
+        """Get the bases of a region of a sequence.
+
+        Args:
+            name (str): Name of the sequence, as it appears in the .fai.
+            start (int, optional): 0-based start of the region. Defaults to 0.
+            end (int, optional): 0-based exclusive end of the region.
+                Defaults to the end of the sequence.
+
+        Raises:
+            KeyError: The sequence does not exist.
+
+        Returns:
+            str: Bases of the region, without line terminators.
+        """
+        entry = self.sequences[name]
+        end = entry.length if end is None else min(end, entry.length)
+        if start >= end:
+            return ""
+        first = entry.get_offset(start)
+        last = entry.get_offset(end - 1) + 1
+        with self._lock:
+            blocks = self._index.get_blocks(first, last)
+            data = b"".join(self._get_block(x) for x in blocks)
+        offset = self._index.uncompressed[blocks[0]]
+        start, end = first - offset, last - offset
+        data = data[start:end]
+        return data.replace(b"\n", b"").replace(b"\r", b"").decode("ascii")
+
+    def get_bases(self, name: str, positions: Iterable[int]) -> list[Optional[str]]:
+        """Get the bases at many positions of a sequence.
+
+        Positions are visited in sorted order, so every block is decompressed
+        once however the positions are ordered.
+
+        Args:
+            name (str): Name of the sequence, as it appears in the .fai.
+            positions (Iterable[int]): 0-based positions.
+
+        Raises:
+            KeyError: The sequence does not exist.
+
+        Returns:
+            list[Optional[str]]: Base at every position, in the same order.
+                None for positions outside of the sequence.
+        """
+        entry = self.sequences[name]
+        positions = list(positions)
+        bases: list[Optional[str]] = [None] * len(positions)
+        order = sorted(range(len(positions)), key=positions.__getitem__)
+        uncompressed = self._index.uncompressed
+        block, start, end, data = -1, 0, 0, b""
+        with self._lock:
+            for index in order:
+                position = positions[index]
+                if position < 0 or position >= entry.length:
+                    continue
+                offset = entry.get_offset(position)
+                if offset < start or offset >= end:
+                    block = self._index.locate(offset)
+                    data = self._get_block(block)
+                    start = uncompressed[block]
+                    end = start + len(data)
+                bases[index] = chr(data[offset - start])
+        return bases
+
+    def _get_block(self, block: int) -> bytes:
+        data = self._blocks.get(block)
+        if data is not None:
+            self._blocks.move_to_end(block)
+            return data
+        start, end = self._index.get_compressed_range(block)
+        self._file.seek(start)
+        raw = self._file.read(end - start)
+        data = inflate_block(raw[: get_block_size(raw)])
+        self._blocks[block] = data
+        if len(self._blocks) > self._cached_blocks:
+            self._blocks.popitem(last=False)
+        return data
@@ -0,0 +1,216 @@
+import io
+import logging
+import os
+from pathlib import Path
+
+import certifi
+import pycurl
+
+from helix.configuration import MANAGER_CFG
+from helix.data.genome import Genome
+from helix.fasta.fasta_indexer import FASTAIndexEntry, FASTAIndexer
+from helix.files.bgzf_index import BGZFIndex, get_block_size, inflate_block
+
+
+class RemoteReference:
+    """Read regions of a remote BGZF-compressed reference without downloading it.
+
+    The FASTA index (.fai) and the BGZF index (.gzi) are downloaded from
+    `genome.fai_url` and `genome.gzi_url`. Then, only the BGZF blocks covering
+    the requested regions are downloaded with HTTP range requests and stored
+    in a local block cache, so that they are downloaded only once. Only the
+    most recently used `remote_cache_blocks` blocks of the genome are kept.
+
+    Args:
+        genome (Genome): Remote genome. Its FASTA must be BGZF compressed.
+        config (optional): Repository configuration, for the cache folder and
+            its size.
+        curl_class (optional): Class used to create the curl handle.
+
+    Raises:
+        RuntimeError: The genome has no .fai or .gzi available remotely. When
+            fetching, if the server doesn't support range requests.
+
+    Examples:
+        >>> reference = RemoteReference(genome)
+        >>> mitochondrial = reference.fetch("chrM")
+    """
+
+    def __init__(
+        self,
+        genome: Genome,
+        config=MANAGER_CFG.REPOSITORY,
+        curl_class=pycurl.Curl,
+    ) -> None:
+        if genome.fai_url is None or genome.gzi_url is None:
+            raise RuntimeError(f"Remote indexes are not available for {genome}")
+        self.genome = genome
+        self.folder = config.temporary.joinpath("remote", genome.name_only)
+        self._blocks_folder = self.folder.joinpath("blocks")
+        self._max_blocks = config.remote_cache_blocks
+        self._curl_class = curl_class
+        self._curl: pycurl.Curl = None
+        self._logger = logging.getLogger(__name__)
+        self._sequences: dict[str, FASTAIndexEntry] = None
+        self._index: BGZFIndex = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._curl is not None:
+            self._curl.close()
+            self._curl = None
+
+    @property
+    def sequences(self) -> dict[str, FASTAIndexEntry]:
+        self._load_indexes()
+        return self._sequences
+
+    def fetch(self, name: str, start: int = 0, end: int = None) -> str:
+        """Get the bases of a region of a sequence.
+
+        Args:
+            name (str): Name of the sequence, as it appears in the .fai.
+            start (int, optional): 0-based start of the region. Defaults to 0.
+            end (int, optional): 0-based exclusive end of the region.
+                Defaults to the end of the sequence.
+
+        Raises:
+            KeyError: The sequence does not exist.
+
+        Returns:
+            str: Bases of the region, without line terminators.
+        """
+        entry = self.sequences[name]
+        end = entry.length if end is None else min(end, entry.length)
+        if start >= end:
+            return ""
+        first = entry.get_offset(start)
+        last = entry.get_offset(end - 1) + 1
+        data = self._read(first, last)
+        return data.replace(b"\n", b"").replace(b"\r", b"").decode("ascii")
+
+    def _load_indexes(self):
+        if self._sequences is not None:
+            return
+        self.folder.mkdir(parents=True, exist_ok=True)
+        fai = self.folder.joinpath("index.fai")
+        gzi = self.folder.joinpath("index.gzi")
+        for url, path in [(self.genome.fai_url, fai), (self.genome.gzi_url, gzi)]:
+            if not path.exists():
+                temporary = Path(str(path) + ".tmp")
+                temporary.write_bytes(self._get(url))
+                temporary.replace(path)
+        self._sequences = FASTAIndexer.load(fai)
+        self._index = BGZFIndex.load(gzi)
+
+    def _read(self, start: int, end: int) -> bytes:
+        blocks = self._index.get_blocks(start, end)
+        downloaded = self._download_missing(blocks)
+        data = bytearray()
+        for block in blocks:
+            path = self._block_path(block)
+            data += inflate_block(path.read_bytes())
+            # Most recently used.
+            os.utime(path)
+        if downloaded:
+            self._evict()
+        offset = self._index.uncompressed[blocks[0]]
+        first, last = start - offset, end - offset
+        return bytes(data[first:last])
+
+    def _block_path(self, block: int) -> Path:
+        return self._blocks_folder.joinpath(str(self._index.compressed[block]))
+
+    def _download_missing(self, blocks: range) -> bool:
+        """Download the blocks that are not cached.
+
+        Returns:
+            bool: True if any block was downloaded.
+        """
+        missing = [x for x in blocks if not self._block_path(x).exists()]
+        if len(missing) == 0:
+            return False
+        self._blocks_folder.mkdir(parents=True, exist_ok=True)
+        # Merge consecutive blocks in a single range request.
+        runs: list[list[int]] = []
+        for block in missing:
+            if len(runs) > 0 and runs[-1][-1] == block - 1:
+                runs[-1].append(block)
+            else:
+                runs.append([block])
+
+        for run in runs:
+            start, _ = self._index.get_compressed_range(run[0])
+            _, end = self._index.get_compressed_range(run[-1])
+            self._logger.debug(
+                f"Fetching {len(run)} blocks ({end - start} bytes) of {self.genome}"
+            )
+            data = self._get(self.genome.fasta_url, start, end)
+            position = 0
+            for block in run:
+                size = get_block_size(data, position)
+                path = self._block_path(block)
+                temporary = Path(str(path) + ".tmp")
+                block_end = position + size
+                temporary.write_bytes(data[position:block_end])
+                temporary.replace(path)
+                position += size
+        return True
+
+    def _evict(self):
+        used = {}
+        for file in self._blocks_folder.iterdir():
+            if file.suffix == ".tmp":
+                continue
+            try:
+                used[file] = file.stat().st_mtime
+            except FileNotFoundError:
+                continue
+        files = sorted(used, key=used.get)
+        count = max(0, len(files) - self._max_blocks)
+        for file in files[0:count]:
+            file.unlink(missing_ok=True)
+
+    def _get(self, url: str, start: int = None, end: int = None) -> bytes:
+        # The same handle is reused, so the connection to the server is kept.
+        if self._curl is None:
+            self._curl = self._curl_class()
+        buffer = io.BytesIO()
+        # Status of every response, redirects included. file:// URLs have none.
+        statuses = []
+        aborted = []
+
+        def header(line: bytes):
+            if line.startswith(b"HTTP/"):
+                statuses.append(int(line.split()[1]))
+
+        def write(data: bytes):
+            if start is not None and len(statuses) > 0 and statuses[-1] != 206:
+                # The server is ignoring the range: abort the transfer instead
+                # of receiving the whole file.
+                aborted.append(statuses[-1])
+                return 0
+            buffer.write(data)
+
+        self._curl.setopt(pycurl.URL, url)
+        self._curl.setopt(pycurl.FOLLOWLOCATION, True)
+        self._curl.setopt(pycurl.CAINFO, certifi.where())
+        self._curl.setopt(pycurl.HEADERFUNCTION, header)
+        self._curl.setopt(pycurl.WRITEFUNCTION, write)
+        self._curl.setopt(pycurl.RANGE, None if start is None else f"{start}-{end - 1}")
+        try:
+            self._curl.perform()
+        except pycurl.error:
+            if len(aborted) == 0:
+                raise
+        status = self._curl.getinfo(pycurl.RESPONSE_CODE)
+        if status >= 400:
+            raise RuntimeError(f"Unable to download {url}: status {status}")
+        if len(aborted) > 0:
+            raise RuntimeError(f"Range requests are not supported for {url}")
+        return buffer.getvalue()
@@ -1,18 +1,39 @@
+import functools
 import logging
-from collections import OrderedDict
-from typing import Callable
+import shutil
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Callable, Iterator, Optional
 
 from helix.alignment_map.alignment_map_header import AlignmentMapHeader
 from helix.configuration import RepositoryConfig
 from helix.data.genome import Genome
 from helix.data.sequence import Sequence
 from helix.reference.reference import Reference
-from helix.files.bgzip import BGzip, BgzipAction
-from helix.files.decompressor import Decompressor
+from helix.files.bgzip import BGzip
+from helix.files.decompressor import Decompressor, GZipStreamReader
 from helix.files.downloader import Downloader
+from helix.files.file_type_checker import FileType, FileTypeChecker
+from helix.files.hashing_tee import HashingTee
 from helix.reference.genome_metadata_loader import MetadataLoader
+from helix.reference.genome_store import GenomeStore
+from helix.reference.ingestion_scheduler import IngestionJournal, IngestionScheduler
 from helix.mtDNA.mt_dna import MtDNA
-from helix.utility.samtools import Samtools
+from helix.utility.external import External
+from helix.utility.services import SERVICES
+
+# Attributes of a genome that only depend on the content of its files.
+_FILE_ATTRIBUTES = [
+    "download_size",
+    "decompressed_size",
+    "bgzip_size",
+    "downloaded_md5",
+    "decompressed_md5",
+    "bgzip_md5",
+    "downloaded_sha256",
+    "decompressed_sha256",
+    "bgzip_sha256",
+]
 
 
 class Repository:
@@ -26,31 +47,45 @@ class Repository:
 
     def __init__(
         self,
-        loader: MetadataLoader = MetadataLoader(),
-        downloader: Downloader = Downloader(),
-        mtdna: MtDNA = MtDNA(),
-        config: RepositoryConfig = RepositoryConfig(),
+        loader: MetadataLoader = None,
+        downloader: Downloader = None,
+        mtdna: MtDNA = None,
+        config: RepositoryConfig = None,
     ) -> None:
-        self._loader = loader
-        self._downloader = downloader
-        self._mtdna = mtdna
+        self._loader = SERVICES.resolve(loader, MetadataLoader)
+        self._downloader = SERVICES.resolve(downloader, Downloader)
+        self._mtdna = SERVICES.resolve(mtdna, MtDNA)
+        # Sequences are indexed only when the first file is analyzed, and read
+        # only for the genomes matching it.
         self.genomes = self._loader.load()
-        # Index individual sequences by their MD5 and length
-        self._sequences_by_md5: dict[str, list[Sequence]] = self._group_sequences(
-            lambda s: s.md5, self.genomes
-        )
-        self._sequences_by_length: dict[int, list[Sequence]] = self._group_sequences(
-            lambda s: s.length, self.genomes
-        )
-        self._config = config
+        self._config = SERVICES.resolve(config, RepositoryConfig)
+        self._store = GenomeStore.from_config(self._config)
+
+    @functools.cached_property
+    def _sequences_by_md5(self) -> dict[str, list[tuple[Genome, int]]]:
+        return self._group_sequences(lambda name, length, md5: md5)
+
+    @functools.cached_property
+    def _sequences_by_length(self) -> dict[int, list[tuple[Genome, int]]]:
+        return self._group_sequences(lambda name, length, md5: length)
+
+    @functools.cached_property
+    def _sequence_index(self) -> dict[tuple, list[tuple[Genome, int]]]:
+        # Inverted index (name, length, md5) -> (genome, position). Every sequence
+        # is also indexed without MD5, for inputs that don't provide it.
+        index = {}
+        for genome, position, (name, length, md5) in self._get_sequence_keys():
+            for key_md5 in {md5, None}:
+                index.setdefault((name, length, key_md5), []).append((genome, position))
+        return index
 
     def analyze_references(self) -> None:
         # Analyzing sequence by sequence
         different_md5_same_length = []
-        for length, seqs in self._sequences_by_length.items():
+        for length, positions in self._sequences_by_length.items():
             unique_seq_set = set()
             name = None
-            for seq in seqs:
+            for seq in self._get_matches(positions):
                 unique_seq_set.add(seq.md5)
                 name = seq.name
             if len(unique_seq_set) > 1 and length > 57227414:
@@ -89,46 +124,108 @@ class Repository:
         if md5_available:
             for sequence in sequences:
                 if sequence.md5 in self._sequences_by_md5:
-                    matching[sequence] = self._sequences_by_md5[sequence.md5]
+                    positions = self._sequences_by_md5[sequence.md5]
+                    matching[sequence] = self._get_matches(positions)
         else:
             for sequence in sequences:
                 if sequence.length in self._sequences_by_length:
-                    matching[sequence] = self._sequences_by_length[sequence.length]
-        return Reference(matching)
+                    positions = self._sequences_by_length[sequence.length]
+                    matching[sequence] = self._get_matches(positions)
+        # Only genomes where every sequence is identical to an input sequence,
+        # and vice versa, can be a perfect match.
+        candidates = set(
+            genome
+            for genome, votes in self.score(sequences).items()
+            if votes == len(genome.sequences)
+        )
+        return Reference(matching, candidates=candidates)
+
+    def score(self, sequences: list[Sequence]) -> dict[Genome, int]:
+        """Count, for every genome, how many of its sequences are identical
+        (same name, length and, if available, MD5) to an input sequence.
+
+        Args:
+            sequences (list[Sequence]): Input sequences.
 
-    def _group_sequences(self, criteria, genomes: list[Genome]):
+        Returns:
+            dict[Genome, int]: Votes for every genome with at least one match.
+                Genomes missing some of the input sequences get 0 votes.
+        """
+        votes = Counter()
+        queries = Counter()
+        for sequence in sequences:
+            key = (sequence.name, sequence.length, sequence.md5)
+            genomes = [x[0] for x in self._sequence_index.get(key, [])]
+            votes.update(genomes)
+            queries.update(set(genomes))
+        return {
+            genome: count if queries[genome] == len(sequences) else 0
+            for genome, count in votes.items()
+        }
+
+    def _group_sequences(self, criteria) -> dict:
         grouped = {}
-        for genome in genomes:
-            if genome.sequences is None:
-                continue
-            for sequence in genome.sequences:
-                evaluated_criteria = criteria(sequence)
-                if evaluated_criteria not in grouped:
-                    grouped[evaluated_criteria] = []
-                grouped[evaluated_criteria].append(sequence)
+        for genome, position, key in self._get_sequence_keys():
+            evaluated_criteria = criteria(*key)
+            if evaluated_criteria not in grouped:
+                grouped[evaluated_criteria] = []
+            grouped[evaluated_criteria].append((genome, position))
         return grouped
 
+    def _get_sequence_keys(self) -> Iterator[tuple[Genome, int, tuple]]:
+        # Name, length and MD5 of every sequence, from the compiled catalog:
+        # no sequence is created for the genomes that are not matched.
+        for genome in self.genomes:
+            for position, key in enumerate(genome.get_sequence_keys() or []):
+                yield genome, position, key
+
+    def _get_matches(self, positions: list[tuple[Genome, int]]) -> list[Sequence]:
+        return [genome.sequences[position] for genome, position in positions]
+
     def _get_sizes(self, genome: Genome):
-        if genome.fai_url is None:
-            fai_url = genome.fasta_url + ".fai"
-            fai_size = self._downloader.get_file_size(fai_url)
-            if fai_size is not None:
-                genome.fai_url = fai_url
-
-        if genome.gzi_url is None:
-            gzi_url = genome.fasta_url + ".gzi"
-            gzi_size = self._downloader.get_file_size(gzi_url)
-            if gzi_size is not None:
-                genome.gzi_url = gzi_url
-
-        if genome.download_size is None:
-            size = self._downloader.get_file_size(genome.fasta_url)
-            if size is not None:
-                genome.download_size = size
-            else:
-                raise RuntimeError(
-                    f"Unable to get the size of the fasta file for {genome.fasta_url}"
-                )
+        self.refresh_sizes([genome])
+
+    def refresh_sizes(self, genomes: list[Genome] = None):
+        """Fill the URL of companion files (.fai, .gzi) and the download size
+        of the genomes that miss them.
+
+        Every remote file is probed concurrently, and the results are cached.
+
+        Args:
+            genomes (list[Genome], optional): Genomes to refresh. Defaults to all
+                the genomes in the repository.
+
+        Raises:
+            RuntimeError: The size of a FASTA file can't be determined.
+        """
+        if genomes is None:
+            genomes = self.genomes
+        urls = []
+        for genome in genomes:
+            if genome.fai_url is None:
+                urls.append(genome.fasta_url + ".fai")
+            if genome.gzi_url is None:
+                urls.append(genome.fasta_url + ".gzi")
+            if genome.download_size is None:
+                urls.append(genome.fasta_url)
+        sizes = self._downloader.get_file_sizes(urls)
+
+        missing = []
+        for genome in genomes:
+            if genome.fai_url is None:
+                if sizes.get(genome.fasta_url + ".fai") is not None:
+                    genome.fai_url = genome.fasta_url + ".fai"
+            if genome.gzi_url is None:
+                if sizes.get(genome.fasta_url + ".gzi") is not None:
+                    genome.gzi_url = genome.fasta_url + ".gzi"
+            if genome.download_size is None:
+                genome.download_size = sizes.get(genome.fasta_url)
+                if genome.download_size is None:
+                    missing.append(genome.fasta_url)
+        if len(missing) > 0:
+            raise RuntimeError(
+                f"Unable to get the size of the fasta file for {', '.join(missing)}"
+            )
 
     def _get_sequences(self, genome: Genome):
         dictionary: AlignmentMapHeader = AlignmentMapHeader.load_from_file(genome.dict)
@@ -141,33 +238,188 @@ class Repository:
     def _create_companion_files(
         self, genome: Genome, force=False, progress=None, action: str = None
     ):
-        samtools = Samtools()
-        bgzip = BGzip()
         logging.info(f"{genome}: Starting post-download tasks.")
+        commands = []
         if not genome.gzi.exists():
             logging.info(f"{genome}: Generating bgzip index.")
-            bgzip.bgzip_wrapper(genome.fasta, genome.gzi, BgzipAction.Reindex)
+            commands.append(("bgzip", ["-r", str(genome.fasta)]))
         else:
             logging.info(f"{genome}: bgzip index exists.")
 
         if not genome.dict.exists():
             logging.info(f"{genome}: Generating dictionary file.")
-            samtools.make_dictionary(genome.fasta, genome.dict)
+            commands.append(
+                ("samtools", ["dict", str(genome.fasta), "-o", str(genome.dict)])
+            )
         else:
             logging.info(f"{genome}: Dictionary file exists.")
+        # Both only read the FASTA: build them at the same time.
+        SERVICES.get(External).run_batch(commands)
+
+    def _recompress(
+        self,
+        genome: Genome,
+        downloaded: Path,
+        decompressor: Decompressor,
+        compressor: BGzip,
+    ) -> Path:
+        """Decompress a downloaded file and compress it to BGZip in a single pass,
+        without writing the decompressed FASTA to disk.
+
+        Args:
+            genome (Genome): Genome being acquired.
+            downloaded (Path): Downloaded (compressed) file.
+            decompressor (Decompressor): Decompressor to use.
+            compressor (BGzip): Compressor to use.
+
+        Returns:
+            Path: Path of the BGZip-compressed FASTA.
+        """
+        with decompressor.stream(genome, downloaded) as stream:
+            writer = compressor.compress_stream(genome, stream)
+        try:
+            decompressor.verify(
+                genome,
+                writer.uncompressed_size,
+                writer.uncompressed_md5,
+                writer.uncompressed_sha256,
+            )
+        except RuntimeError:
+            for file in [genome.fasta, genome.gzi, genome.fai]:
+                if file.exists():
+                    file.unlink()
+            raise
+        genome.bgzip_size = writer.compressed_size
+        genome.bgzip_md5 = writer.compressed_md5
+        genome.bgzip_sha256 = writer.compressed_sha256
+        downloaded.unlink()
+        return genome.fasta
+
+    def self_test(self, refresh_sizes: bool = False):
+        """Ingest every genome that has no sequences.
+
+        Genomes are processed concurrently, overlapping their stages (download,
+        recompression, companion files) within the limits set in the
+        configuration. Completed genomes are written to a journal, so that an
+        interrupted run resumes where it stopped, and the metadata is saved
+        once at the end.
+
+        Args:
+            refresh_sizes (bool, optional): Probe the remote files of every
+                genome first (see refresh_sizes). Defaults to False.
+        """
+        if refresh_sizes:
+            try:
+                self.refresh_sizes()
+            except RuntimeError as e:
+                logging.warning(e)
+
+        journal = IngestionJournal(self._config.temporary.joinpath("ingestion.journal"))
+        indexes = {genome.fasta_url: i for i, genome in enumerate(self.genomes)}
+        for url, entry in journal.load().items():
+            if url in indexes and self.genomes[indexes[url]].sequences is None:
+                logging.info(f"Resuming {url} from the ingestion journal.")
+                self.genomes[indexes[url]] = self._loader.decode(entry)
+
+        pending = [x for x in self.genomes if x.sequences is None]
+        if len(pending) > 0:
+            for reference in pending:
+                logging.info(f"Processing {reference} as it has no sequences.")
+
+            def on_done(reference: Genome, genome: Genome):
+                self.genomes[indexes[reference.fasta_url]] = genome
+                journal.record(reference.fasta_url, self._loader.encode(genome))
+
+            scheduler = IngestionScheduler(
+                {
+                    "network": self._config.ingestion_downloads,
+                    "cpu": self._config.ingestion_compressions,
+                    "disk": self._config.ingestion_indexings,
+                }
+            )
+            scheduler.run(
+                pending,
+                [
+                    ("network", self._download_for_ingestion),
+                    ("cpu", lambda x: self._compress(*x)),
+                    ("disk", self._finish_ingestion),
+                ],
+                on_done,
+            )
+        self._loader.save(self.genomes)
+        journal.clear()
+
+    def _new_genome(self, url, source, build) -> Genome:
+        return Genome(
+            url, source=source, build=build, parent_folder=self._config.genomes
+        )
+
+    def _download_for_ingestion(self, reference: Genome) -> tuple[Genome, Path]:
+        genome = self._new_genome(
+            reference.fasta_url, reference.source, reference.build
+        )
+        md5 = reference.decompressed_md5
+        if self._store is not None and md5 is not None:
+            with self._store.lock(md5):
+                if self._store.link_into(genome, md5):
+                    # Nothing is downloaded: the files are the ones described
+                    # by the reference.
+                    for name in _FILE_ATTRIBUTES:
+                        setattr(genome, name, getattr(reference, name))
+                    return genome, None
+        return genome, self._download(genome)
+
+    def _finish_ingestion(self, genome: Genome) -> Genome:
+        self._create_companion_files(genome)
+        self._share(genome)
+        genome.sequences = self._get_sequences(genome)
+        return genome
 
-    def self_test(self):
-        for index, reference in enumerate(self.genomes):
-            if reference.sequences is None:
-                try:
-                    logging.info(f"Processing {reference} as it has no sequences.")
-                    genome = self.ingest(
-                        reference.fasta_url, reference.source, reference.build
-                    )
-                    self.genomes[index] = genome
-                    self._loader.save(self.genomes)
-                except Exception as e:
-                    logging.critical(e)
+    def _share(self, genome: Genome):
+        if self._store is None or genome.decompressed_md5 is None:
+            return
+        with self._store.lock(genome.decompressed_md5):
+            self._store.publish(genome)
+
+    def _download(
+        self, genome: Genome, progress: Callable[[str, int], None] = None, force=False
+    ) -> Optional[Path]:
+        """Download the FASTA of a genome, unless it's already available.
+
+        Returns:
+            Optional[Path]: Downloaded file, None if the genome is already in
+                the repository and `force` is False.
+        """
+        if genome.fasta.exists() and not force:
+            logging.info(f"File {genome.fasta.name} already exist. Re-using it.")
+            return None
+        elif genome.fasta.exists() and force:
+            genome.fasta.unlink()
+            # Sizes and hashes of the previous file.
+            for attribute in _FILE_ATTRIBUTES:
+                setattr(genome, attribute, None)
+
+        logging.info(f"Start Downloading from: {genome.fasta_url}.")
+        return Downloader().perform(
+            genome, progress  # , f"[1/4] Downloading from: {genome.fasta_url}"
+        )
+
+    def _compress(self, genome: Genome, downloaded: Optional[Path]) -> Genome:
+        """Convert a downloaded FASTA to BGZip, if it's not already."""
+        if downloaded is None:
+            return genome
+        compressor = BGzip()
+        if SERVICES.get(FileTypeChecker).get_type(downloaded) == FileType.BGZIP:
+            logging.info(f"Already in BGZip format: {downloaded.name}.")
+            compressor.perform(genome, downloaded)
+            # The downloaded file is used as it is: no need to hash it again.
+            genome.bgzip_size = genome.download_size
+            genome.bgzip_md5 = genome.downloaded_md5
+            genome.bgzip_sha256 = genome.downloaded_sha256
+        else:
+            logging.info(f"Start recompressing to BGZip: {downloaded.name}.")
+            self._recompress(genome, downloaded, Decompressor(), compressor)
+        return genome
 
     def acquire(
         self, genome: Genome, progress: Callable[[str, int], None] = None, force=False
@@ -186,49 +438,34 @@ class Repository:
         Returns:
             Genome: The reference genome.
         """
-        downloader = Downloader()
-        decompressor = Decompressor()
-        compressor = BGzip()
+        if self._store is None or genome.decompressed_md5 is None:
+            self._acquire(genome, progress, force)
+        else:
+            # Whoever comes first acquires the genome, the others wait and
+            # reuse it from the shared store.
+            with self._store.lock(genome.decompressed_md5):
+                if not force and self._store.link_into(genome):
+                    self._create_companion_files(genome)
+                else:
+                    self._acquire(genome, progress, force)
+        self._share(genome)
+        return genome
 
-        if genome.fasta.exists() and not force:
-            logging.info(f"File {genome.fasta.name} already exist. Re-using it.")
+    def _acquire(
+        self, genome: Genome, progress: Callable[[str, int], None], force: bool
+    ):
+        downloaded = self._download(genome, progress, force)
+        if downloaded is None:
             self._create_companion_files(genome, force)
-            return genome
-        elif genome.fasta.exists() and force:
-            genome.fasta.unlink()
-            genome.bgzip_md5 = None
-            genome.downloaded_md5 = None
-            genome.decompressed_md5 = None
-            genome.bgzip_size = None
-            genome.download_size = None
-            genome.decompressed_size = None
-
-        logging.info(f"Start Downloading from: {genome.fasta_url}.")
-        download_output = downloader.perform(
-            genome, progress  # , f"[1/4] Downloading from: {genome.fasta_url}"
-        )
-        logging.info(f"Start Decompressing: {download_output.name}.")
-        decompressor_output = decompressor.perform(
-            genome,
-            # progress,
-            download_output,
-            # f"[2/4] Decompressing: {download_output.name}",
-        )
-        logging.info(f"Start compressing to BGZip: {decompressor_output.name}.")
-        compressor_output = compressor.perform(
-            genome,
-            # progress,
-            decompressor_output,
-            # f"[3/4] Compressing to BGZip: {decompressor_output.name}",
-        )
-        logging.info(f"Creating companion files: {compressor_output.name}.")
+            return
+        self._compress(genome, downloaded)
+        logging.info(f"Creating companion files: {genome.fasta.name}.")
         self._create_companion_files(
             genome,
             force,
             progress,
-            f"[4/4] Creating companion files: {compressor_output.name}",
+            f"[4/4] Creating companion files: {genome.fasta.name}",
         )
-        return genome
 
     def ingest(self, url, source, build, force=False):
         """Add a genome to the repository.
@@ -256,41 +493,25 @@ class Repository:
             >>> )
             >>> GenomeMetadataLoader().save(manager.genomes)
         """
-        genome = Genome(
-            url, source=source, build=build, parent_folder=self._config.genomes
-        )
+        genome = self._new_genome(url, source, build)
         logging.info(f"Ingesting {genome}.")
-        genome = self.acquire(genome, force)
+        genome = self.acquire(genome, force=force)
         genome.sequences = self._get_sequences(genome)
         return genome
 
 
 def unused():
-    import tempfile
-    import hashlib
-    from os import close
-    import pathlib
-
     genomes = MetadataLoader().load()
-    decompressor = BGzip()
     for genome in genomes:
         if genome.decompressed_md5 is None:
             continue
         if genome.fasta.exists():
-            temp = tempfile.mkstemp(suffix=None, prefix=None, dir=None, text=False)
-            close(temp[0])
-            temp_file = pathlib.Path(temp[1])
-            temp_file.unlink()
-            decompressor.bgzip_wrapper(genome.fasta, temp_file, BgzipAction.Decompress)
-            md5_hash = hashlib.md5()
-            with temp_file.open("rb") as f:
-                while True:
-                    chunk = f.read(4096 * 1000)
-                    if not chunk:
-                        break
-                    md5_hash.update(chunk)
-            genome.decompressed_md5 = md5_hash.hexdigest()
-            temp_file.unlink()
+            # BGZF is a valid multi-member gzip: hash it while decompressing
+            # instead of writing the decompressed file to disk.
+            with GZipStreamReader(genome.fasta.open("rb")) as stream:
+                digest = HashingTee()
+                shutil.copyfileobj(stream, digest, 1024 * 1024)
+            genome.decompressed_md5 = digest.md5
     MetadataLoader().save(genomes)
     exit()
 
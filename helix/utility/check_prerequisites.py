@@ -1,13 +1,20 @@
 import enum
 import inspect
+import json
 import logging
+import os
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import TimedRotatingFileHandler
+from pathlib import Path
 from subprocess import Popen
 
 import helix.utility.external
 from helix.configuration import MANAGER_CFG
 from helix.utility.external import External
+from helix.utility.services import SERVICES
+from helix.utility.startup_profiler import StartupProfiler
 
 logger = logging.getLogger(__name__)
 
@@ -43,10 +50,25 @@ class PrerequisiteIssue:
 
 
 class CheckPrerequisites:
-    def __init__(self) -> None:
+    """Check the configuration and the external tools needed by helix.
+
+    External tools are probed concurrently. A tool that worked is not probed
+    again until its binary changes (different path, size or modification time).
+
+    Args:
+        cache_path (Path, optional): Where to remember the tools that worked.
+            Defaults to prerequisites.json in the temporary folder.
+        threads (int, optional): Maximum concurrent probes. Defaults to 8.
+    """
+
+    def __init__(self, cache_path: Path = None, threads: int = 8) -> None:
         self._repo = MANAGER_CFG.REPOSITORY
         self._ext = MANAGER_CFG.EXTERNAL
         self._gen = MANAGER_CFG.GENERAL
+        self._cache_path = cache_path
+        if self._cache_path is None and self._repo.temporary is not None:
+            self._cache_path = self._repo.temporary.joinpath("prerequisites.json")
+        self._threads = threads
         self._config_logging()
 
     def _config_logging(self):
@@ -170,32 +192,18 @@ class CheckPrerequisites:
                 )
             )
 
-        ext = External()
+        ext = SERVICES.get(External)
         members = inspect.getmembers(External, lambda x: inspect.isfunction(x))
         decorated = [x[1] for x in members if hasattr(x[1], "wrapper")]
-        for f in decorated:
-            try:
-                result: Popen = f(
-                    ext,
-                    stdout=subprocess.PIPE,
-                    stdin=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-                result.communicate()
-            except FileNotFoundError:
-                m = PrerequisiteIssue(
-                    PrerequisiteIssueSeverity.ERROR,
-                    PrerequisiteIssueType.MISSING_BINARY,
-                    f.__name__,
-                )
-                missing[PrerequisiteIssueSeverity.ERROR].append(m)
-            except Exception as e:
-                m = PrerequisiteIssue(
-                    PrerequisiteIssueSeverity.ERROR,
-                    PrerequisiteIssueType.BINARY_ERROR,
-                    f"{f.__name__} : {e!s}",
-                )
-                missing[PrerequisiteIssueSeverity.ERROR].append(m)
+        cache = self._load_cache()
+        # Probes are independent and mostly wait for the process (i.e., the JVM)
+        # to start: run them concurrently.
+        with ThreadPoolExecutor(max(1, min(self._threads, len(decorated)))) as pool:
+            results = list(pool.map(lambda f: self._probe(ext, f, cache), decorated))
+        for issue in results:
+            if issue is not None:
+                missing[issue.severity].append(issue)
+        self._save_cache(cache)
         logging.getLogger(helix.utility.external.__name__).setLevel(old_level)
         logger.info(
             f"Self test ended: {len(missing[PrerequisiteIssueSeverity.ERROR])} errors, "
@@ -204,6 +212,67 @@ class CheckPrerequisites:
         )
         return missing
 
+    def _probe(self, ext: External, f, cache: dict) -> PrerequisiteIssue:
+        start = time.perf_counter()
+        path = helix.utility.external.which(f.__name__)
+        stamp = None
+        if path is not None:
+            stat = os.stat(path)
+            stamp = [stat.st_size, stat.st_mtime_ns]
+            if cache.get(path) == stamp:
+                logger.debug(f"{f.__name__} is unchanged since the last check.")
+                return None
+        try:
+            result: Popen = f(
+                ext,
+                stdout=subprocess.PIPE,
+                stdin=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            result.communicate()
+            self._record_probe(f.__name__, time.perf_counter() - start)
+        except FileNotFoundError:
+            return PrerequisiteIssue(
+                PrerequisiteIssueSeverity.ERROR,
+                PrerequisiteIssueType.MISSING_BINARY,
+                f.__name__,
+            )
+        except Exception as e:
+            return PrerequisiteIssue(
+                PrerequisiteIssueSeverity.ERROR,
+                PrerequisiteIssueType.BINARY_ERROR,
+                f"{f.__name__} : {e!s}",
+            )
+        # Only successful probes are cached.
+        if stamp is not None:
+            cache[path] = stamp
+        return None
+
+    def _load_cache(self) -> dict[str, list[int]]:
+        if self._cache_path is None or not self._cache_path.exists():
+            return {}
+        try:
+            with self._cache_path.open("rt") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring invalid cache {self._cache_path!s}: {e!s}")
+            return {}
+
+    def _save_cache(self, cache: dict[str, list[int]]):
+        if self._cache_path is None:
+            return
+        try:
+            self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._cache_path.open("wt") as f:
+                json.dump(cache, f)
+        except OSError as e:
+            logger.warning(f"Unable to save {self._cache_path!s}: {e!s}")
+
+    def _record_probe(self, name: str, seconds: float):
+        logger.debug(f"Probing {name} took {seconds:.3f}s.")
+        if StartupProfiler.active is not None:
+            StartupProfiler.active.record_probe(name, seconds)
+
 
 if __name__ == "__main__":
     failing = CheckPrerequisites().check_prerequisites()
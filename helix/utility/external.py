@@ -4,7 +4,11 @@ import shlex
 import shutil
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Optional
 
 from helix.configuration import MANAGER_CFG
 from helix.progress.process_io_monitor import ProcessIOMonitor
@@ -19,6 +23,52 @@ if sys.platform == "win32":
         os.environ["PATHEXT"] += ";.JAR"
 
 
+# Resolved binaries, by name and PATH, as PATH may change at runtime.
+_BINARY_PATHS: dict[tuple[str, str], str] = {}
+_BINARY_PATHS_LOCK = threading.Lock()
+
+
+def which(name: str) -> Optional[str]:
+    """Same as shutil.which, but remembers the result until PATH changes.
+    Missing binaries are looked up again, as they may be installed later."""
+    key = (name, os.environ.get("PATH", ""))
+    with _BINARY_PATHS_LOCK:
+        if key in _BINARY_PATHS:
+            return _BINARY_PATHS[key]
+    path = shutil.which(name)
+    if path is not None:
+        with _BINARY_PATHS_LOCK:
+            _BINARY_PATHS[key] = path
+    return path
+
+
+class Invocation:
+    """Timing of a call to an external executable.
+
+    Args:
+        name (str): Name of the executable.
+        args (list[str]): Full command line.
+        duration (float): Seconds spent in the call. When the caller doesn't
+            wait for the process, this is only the time needed to start it.
+        returncode (int, optional): Exit code, None if the process is still
+            running.
+    """
+
+    def __init__(
+        self, name: str, args: list[str], duration: float, returncode: int = None
+    ) -> None:
+        self.name = name
+        self.args = args
+        self.duration = duration
+        self.returncode = returncode
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.duration:.3f}s (exit code {self.returncode})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
 def exe(f, interpreter=[]):
     """This decorator will return a function that will try to launch
     an executable from disk that has the same name of the function
@@ -39,7 +89,8 @@ def exe(f, interpreter=[]):
         io=None,
         text=False,
     ):
-        binary_path = shutil.which(f.__name__)
+        start = time.perf_counter()
+        binary_path = which(f.__name__)
         if binary_path is None:
             raise FileNotFoundError(f"Unable to find the binary: {f.__name__}")
 
@@ -71,9 +122,17 @@ def exe(f, interpreter=[]):
             monitor.start()
         if wait is True:
             out, err = output.communicate()
+            self._notify(
+                Invocation(
+                    f.__name__, args, time.perf_counter() - start, output.returncode
+                )
+            )
             if output.returncode != 0:
-                raise RuntimeError(f"Call to {f.__name__} failed: {err.decode()}")
+                if text is False:
+                    err = err.decode()
+                raise RuntimeError(f"Call to {f.__name__} failed: {err}")
             return out
+        self._notify(Invocation(f.__name__, args, time.perf_counter() - start))
         return output
 
     decorated = execute_binary
@@ -94,7 +153,7 @@ def jar(f):
     Returns:
         callable: Decorated function
     """
-    full_path = shutil.which(f.__name__)
+    full_path = which(f.__name__)
     if full_path is None:
         # Should raise NotImplementedError
         f.wrapper = jar
@@ -130,6 +189,7 @@ class External:
                 A `root` directory was configured but it doesn't exist.
         """
         self._config = config
+        self._hooks: list[Callable[[Invocation], None]] = []
         if not self._config.root.exists():
             raise FileNotFoundError(
                 f"Unable to find root directory for External: {str(self._config.root)}"
@@ -137,6 +197,56 @@ class External:
         if str(self._config.root) not in os.environ["PATH"]:
             os.environ["PATH"] += ";" + str(self._config.root)
 
+    def add_hook(self, hook: Callable[[Invocation], None]):
+        """Register a function called with the timing of every invocation.
+
+        Args:
+            hook (Callable[[Invocation], None]): Function to call.
+
+        Examples:
+            >>> external.add_hook(lambda x: logging.debug(str(x)))
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Invocation], None]):
+        self._hooks.remove(hook)
+
+    def _notify(self, invocation: Invocation):
+        for hook in self._hooks:
+            hook(invocation)
+
+    def run_batch(
+        self, commands: list[tuple[str, list]], max_workers: int = None
+    ) -> list:
+        """Run several short-lived commands concurrently and wait for them.
+
+        Args:
+            commands (list[tuple[str, list]]): Name of the executable (one of
+                the methods of this class) and arguments of every command.
+            max_workers (int, optional): Maximum concurrent processes. Defaults
+                to the number of threads in the configuration.
+
+        Raises:
+            RuntimeError: One of the commands failed.
+
+        Returns:
+            list: Output of every command, in the same order of `commands`.
+
+        Examples:
+            >>> external.run_batch([("htsfile", [a]), ("htsfile", [b])])
+        """
+        if len(commands) == 0:
+            return []
+        if max_workers is None:
+            max_workers = self._config.threads or 1
+        max_workers = max(1, min(max_workers, len(commands)))
+        with ThreadPoolExecutor(max_workers) as pool:
+            futures = [
+                pool.submit(getattr(self, name), args, wait=True)
+                for name, args in commands
+            ]
+            return [x.result() for x in futures]
+
     def haplogrep_classify(self, vcf_file, output_file):
         # TODO: this needs to live in another class.
         output = self.haplogrep(
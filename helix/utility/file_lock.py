@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+def set_mode(path: Path, mode: int):
+    """Change the permissions of a file or folder, if it belongs to the
+    current user (only the owner can change them)."""
+    try:
+        if path.stat().st_mode & 0o7777 != mode:
+            os.chmod(path, mode)
+    except PermissionError:
+        pass
+
+
+class FileLock:
+    """Exclusive lock shared between processes (and users) through a file.
+
+    The lock is released when the file is closed, so it's never left behind
+    by a process that crashed.
+
+    Args:
+        path (Path): Lock file. It's created if it doesn't exist.
+        mode (int, optional): Permissions of the lock file, regardless of the
+            umask (i.e., 0o664 for a lock shared with the group). Defaults to
+            None, following the umask.
+
+    Examples:
+        >>> with FileLock(Path("/shared/genomes/locks/abc.lock")):
+        >>>     ...
+    """
+
+    def __init__(self, path: Path, mode: int = None) -> None:
+        self.path = path
+        self._mode = mode
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a+b")
+        if self._mode is not None:
+            set_mode(self.path, self._mode)
+        if sys.platform == "win32":
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds.
+                    time.sleep(1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+    def release(self):
+        if self._file is None:
+            return
+        if sys.platform == "win32":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
@@ -0,0 +1,162 @@
+import bisect
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from helix.naming.contig_order import ContigOrder
+
+
+class IntervalSet:
+    """Set of regions of a genome, 0-based and half-open as in BED files.
+
+    Intervals are normalized when the set is created: sorted, with the
+    overlapping and adjacent ones merged. Every sequence is stored as two
+    sorted arrays (starts and ends), so point and range queries are binary
+    searches and set operations are linear merges.
+
+    Args:
+        intervals (Iterable[tuple[str, int, int]], optional): Sequence name,
+            start and end of every interval. Defaults to an empty set.
+
+    Examples:
+        >>> wes = IntervalSet.load_bed(Path("wes.bed"))
+        >>> gaps = IntervalSet.load_bed(genome.bed)
+        >>> callable = wes.subtract(gaps)
+        >>> callable.coverage("chr1", 0, 1000000)
+    """
+
+    def __init__(self, intervals: Iterable[tuple[str, int, int]] = ()) -> None:
+        grouped: dict[str, list[tuple[int, int]]] = {}
+        for sequence, start, end in intervals:
+            if end > start:
+                grouped.setdefault(sequence, []).append((start, end))
+        self._sequences: dict[str, tuple[array, array]] = {}
+        for sequence, ranges in grouped.items():
+            ranges.sort()
+            starts, ends = array("q"), array("q")
+            for start, end in ranges:
+                if len(ends) > 0 and start <= ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self._sequences[sequence] = (starts, ends)
+
+    @staticmethod
+    def parse_bed(lines: Iterable[str]) -> "IntervalSet":
+        """Parse the lines of a BED file. Comments, track and browser lines
+        are skipped, as are columns after the end."""
+
+        def parse():
+            for line in lines:
+                if line.startswith(("#", "track", "browser")) or line.strip() == "":
+                    continue
+                sequence, start, end = line.split()[0:3]
+                yield sequence, int(start), int(end)
+
+        return IntervalSet(parse())
+
+    @staticmethod
+    def load_bed(path: Path) -> "IntervalSet":
+        with path.open("rt") as f:
+            return IntervalSet.parse_bed(f)
+
+    @property
+    def sequences(self) -> list[str]:
+        return list(self._sequences)
+
+    def __iter__(self) -> Iterator[tuple[str, int, int]]:
+        for sequence, (starts, ends) in self._sequences.items():
+            for start, end in zip(starts, ends):
+                yield sequence, start, end
+
+    def __len__(self) -> int:
+        return sum(len(x[0]) for x in self._sequences.values())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, IntervalSet) and list(self) == list(other)
+
+    def size(self, sequence: str = None) -> int:
+        """Bases in the set, in a sequence or in every sequence."""
+        names = self._sequences if sequence is None else [sequence]
+        total = 0
+        for name in names:
+            starts, ends = self._sequences.get(name, ((), ()))
+            total += sum(ends) - sum(starts)
+        return total
+
+    def contains(self, sequence: str, position: int) -> bool:
+        if sequence not in self._sequences:
+            return False
+        starts, ends = self._sequences[sequence]
+        index = bisect.bisect_right(starts, position) - 1
+        return index >= 0 and position < ends[index]
+
+    def overlapping(self, sequence: str, start: int, end: int) -> list[tuple[int, int]]:
+        """Intervals of a sequence overlapping [start, end), clipped to it."""
+        if sequence not in self._sequences:
+            return []
+        starts, ends = self._sequences[sequence]
+        overlaps = []
+        index = bisect.bisect_right(ends, start)
+        while index < len(starts) and starts[index] < end:
+            overlaps.append((max(starts[index], start), min(ends[index], end)))
+            index += 1
+        return overlaps
+
+    def coverage(self, sequence: str, start: int, end: int) -> int:
+        """Bases of [start, end) that are in the set."""
+        return sum(y - x for x, y in self.overlapping(sequence, start, end))
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet([*self, *other])
+
+    def intersection(self, other: "IntervalSet") -> "IntervalSet":
+        intervals = []
+        for sequence, (starts, ends) in self._sequences.items():
+            if sequence not in other._sequences:
+                continue
+            other_starts, other_ends = other._sequences[sequence]
+            i = j = 0
+            while i < len(starts) and j < len(other_starts):
+                start = max(starts[i], other_starts[j])
+                end = min(ends[i], other_ends[j])
+                if start < end:
+                    intervals.append((sequence, start, end))
+                # Move past the interval that ends first.
+                if ends[i] < other_ends[j]:
+                    i += 1
+                else:
+                    j += 1
+        return IntervalSet(intervals)
+
+    def subtract(self, other: "IntervalSet") -> "IntervalSet":
+        intervals = []
+        for sequence, (starts, ends) in self._sequences.items():
+            other_starts, other_ends = other._sequences.get(sequence, ((), ()))
+            j = 0
+            for start, end in zip(starts, ends):
+                while j < len(other_starts) and other_ends[j] <= start:
+                    j += 1
+                k = j
+                while k < len(other_starts) and other_starts[k] < end:
+                    if other_starts[k] > start:
+                        intervals.append((sequence, start, other_starts[k]))
+                    start = max(start, other_ends[k])
+                    k += 1
+                if start < end:
+                    intervals.append((sequence, start, end))
+        return IntervalSet(intervals)
+
+    def rename(self, name_map: dict[str, str]) -> "IntervalSet":
+        """Same intervals, with the sequences in `name_map` renamed."""
+        return IntervalSet((name_map.get(x, x), y, z) for x, y, z in self)
+
+    def to_bed(self) -> str:
+        """Content of a BED file, with sequences in canonical order."""
+        order = ContigOrder(self._sequences)
+        return "".join(
+            f"{sequence}\t{start}\t{end}\n"
+            for sequence in order
+            for start, end in zip(*self._sequences[sequence])
+        )
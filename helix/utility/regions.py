@@ -1,9 +1,17 @@
 from enum import Flag, auto
-import uuid
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
 
 from helix.configuration import MANAGER_CFG
 from helix.data.sequence import Sequence
 from helix.naming.converter import Converter
+from helix.utility.intervals import IntervalSet
+from helix.utility.services import SERVICES
 
 
 class RegionType(Flag):
@@ -19,14 +27,33 @@ class Regions:
     Since the bed files need to change according to the specific sequence naming
     of the loaded file, this class take care of loading the templates for these
     .bed files and convert them to the correct sequence naming.
+
+    Built .bed files are sorted, with overlapping regions merged, and cached:
+    in memory and in the temporary folder, where only the most recently used
+    `regions_cache_files` are kept. Files used in the last EVICTION_GRACE
+    seconds are never deleted, as another process may have just received them.
     """
 
-    def __init__(self, config=MANAGER_CFG.REPOSITORY, converter=Converter()) -> None:
-        self._templates = config.metadata.joinpath("bed_templates")
-        self._temporary = config.temporary
-        self._converter = converter
+    EVICTION_GRACE = 10 * 60
 
-    def get_path(self, build: str, type: RegionType, sequences: list[Sequence]):
+    def __init__(
+        self, config=MANAGER_CFG.REPOSITORY, converter: Converter = None
+    ) -> None:
+        self._templates = config.metadata.joinpath("bed_templates")
+        self._folder = config.temporary.joinpath("regions")
+        self._max_files = max(1, config.regions_cache_files)
+        self._converter = SERVICES.resolve(converter, Converter)
+        self._contents: dict[str, str] = {}
+        self._intervals: dict[str, IntervalSet] = {}
+        self._lock = threading.Lock()
+
+    def get_path(
+        self,
+        build: str,
+        type: RegionType,
+        sequences: Iterable[Sequence] = None,
+        gaps: Path = None,
+    ) -> Path:
         """Return the path of a .bed file that is built for a specific genome.
 
         Args:
@@ -34,7 +61,10 @@ class Regions:
             type (RegionType): RegionType of the region the caller is looking for.
                 Currently only Y or MT or WES are supported. Regions can be combined
                 but only Y | MT is a valid combination.
-            sequences (list[Sequence]): List of sequences from the input file.
+            sequences (Iterable[Sequence], optional): Sequences from the input
+                file. Defaults to None, keeping the names of the template.
+            gaps (Path, optional): .bed file of regions to exclude, i.e. the runs
+                of N of the reference (Genome.bed). Defaults to None.
 
         Raises:
             ValueError: An invalid combination of RegionTypes was provided.
@@ -43,49 +73,163 @@ class Regions:
         Returns:
             pathlib.Path: Path to the.bed file that is built for a specific genome.
         """
-        name_map = {x.canonic_name: x.name for x in sequences}
+        key, name_map = self._get_key(build, type, sequences, gaps)
+        path = self._folder.joinpath(f"{key}.bed")
+        with self._lock:
+            if path.exists():
+                # Most recently used files are evicted last.
+                os.utime(path)
+                return path
+            content = self._get_content(key, build, type, name_map, gaps)
+            self._folder.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_name(path.name + ".tmp")
+            with temporary.open("w", newline="\n") as f:
+                f.write(content)
+            temporary.replace(path)
+            self._evict()
+        return path
+
+    def get_content(
+        self,
+        build: str,
+        type: RegionType,
+        sequences: Iterable[Sequence] = None,
+        gaps: Path = None,
+    ) -> str:
+        """Build and get the content of a .bed file.
 
-        suffix = ""
+        Args:
+            build (str): Build name.
+            type (RegionType): RegionType of the region.
+            sequences (Iterable[Sequence], optional): Sequences from the input
+                file. Defaults to None, keeping the names of the template.
+            gaps (Path, optional): .bed file of regions to exclude. Defaults
+                to None.
+
+        Returns:
+            str: Content of the .bed file.
+        """
+        key, name_map = self._get_key(build, type, sequences, gaps)
+        with self._lock:
+            return self._get_content(key, build, type, name_map, gaps)
+
+    def get_intervals(
+        self,
+        build: str,
+        type: RegionType,
+        sequences: Iterable[Sequence] = None,
+        gaps: Path = None,
+    ) -> IntervalSet:
+        """Same as get_content, as an IntervalSet to combine with other
+        regions."""
+        key, name_map = self._get_key(build, type, sequences, gaps)
+        with self._lock:
+            return self._get_intervals(key, build, type, name_map, gaps)
+
+    def _get_key(
+        self,
+        build: str,
+        type: RegionType,
+        sequences: Iterable[Sequence],
+        gaps: Optional[Path],
+    ) -> tuple[str, dict[str, str]]:
         if type & RegionType.Y and type & RegionType.WES:
             raise ValueError("Invalid combination: Y and WES")
         if type & RegionType.MT and type & RegionType.WES:
             raise ValueError("Invalid combination: MT and WES")
-
+        name_map = {}
+        if sequences is not None:
+            name_map = {x.canonic_name: x.name for x in sequences}
+        template = self._get_template(build, type)
+        # Files with the same naming share the same .bed, which is built again
+        # when the template or the gaps change.
+        identity = [
+            str(build),
+            type.value,
+            sorted(name_map.items()),
+            str(template.absolute()),
+            template.stat().st_mtime_ns,
+        ]
+        if gaps is not None:
+            identity.extend([str(gaps.absolute()), gaps.stat().st_mtime_ns])
+        identity = json.dumps(identity)
+        return hashlib.sha1(identity.encode("utf8")).hexdigest(), name_map
+
+    def _get_content(
+        self,
+        key: str,
+        build: str,
+        type: RegionType,
+        name_map: dict[str, str],
+        gaps: Optional[Path],
+    ) -> str:
+        content = self._contents.get(key)
+        if content is None:
+            intervals = self._get_intervals(key, build, type, name_map, gaps)
+            content = intervals.to_bed()
+            self._contents[key] = content
+        return content
+
+    def _get_intervals(
+        self,
+        key: str,
+        build: str,
+        type: RegionType,
+        name_map: dict[str, str],
+        gaps: Optional[Path],
+    ) -> IntervalSet:
+        intervals = self._intervals.get(key)
+        if intervals is not None:
+            return intervals
+
+        rows = []
+        # Canonical name -> name in the output.
+        names = {}
+        with self._get_template(build, type).open("r") as f:
+            for line in f:
+                if line.strip() == "":
+                    continue
+                sequence, begin, end = line.split(",")[0:3]
+                canonical = Converter.canonicalize(sequence)
+                sequence = name_map.get(canonical, sequence)
+                names.setdefault(canonical, sequence)
+                rows.append((sequence, int(begin), int(end)))
+        intervals = IntervalSet(rows)
+        if gaps is not None:
+            # The gaps use the naming of the reference, which may differ from
+            # the one of the input file and of the template.
+            excluded = IntervalSet.load_bed(gaps)
+            excluded = excluded.rename(
+                {x: names.get(Converter.canonicalize(x), x) for x in excluded.sequences}
+            )
+            intervals = intervals.subtract(excluded)
+        self._intervals[key] = intervals
+        return intervals
+
+    def _get_template(self, build: str, type: RegionType) -> Path:
+        suffix = ""
         if type & RegionType.Y:
             suffix += "_y"
         if type & RegionType.MT:
             suffix += "_mt"
         if type & RegionType.WES:
             suffix += "_wes"
-        file_name = f"{build}{suffix}.csv"
-        file = self._templates.joinpath(file_name)
+        file = self._templates.joinpath(f"{build}{suffix}.csv")
         if not file.exists():
             raise FileNotFoundError(f"Unable to find BED template at: {file!s}")
-        with file.open("r") as f:
-            lines = f.readlines()
-            rows = []
-            for line in lines:
-                line = line.split(",")
-                sequence = line[0]
-                begin = line[1]
-                end = line[2].strip()
-                if sequence in name_map:
-                    sequence = name_map[sequence]
-                rows.append(f"{sequence}\t{begin}\t{end}\n")
-        temporary_file = self._temporary.joinpath(str(uuid.uuid4()))
-        with temporary_file.open("w") as f:
-            f.writelines(rows)
-        return temporary_file
-
-    def get_content(self, build: str, type: RegionType):
-        """Build and get the content of a .bed file.
-
-        Args:
-            build (str): Build name.
-            type (RegionType): RegionType of the region.
-
-        Returns:
-            str: Content of the .bed file.
-        """
-        file = self.get_path(build, type)
-        return file.read_text("utf-8")
+        return file
+
+    def _evict(self):
+        used = {}
+        for file in self._folder.glob("*.bed"):
+            try:
+                used[file] = file.stat().st_mtime
+            except FileNotFoundError:
+                # Evicted by another process.
+                continue
+        files = sorted(used, key=used.get)
+        count = max(0, len(files) - self._max_files)
+        recent = time.time() - Regions.EVICTION_GRACE
+        for file in files[0:count]:
+            if used[file] < recent:
+                file.unlink(missing_ok=True)
@@ -5,16 +5,17 @@ import subprocess
 from helix.configuration import MANAGER_CFG
 from helix.data.file_type import FileType
 from helix.utility.external import External
+from helix.utility.services import SERVICES
 
 
 class Samtools:
     def __init__(
         self,
-        external: External = External(),
+        external: External = None,
         config=MANAGER_CFG.EXTERNAL,
         repo=MANAGER_CFG.REPOSITORY,
     ) -> None:
-        self._external = external
+        self._external = SERVICES.resolve(external, External)
         self._config = config
         self._repository_config = repo
 
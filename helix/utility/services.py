@@ -0,0 +1,64 @@
+import threading
+from typing import Callable, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class ServiceRegistry:
+    """Shared instances of the services used across helix (Repository,
+    Samtools, External, ...), created the first time they are requested.
+
+    Constructors take their dependencies as optional arguments: when an
+    argument is None, the shared instance is used. This keeps importing a
+    module free of side effects (loading catalogs, creating folders, etc.)
+    and avoids building the same object more than once.
+
+    Examples:
+        >>> repository = SERVICES.get(Repository)
+        >>> SERVICES.register(Repository, lambda: Repository(loader=my_loader))
+    """
+
+    def __init__(self) -> None:
+        self._factories: dict[type, Callable[[], object]] = {}
+        self._instances: dict[type, object] = {}
+        # Creating a service may request other services.
+        self._lock = threading.RLock()
+
+    def register(self, service: Type[T], factory: Callable[[], T] = None):
+        """Set how a service is created, replacing the current instance.
+
+        Args:
+            service (Type[T]): Class of the service.
+            factory (Callable[[], T], optional): Function creating the instance.
+                Defaults to None, calling the class without arguments.
+        """
+        with self._lock:
+            self._factories[service] = factory if factory is not None else service
+            self._instances.pop(service, None)
+
+    def get(self, service: Type[T]) -> T:
+        """Get the shared instance of a service, creating it if needed."""
+        instance = self._instances.get(service)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if service not in self._instances:
+                factory = self._factories.get(service, service)
+                self._instances[service] = factory()
+            return self._instances[service]
+
+    def resolve(self, instance: Optional[T], service: Type[T]) -> T:
+        """Return `instance`, or the shared instance of the service if None."""
+        return instance if instance is not None else self.get(service)
+
+    def is_created(self, service: type) -> bool:
+        return service in self._instances
+
+    def reset(self):
+        """Drop every instance and custom factory."""
+        with self._lock:
+            self._factories.clear()
+            self._instances.clear()
+
+
+SERVICES = ServiceRegistry()
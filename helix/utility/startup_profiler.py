@@ -0,0 +1,184 @@
+import importlib.abc
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+# Only the standard library can be imported here: the profiler must be
+# installed before anything else is imported.
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, profiler: "StartupProfiler") -> None:
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler._time_import(module.__name__):
+            self._loader.exec_module(module)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimedFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, profiler: "StartupProfiler") -> None:
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self._profiler)
+                return spec
+        return None
+
+
+class StartupProfiler:
+    """Record where the time is spent while helix starts.
+
+    The profiler collects:
+
+    - the import time of every module, like `python -X importtime` (self time
+      and cumulative time, including the modules imported by it),
+    - the duration of named phases (i.e., the prerequisite checks),
+    - the duration of every prerequisite probe,
+    - milestones measured since the start, like the time to the first window.
+
+    Everything is written to a JSON report by `save()`.
+
+    Args:
+        report (Path): Where to save the report.
+
+    Examples:
+        >>> profiler = StartupProfiler.from_arguments(sys.argv)
+        >>> with profiler.phase("prerequisites"):
+        >>>     CheckPrerequisites().check_prerequisites()
+        >>> profiler.mark("first_window")
+        >>> profiler.save()
+    """
+
+    ENVIRONMENT_VARIABLE = "HELIX_PROFILE_STARTUP"
+    ARGUMENT = "--profile-startup"
+
+    # Profiler of the current process, None if profiling is disabled.
+    active: Optional["StartupProfiler"] = None
+
+    def __init__(self, report: Path) -> None:
+        self.report = report
+        self.modules: dict[str, dict[str, float]] = {}
+        self.phases: dict[str, float] = {}
+        self.probes: dict[str, float] = {}
+        self.milestones: dict[str, float] = {}
+        self._start = time.perf_counter()
+        self._stack: list[list[float]] = []
+        self._finder: _TimedFinder = None
+
+    @staticmethod
+    def from_arguments(
+        arguments: list[str], default_report: Path = Path("startup_profile.json")
+    ) -> Optional["StartupProfiler"]:
+        """Create and start a profiler if it was requested through the command
+        line (`--profile-startup [report]`) or the HELIX_PROFILE_STARTUP
+        environment variable (set to the report path, or to 1).
+
+        Args:
+            arguments (list[str]): Command line arguments.
+            default_report (Path, optional): Report path if none is specified.
+
+        Returns:
+            Optional[StartupProfiler]: The started profiler, None if disabled.
+        """
+        report = None
+        if StartupProfiler.ARGUMENT in arguments:
+            index = arguments.index(StartupProfiler.ARGUMENT)
+            start, end = index + 1, index + 2
+            following = arguments[start:end]
+            if len(following) > 0 and not following[0].startswith("-"):
+                report = Path(following[0])
+            else:
+                report = default_report
+        elif os.environ.get(StartupProfiler.ENVIRONMENT_VARIABLE, "") not in ["", "0"]:
+            value = os.environ[StartupProfiler.ENVIRONMENT_VARIABLE]
+            report = default_report if value == "1" else Path(value)
+        if report is None:
+            return None
+        profiler = StartupProfiler(report)
+        profiler.start()
+        return profiler
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._finder = _TimedFinder(self)
+        sys.meta_path.insert(0, self._finder)
+        StartupProfiler.active = self
+
+    def stop(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        if StartupProfiler.active is self:
+            StartupProfiler.active = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def record_probe(self, name: str, seconds: float):
+        self.probes[name] = seconds
+
+    def mark(self, name: str):
+        self.milestones[name] = self.elapsed
+
+    @contextmanager
+    def _time_import(self, name: str):
+        # Like -X importtime, the self time excludes nested imports.
+        start = time.perf_counter()
+        self._stack.append([0.0])
+        try:
+            yield
+        finally:
+            cumulative = time.perf_counter() - start
+            nested = self._stack.pop()[0]
+            if len(self._stack) > 0:
+                self._stack[-1][0] += cumulative
+            self.modules[name] = {"self": cumulative - nested, "cumulative": cumulative}
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.elapsed,
+            "milestones": self.milestones,
+            "phases": self.phases,
+            "probes": self.probes,
+            "imports": {
+                "total": sum(x["self"] for x in self.modules.values()),
+                "modules": dict(
+                    sorted(
+                        self.modules.items(),
+                        key=lambda x: x[1]["cumulative"],
+                        reverse=True,
+                    )
+                ),
+            },
+        }
+
+    def save(self):
+        self.report.parent.mkdir(parents=True, exist_ok=True)
+        with self.report.open("wt") as f:
+            json.dump(self.to_dict(), f, indent=2)
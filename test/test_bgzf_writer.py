@@ -0,0 +1,58 @@
+import gzip
+import hashlib
+import struct
+
+from helix.files.bgzf_writer import BGZF_BLOCK_SIZE, BGZF_EOF, BGZFWriter
+from test.genome_fixtures import remote_repo_fixture
+
+
+def test_output_is_valid_bgzf(remote_repo_fixture, tmp_path):
+    fasta = remote_repo_fixture["fasta"]["file_on_disk"].read_bytes()
+    output = tmp_path.joinpath("out.fa.gz")
+
+    with BGZFWriter(output, 2) as sut:
+        sut.write(fasta)
+
+    content = output.read_bytes()
+    assert gzip.decompress(content) == fasta
+    assert content[12:14] == b"BC"
+    assert content.endswith(BGZF_EOF)
+    assert sut.uncompressed_md5 == remote_repo_fixture["fasta"]["md5"]
+    assert sut.uncompressed_size == remote_repo_fixture["fasta"]["size"]
+    assert sut.compressed_md5 == hashlib.md5(content).hexdigest()
+    assert sut.compressed_size == len(content)
+
+
+def test_gzi_has_an_entry_per_block(tmp_path):
+    data = b"ACGT" * BGZF_BLOCK_SIZE
+    output = tmp_path.joinpath("out.fa.gz")
+    gzi = tmp_path.joinpath("out.fa.gz.gzi")
+
+    with BGZFWriter(output, 4, gzi=gzi) as sut:
+        for index in range(0, len(data), 1000):
+            sut.write(data[index : index + 1000])
+
+    raw = gzi.read_bytes()
+    entries = struct.unpack_from("<Q", raw)[0]
+    offsets = struct.unpack_from(f"<{entries * 2}Q", raw, 8)
+    assert entries == 4
+    assert offsets[1::2] == (
+        BGZF_BLOCK_SIZE,
+        BGZF_BLOCK_SIZE * 2,
+        BGZF_BLOCK_SIZE * 3,
+        BGZF_BLOCK_SIZE * 4,
+    )
+    assert offsets[-2] == len(output.read_bytes()) - len(BGZF_EOF)
+    assert gzip.decompress(output.read_bytes()) == data
+
+
+def test_fai_is_generated(tmp_path):
+    data = b">chr1 description\nACGTA\nCG\n>chr2\r\nAAAA\r\nAA\r\n"
+    output = tmp_path.joinpath("out.fa.gz")
+    fai = tmp_path.joinpath("out.fa.gz.fai")
+
+    with BGZFWriter(output, fai=fai) as sut:
+        for byte in data:
+            sut.write(bytes([byte]))
+
+    assert fai.read_text() == "chr1\t7\t18\t5\t6\nchr2\t6\t34\t4\t6\n"
@@ -0,0 +1,54 @@
+import os
+import stat
+import subprocess
+
+import pytest
+
+from helix.utility.check_prerequisites import CheckPrerequisites, PrerequisiteIssueType
+
+
+@pytest.fixture()
+def tool(tmp_path, monkeypatch):
+    binary = tmp_path.joinpath("fake_tool")
+    counter = tmp_path.joinpath("calls")
+    binary.write_text(f"#!/bin/sh\necho x >> {counter}\n")
+    binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ["PATH"])
+
+    def fake_tool(self, **kwargs):
+        return subprocess.Popen([str(binary)], **kwargs)
+
+    return fake_tool, binary, counter
+
+
+@pytest.fixture()
+def sut(tmp_path, monkeypatch):
+    monkeypatch.setattr(CheckPrerequisites, "_config_logging", lambda self: None)
+    return CheckPrerequisites(tmp_path.joinpath("cache.json"))
+
+
+def test_successful_probe_is_cached(sut, tool):
+    fake_tool, _, counter = tool
+    cache = {}
+
+    assert sut._probe(None, fake_tool, cache) is None
+    assert sut._probe(None, fake_tool, cache) is None
+    assert counter.read_text().count("x") == 1
+
+
+def test_changed_binary_is_probed_again(sut, tool):
+    fake_tool, binary, counter = tool
+    cache = {}
+    sut._probe(None, fake_tool, cache)
+
+    binary.write_text(binary.read_text() + "# updated\n")
+    sut._probe(None, fake_tool, cache)
+    assert counter.read_text().count("x") == 2
+
+
+def test_missing_binary_is_reported(sut):
+    def missing_tool(self, **kwargs):
+        raise FileNotFoundError()
+
+    issue = sut._probe(None, missing_tool, {})
+    assert issue.type == PrerequisiteIssueType.MISSING_BINARY
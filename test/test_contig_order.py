@@ -0,0 +1,31 @@
+from helix.naming.contig_order import ContigOrder
+
+
+def test_names_are_ranked_in_canonical_order():
+    sut = ContigOrder(["chrM", "chrUn_KI270302v1", "chr10", "chrX", "chr2", "*"])
+
+    assert list(sut) == ["chr2", "chr10", "chrX", "chrM", "chrUn_KI270302v1", "*"]
+    assert sut.rank("chr2") == 0
+    assert sut.rank("chrM") == 3
+    assert sut.rank("chr3") == len(sut)
+
+
+def test_other_sequences_can_be_excluded():
+    sut = ContigOrder(["chrUn_KI270302v1", "chr1", "*"], others=False)
+
+    assert list(sut) == ["chr1"]
+    assert "chrUn_KI270302v1" not in sut
+
+
+def test_records_are_sorted_by_sequence_and_position():
+    sut = ContigOrder(["chr1", "chr2", "chrX"])
+    rows = [("chrX", 5), ("chr2", 30), ("chr9", 1), ("chr2", 10), ("chr1", 7)]
+
+    assert sut.sort(rows, lambda x: x[0], lambda x: x[1]) == [
+        ("chr1", 7),
+        ("chr2", 10),
+        ("chr2", 30),
+        ("chrX", 5),
+        ("chr9", 1),
+    ]
+    assert sut.sort(["chrX", "chr1"]) == ["chr1", "chrX"]
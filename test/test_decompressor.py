@@ -1,7 +1,15 @@
+import bz2
 import filecmp
+import gzip
+import io
 import shutil
+import sys
+
+import pytest
+
+import helix.files.decompressor
 from helix.data.genome import Genome
-from helix.files.decompressor import Decompressor
+from helix.files.decompressor import Decompressor, GZipStreamReader
 from test.genome_fixtures import remote_repo_fixture, format_map
 
 
@@ -60,3 +68,95 @@ def test_decompress_razf(remote_repo_fixture, tmp_path_factory):
     assert filecmp.cmp(output, remote_repo_fixture["fasta"]["file_on_disk"])
     assert remote_repo_fixture["fasta"]["md5"] == genome.decompressed_md5
     assert remote_repo_fixture["fasta"]["size"] == genome.decompressed_size
+
+
+def test_stream_razf_ignores_trailing_data(remote_repo_fixture):
+    razf = remote_repo_fixture["razf"]["file_on_disk"]
+    with GZipStreamReader(razf.open("rb")) as sut:
+        content = sut.read()
+    assert content == remote_repo_fixture["fasta"]["file_on_disk"].read_bytes()
+
+
+def test_stream_gzip_inflates_a_chunk_at_a_time():
+    content = b">chr1\n" + b"N" * 1000000 + b"\nACGT\n"
+    # Two members, the first one inflating to many chunks.
+    compressed = gzip.compress(content[:-5]) + gzip.compress(content[-5:])
+    sut = GZipStreamReader(io.BytesIO(compressed), chunk_size=1024)
+
+    sizes = []
+    while not sut._eof:
+        sizes.append(len(sut._inflate()))
+
+    assert max(sizes) <= 1024
+    assert GZipStreamReader(io.BytesIO(compressed), 1024).read() == content
+
+
+def test_decompress_bzip(remote_repo_fixture, tmp_path_factory):
+    fasta = remote_repo_fixture["fasta"]["file_on_disk"]
+    target = tmp_path_factory.mktemp("tmp") / "fake_genome.fasta.bz2"
+    # Two streams, like the output of pbzip2.
+    content = fasta.read_bytes()
+    target.write_bytes(bz2.compress(content[:10]) + bz2.compress(content[10:]))
+    genome: Genome = remote_repo_fixture["fasta"]["genome"]
+    sut = Decompressor()
+    output = sut.perform(genome, target)
+    assert filecmp.cmp(output, fasta)
+    assert remote_repo_fixture["fasta"]["md5"] == genome.decompressed_md5
+    with sut.stream(genome, target) as stream:
+        assert stream.read() == content
+
+
+def test_sevenzip_without_backend_raises(monkeypatch, tmp_path):
+    monkeypatch.setattr(helix.files.decompressor, "SEVENZIP_BACKENDS", [])
+    target = tmp_path / "fake_genome.7z"
+    target.write_bytes(b"7z\xbc\xaf\x27\x1c\x00\x04")
+    with pytest.raises(RuntimeError) as exc:
+        Decompressor().open_sevenzip(target)
+    assert "7-Zip" in str(exc.value)
+
+
+SEVENZIP_LISTING = """
+7-Zip 16.02 : Copyright (c) 1999-2016 Igor Pavlov : 2016-05-21
+
+Listing archive: {archive}
+
+--
+Path = {archive}
+Type = 7z
+
+----------
+"""
+
+
+def _fake_sevenzip(folder, members):
+    # A fake 7z printing a listing and the arguments it's called with.
+    listing = "".join(f"Path = {x}\nFolder = -\n\n" for x in members)
+    listing += "Path = data\nFolder = +\n\n"
+    binary = folder / "7z"
+    binary.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "if sys.argv[1] == 'l':\n"
+        f"    print({SEVENZIP_LISTING!r}.format(archive=sys.argv[3]), end='')\n"
+        f"    print({listing!r}, end='')\n"
+        "else:\n"
+        "    print(' '.join(sys.argv[1:]), end='')\n"
+    )
+    binary.chmod(0o755)
+    return str(binary)
+
+
+def test_sevenzip_binary_extracts_the_only_member(monkeypatch, tmp_path):
+    binary = _fake_sevenzip(tmp_path, ["genome.fa"])
+    monkeypatch.setattr(helix.files.decompressor, "which", lambda x: binary)
+    target = tmp_path / "fake_genome.7z"
+    with helix.files.decompressor._sevenzip_binary(target) as stream:
+        assert stream.read() == f"e -so -bd {target!s} genome.fa".encode()
+
+
+def test_sevenzip_binary_rejects_many_members(monkeypatch, tmp_path):
+    binary = _fake_sevenzip(tmp_path, ["genome.fa", "README"])
+    monkeypatch.setattr(helix.files.decompressor, "which", lambda x: binary)
+    with pytest.raises(RuntimeError) as exc:
+        helix.files.decompressor._sevenzip_binary(tmp_path / "fake_genome.7z")
+    assert "more than 1 file" in str(exc.value)
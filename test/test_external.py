@@ -0,0 +1,68 @@
+import shutil
+
+import pytest
+
+import helix.utility.external
+from helix.utility.external import External, which
+
+
+@pytest.fixture()
+def external():
+    if shutil.which("gzip") is None:
+        pytest.skip("gzip is not available")
+    return External()
+
+
+def test_binary_path_is_memoized(monkeypatch):
+    calls = []
+
+    def counting_which(name):
+        calls.append(name)
+        return f"/bin/{name}"
+
+    monkeypatch.setattr(helix.utility.external.shutil, "which", counting_which)
+    monkeypatch.setattr(helix.utility.external, "_BINARY_PATHS", {})
+    assert which("tool") == which("tool") == "/bin/tool"
+    assert calls == ["tool"]
+
+    # A different PATH may resolve to a different binary.
+    monkeypatch.setenv("PATH", "/somewhere/else")
+    which("tool")
+    assert calls == ["tool", "tool"]
+
+
+def test_missing_binary_is_looked_up_again(monkeypatch):
+    found = {}
+    monkeypatch.setattr(helix.utility.external.shutil, "which", found.get)
+    monkeypatch.setattr(helix.utility.external, "_BINARY_PATHS", {})
+    assert which("tool") is None
+
+    # Installed while helix is running.
+    found["tool"] = "/bin/tool"
+    assert which("tool") == "/bin/tool"
+
+
+def test_invocations_are_timed(external):
+    invocations = []
+    external.add_hook(invocations.append)
+
+    external.gzip(["--version"], wait=True)
+
+    assert len(invocations) == 1
+    assert invocations[0].name == "gzip"
+    assert invocations[0].returncode == 0
+    assert invocations[0].duration > 0
+
+
+def test_batch_runs_every_command_in_order(external):
+    outputs = external.run_batch(
+        [("gzip", ["--version"]), ("gzip", ["--help"])], max_workers=2
+    )
+
+    assert b"gzip" in outputs[0]
+    assert b"Usage" in outputs[1]
+
+
+def test_batch_failure_is_raised(external):
+    with pytest.raises(RuntimeError):
+        external.run_batch([("gzip", ["--version"]), ("gzip", ["--not-an-option"])])
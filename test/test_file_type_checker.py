@@ -0,0 +1,45 @@
+import bz2
+import os
+import shutil
+
+import pytest
+from helix.files.file_type_checker import FileType, FileTypeChecker, sniff
+from test.genome_fixtures import remote_repo_fixture
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("bgzip", FileType.BGZIP),
+        ("gzip", FileType.RAZF_GZIP),
+        ("razf", FileType.RAZF_GZIP),
+        ("fasta", FileType.DECOMPRESSED),
+        ("zip", FileType.ZIP),
+    ],
+)
+def test_type_does_not_depend_on_extension(
+    remote_repo_fixture, tmp_path, name, expected
+):
+    target = tmp_path / "download"
+    shutil.copy(remote_repo_fixture[name]["file_on_disk"], target)
+    assert FileTypeChecker().get_type(target) == expected
+
+
+def test_magic_numbers():
+    assert sniff(bz2.compress(b">chr1\nACGT\n")) == FileType.BZIP
+    assert sniff(b"7z\xbc\xaf\x27\x1c\x00\x04") == FileType.SEVENZIP
+    assert sniff(b"\n>chrM\nGATC\n") == FileType.DECOMPRESSED
+    assert sniff(b"@read\nACGT\n+\nIIII\n") is None
+    assert sniff(b"") is None
+
+
+def test_type_is_memoized_until_file_changes(remote_repo_fixture, tmp_path):
+    target = tmp_path / "download"
+    shutil.copy(remote_repo_fixture["fasta"]["file_on_disk"], target)
+    checker = FileTypeChecker()
+    assert checker.get_type(target) == FileType.DECOMPRESSED
+
+    stat = target.stat()
+    shutil.copy(remote_repo_fixture["bgzip"]["file_on_disk"], target)
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert checker.get_type(target) == FileType.BGZIP
@@ -0,0 +1,140 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from helix.data.sequence import Sequence
+from helix.reference.genome_catalog import GenomeCatalog
+from helix.reference.genome_metadata_loader import MetadataLoader
+from helix.reference.repository import Repository
+
+REFERENCES = [
+    {
+        "fasta_url": "https://reference_1.com/fasta.fa.gz",
+        "build": "38",
+        "source": "Fake",
+        "sequences": [
+            {"name": "chr1", "length": 248956422, "md5": "6aef897c"},
+            {"name": "chrM", "length": 16569, "md5": "c68f52674"},
+        ],
+    },
+    {
+        "fasta_url": "https://reference_2.com/fasta.fa.gz",
+        "build": "37",
+        "source": "Fake",
+        "sequences": [
+            {"name": "1", "length": 249250621, "md5": "1b22b98c"},
+            {"name": "MT", "length": 16569, "md5": "c68f52674"},
+        ],
+    },
+    {"fasta_url": "https://reference_3.com/fasta.fa.gz", "source": "Fake"},
+]
+
+
+@pytest.fixture()
+def references(tmp_path):
+    path = tmp_path.joinpath("references.json")
+    path.write_text(json.dumps(REFERENCES))
+    return path
+
+
+def test_catalog_matches_json(references, tmp_path):
+    with GenomeCatalog(references, tmp_path.joinpath("catalog")) as sut:
+        assert sut.genome_count == 3
+        assert (
+            sut.get_genomes()[1]["fasta_url"] == "https://reference_2.com/fasta.fa.gz"
+        )
+        assert "sequences" not in sut.get_genomes()[0]
+        assert [sut.get_sequence(x) for x in sut.get_sequence_range(0)] == [
+            ("chr1", 248956422, "6aef897c"),
+            ("chrM", 16569, "c68f52674"),
+        ]
+        assert sut.get_sequence_range(2) is None
+
+
+@pytest.fixture()
+def config(tmp_path):
+    tmp_path.joinpath("sources.json").write_text("[]")
+    return SimpleNamespace(
+        genomes=tmp_path,
+        metadata=tmp_path,
+        temporary=tmp_path.joinpath("temporary"),
+        shared_store="",
+    )
+
+
+@pytest.fixture()
+def reads(monkeypatch):
+    # Genomes whose sequences are read from the catalog.
+    reads = []
+    get_sequences = GenomeCatalog.get_sequences
+
+    def spy(self, genome):
+        reads.append(genome)
+        return get_sequences(self, genome)
+
+    monkeypatch.setattr(GenomeCatalog, "get_sequences", spy)
+    return reads
+
+
+def test_sequences_are_read_on_first_access(references, config, reads):
+    genomes = MetadataLoader(config).load()
+    assert [x.fasta_url for x in genomes] == [x["fasta_url"] for x in REFERENCES]
+    assert reads == []
+    assert genomes[2].sequences is None
+
+    assert [(x.name, x.length, x.md5) for x in genomes[1].sequences] == [
+        ("1", 249250621, "1b22b98c"),
+        ("MT", 16569, "c68f52674"),
+    ]
+    assert genomes[1].sequences[0].parent is genomes[1]
+    assert reads == [1]
+
+    # Sequences not read yet are saved too.
+    MetadataLoader(config).save(genomes)
+    assert json.loads(references.read_text())[0]["sequences"][1] == {
+        "name": "chrM",
+        "length": 16569,
+        "md5": "c68f52674",
+    }
+
+
+def test_only_matching_genomes_are_read(references, config, monkeypatch):
+    # Genomes whose sequences are created.
+    created = []
+
+    def spy(*args, parent):
+        created.append(parent)
+        return Sequence(*args, parent=parent)
+
+    monkeypatch.setattr("helix.data.genome.Sequence", spy)
+    sut = Repository(MetadataLoader(config), object(), object(), config)
+
+    sut.find([Sequence("1", 249250621, "1b22b98c")])
+
+    assert set(created) == {sut.genomes[1]}
+    assert sut.score([Sequence("chr1", 248956422)]) == {sut.genomes[0]: 1}
+
+
+def test_catalog_is_compiled_only_when_json_changes(references, tmp_path, monkeypatch):
+    catalog = tmp_path.joinpath("catalog")
+    with GenomeCatalog(references, catalog):
+        pass
+    compiled = catalog.stat().st_mtime_ns
+
+    # Same content, different modification time.
+    os.utime(references, ns=(compiled + 10**9, compiled + 10**9))
+    compile = GenomeCatalog.compile
+    with monkeypatch.context() as m:
+        m.setattr(GenomeCatalog, "compile", lambda x: pytest.fail("compiled"))
+        with GenomeCatalog(references, catalog) as sut:
+            assert sut.genome_count == 3
+    # The new modification time was stored in a new file.
+    assert catalog.read_bytes()[8:16] == (compiled + 10**9).to_bytes(8, "little")
+    assert GenomeCatalog.compile is compile
+
+    references.write_text(json.dumps(REFERENCES[:1]))
+    os.utime(references, ns=(compiled + 2 * 10**9, compiled + 2 * 10**9))
+    with GenomeCatalog(references, catalog) as sut:
+        assert sut.genome_count == 1
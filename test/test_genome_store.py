@@ -0,0 +1,154 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from helix.data.genome import Genome
+from helix.reference.genome_store import FOLDER_MODE, LOCK_MODE, GenomeStore
+from helix.reference.repository import Repository
+from helix.utility.external import External
+from helix.utility.file_lock import FileLock
+from helix.utility.services import SERVICES
+
+MD5 = "069c8ead795424e20e4a21fc5e368599"
+
+
+def make_genome(folder, url, content=b"BGZF"):
+    folder.mkdir(parents=True, exist_ok=True)
+    genome = Genome(url, build="38", source="Fake", parent_folder=folder)
+    genome.decompressed_md5 = MD5
+    if content is not None:
+        genome.fasta.write_bytes(content)
+        genome.gzi.write_bytes(b"GZI")
+    return genome
+
+
+@pytest.mark.parametrize("links", ["hard", "symbolic"])
+def test_published_genome_is_shared(tmp_path, links):
+    sut = GenomeStore(tmp_path / "store", links)
+    first = make_genome(tmp_path / "alice", "https://a/genome.fa")
+    with sut.lock(MD5):
+        sut.publish(first)
+
+    # Same content from a different URL, for a different user.
+    second = make_genome(tmp_path / "bob", "https://b/genome.fa", None)
+    second.decompressed_md5 = None
+    with sut.lock(MD5):
+        assert sut.link_into(second, MD5)
+
+    assert second.decompressed_md5 == MD5
+    assert second.fasta.read_bytes() == b"BGZF"
+    assert os.path.samefile(first.fasta, second.fasta)
+    assert os.path.samefile(first.gzi, second.gzi)
+    assert not second.dict.exists()
+    assert second.fasta.is_symlink() == (links == "symbolic")
+
+
+def test_duplicate_is_replaced_by_link(tmp_path):
+    sut = GenomeStore(tmp_path / "store")
+    first = make_genome(tmp_path / "alice", "https://a/genome.fa")
+    second = make_genome(tmp_path / "bob", "https://b/genome.fa")
+    sut.publish(first)
+    sut.publish(second)
+    assert os.path.samefile(first.fasta, second.fasta)
+
+
+def test_missing_genome_is_not_linked(tmp_path):
+    sut = GenomeStore(tmp_path / "store")
+    genome = make_genome(tmp_path / "alice", "https://a/genome.fa", None)
+    assert not sut.link_into(genome)
+    assert not genome.fasta.exists()
+
+
+def test_lock_is_exclusive(tmp_path):
+    path = tmp_path / "locks" / "genome.lock"
+    events = []
+
+    def hold():
+        with FileLock(path):
+            events.append("start")
+            time.sleep(0.05)
+            events.append("end")
+
+    threads = [threading.Thread(target=hold) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert events == ["start", "end"] * 3
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_store_folders_and_locks_are_group_writable(tmp_path):
+    sut = GenomeStore(tmp_path / "store")
+    genome = make_genome(tmp_path / "alice", "https://a/genome.fa")
+    umask = os.umask(0o077)
+    try:
+        with sut.lock(MD5):
+            sut.publish(genome)
+    finally:
+        os.umask(umask)
+
+    for path in [sut.root / "locks", sut.get_path(MD5, ".fa.gz").parent]:
+        assert path.stat().st_mode & 0o7777 == FOLDER_MODE
+    assert (sut.root / "locks" / f"{MD5}.lock").stat().st_mode & 0o777 == LOCK_MODE
+
+
+def test_reused_genome_keeps_the_attributes_of_its_files(tmp_path):
+    store = tmp_path / "store"
+    GenomeStore(store).publish(make_genome(tmp_path / "alice", "https://a/genome.fa"))
+    config = SimpleNamespace(
+        genomes=tmp_path / "bob", shared_store=str(store), shared_store_links="hard"
+    )
+    (tmp_path / "bob").mkdir()
+    sut = Repository(SimpleNamespace(load=lambda: []), object(), object(), config)
+    reference = make_genome(tmp_path / "catalog", "https://b/genome.fa", None)
+    reference.download_size = 4
+    reference.downloaded_md5 = reference.bgzip_md5 = "d41d8cd9"
+    reference.bgzip_sha256 = "e3b0c442"
+
+    genome, downloaded = sut._download_for_ingestion(reference)
+
+    assert downloaded is None
+    assert genome.fasta.read_bytes() == b"BGZF"
+    assert genome.download_size == 4
+    assert genome.downloaded_md5 == genome.bgzip_md5 == "d41d8cd9"
+    assert genome.bgzip_sha256 == "e3b0c442"
+    assert genome.decompressed_md5 == MD5
+
+
+def test_forced_download_forgets_the_hashes_of_the_previous_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "helix.reference.repository.Downloader.perform", lambda *args: None
+    )
+    config = SimpleNamespace(genomes=tmp_path, shared_store="")
+    sut = Repository(SimpleNamespace(load=lambda: []), object(), object(), config)
+    genome = make_genome(tmp_path, "https://a/genome.fa")
+    genome.downloaded_sha256 = genome.bgzip_sha256 = "e3b0c442"
+
+    sut._download(genome, force=True)
+
+    assert not genome.fasta.exists()
+    assert genome.downloaded_sha256 is None and genome.bgzip_sha256 is None
+    assert genome.decompressed_md5 is None
+
+
+def test_companion_files_are_built_in_one_batch(tmp_path, monkeypatch):
+    batches = []
+    external = SimpleNamespace(run_batch=batches.append)
+    monkeypatch.setattr(SERVICES, "get", {External: external}.get)
+    config = SimpleNamespace(genomes=tmp_path, shared_store="")
+    sut = Repository(SimpleNamespace(load=lambda: []), object(), object(), config)
+    genome = make_genome(tmp_path, "https://a/genome.fa")
+    genome.gzi.unlink()
+
+    sut._create_companion_files(genome)
+
+    assert batches == [
+        [
+            ("bgzip", ["-r", str(genome.fasta)]),
+            ("samtools", ["dict", str(genome.fasta), "-o", str(genome.dict)]),
+        ]
+    ]
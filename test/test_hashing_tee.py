@@ -0,0 +1,34 @@
+import hashlib
+
+from helix.files.hashing_tee import HashingTee
+
+
+def test_data_is_forwarded_and_hashed(tmp_path):
+    target = tmp_path.joinpath("out")
+    with HashingTee(target.open("wb"), sha256=True) as sut:
+        sut.write(b"foo")
+        sut.write(b"bar")
+
+    assert target.read_bytes() == b"foobar"
+    assert sut.md5 == hashlib.md5(b"foobar").hexdigest()
+    assert sut.sha256 == hashlib.sha256(b"foobar").hexdigest()
+    assert sut.size == 6
+
+
+def test_sha256_is_optional():
+    sut = HashingTee()
+    sut.write(b"foo")
+    assert sut.md5 == hashlib.md5(b"foo").hexdigest()
+    assert sut.sha256 is None
+
+
+def test_resumed_file_is_hashed_entirely(tmp_path):
+    target = tmp_path.joinpath("out")
+    target.write_bytes(b"foo")
+    with target.open("ab") as f:
+        sut = HashingTee(f).hash_file(target)
+        sut.write(b"bar")
+
+    assert target.read_bytes() == b"foobar"
+    assert sut.md5 == hashlib.md5(b"foobar").hexdigest()
+    assert sut.tell() == 6
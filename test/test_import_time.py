@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+# Cumulative import time allowed for the main modules, in seconds.
+IMPORT_TIME_BUDGET = 1.0
+
+
+def _import_time(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        fields = [x.strip() for x in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise RuntimeError(f"Import time of {module} not found")
+
+
+def test_alignment_map_file_import_is_within_budget():
+    assert _import_time("helix.alignment_map.alignment_map_file") < IMPORT_TIME_BUDGET
+
+
+def test_import_does_not_create_services():
+    code = (
+        "import helix.alignment_map.alignment_map_file as module\n"
+        "from helix.configuration import RepositoryConfig\n"
+        "from helix.reference.genome_metadata_loader import MetadataLoader\n"
+        "from helix.utility.services import SERVICES\n"
+        "services = [module.Repository, module.Samtools, module.MtDNA,\n"
+        "    MetadataLoader, RepositoryConfig]\n"
+        "print(sum(SERVICES.is_created(x) for x in services))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "0"
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from helix.reference.ingestion_scheduler import IngestionJournal, IngestionScheduler
+
+
+def test_stages_overlap_within_limits():
+    running = {"network": 0, "cpu": 0}
+    peaks = {"network": 0, "cpu": 0}
+    lock = threading.Lock()
+
+    def stage(resource):
+        def run(value):
+            with lock:
+                running[resource] += 1
+                peaks[resource] = max(peaks[resource], running[resource])
+            time.sleep(0.05)
+            with lock:
+                running[resource] -= 1
+            return value
+
+        return run
+
+    done = []
+    sut = IngestionScheduler({"network": 2, "cpu": 1})
+    start = time.perf_counter()
+    errors = sut.run(
+        list(range(6)),
+        [("network", stage("network")), ("cpu", stage("cpu"))],
+        lambda item, value: done.append(value),
+    )
+    elapsed = time.perf_counter() - start
+
+    assert errors == {}
+    assert sorted(done) == list(range(6))
+    assert peaks == {"network": 2, "cpu": 1}
+    # Sequentially it would take 6 * 2 * 0.05s.
+    assert elapsed < 0.5
+
+
+def test_failure_stops_only_its_item():
+    def fail_on_two(value):
+        if value == 2:
+            raise RuntimeError("broken")
+        return value * 10
+
+    done = []
+    sut = IngestionScheduler({"cpu": 2})
+    errors = sut.run(
+        [1, 2, 3], [("cpu", fail_on_two)], lambda item, value: done.append(value)
+    )
+
+    assert sorted(done) == [10, 30]
+    assert list(errors.keys()) == [1]
+
+
+def test_journal_ignores_truncated_entry(tmp_path):
+    sut = IngestionJournal(tmp_path / "ingestion.journal")
+    sut.record("https://a/genome.fa", {"fasta_url": "https://a/genome.fa"})
+    with sut.path.open("at") as f:
+        f.write('{"key": "https://b/genome.fa", "val')
+
+    assert list(sut.load().keys()) == ["https://a/genome.fa"]
+    sut.clear()
+    assert sut.load() == {}
@@ -0,0 +1,60 @@
+from helix.utility.intervals import IntervalSet
+
+
+def test_intervals_are_sorted_and_merged():
+    sut = IntervalSet(
+        [("chr2", 50, 60), ("chr1", 30, 40), ("chr1", 10, 20), ("chr1", 20, 25)]
+    )
+
+    assert list(sut) == [("chr2", 50, 60), ("chr1", 10, 25), ("chr1", 30, 40)]
+    assert sut.to_bed() == "chr1\t10\t25\nchr1\t30\t40\nchr2\t50\t60\n"
+    assert sut.size() == 35
+    assert sut.size("chr1") == 25
+
+
+def test_bed_comments_and_extra_columns_are_ignored():
+    sut = IntervalSet.parse_bed(
+        ["#SN\tStart\tStop\n", "track name=x\n", "chrY\t10\t20\tname\n", "\n"]
+    )
+
+    assert list(sut) == [("chrY", 10, 20)]
+
+
+def test_queries():
+    sut = IntervalSet([("chr1", 10, 20), ("chr1", 30, 40)])
+
+    assert sut.contains("chr1", 10)
+    assert not sut.contains("chr1", 20)
+    assert not sut.contains("chr2", 15)
+    assert sut.overlapping("chr1", 15, 35) == [(15, 20), (30, 35)]
+    assert sut.coverage("chr1", 0, 100) == 20
+    assert sut.coverage("chr1", 20, 30) == 0
+
+
+def test_set_operations():
+    wes = IntervalSet([("chr1", 0, 100), ("chr1", 200, 300), ("chrX", 0, 50)])
+    gaps = IntervalSet([("chr1", 50, 250), ("chr1", 280, 290), ("chr2", 0, 10)])
+
+    assert list(wes.union(gaps)) == [
+        ("chr1", 0, 300),
+        ("chrX", 0, 50),
+        ("chr2", 0, 10),
+    ]
+    assert list(wes.intersection(gaps)) == [
+        ("chr1", 50, 100),
+        ("chr1", 200, 250),
+        ("chr1", 280, 290),
+    ]
+    assert list(wes.subtract(gaps)) == [
+        ("chr1", 0, 50),
+        ("chr1", 250, 280),
+        ("chr1", 290, 300),
+        ("chrX", 0, 50),
+    ]
+    assert list(gaps.subtract(wes)) == [("chr1", 100, 200), ("chr2", 0, 10)]
+
+
+def test_sequences_can_be_renamed():
+    sut = IntervalSet([("Y", 0, 10), ("1", 5, 8)]).rename({"Y": "chrY"})
+
+    assert list(sut) == [("chrY", 0, 10), ("1", 5, 8)]
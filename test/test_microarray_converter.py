@@ -1,9 +1,13 @@
+import gzip
 from test.test_fasta import MockPath
 
 import pytest
 
 from helix.configuration import RepositoryConfig
+from helix.data.microarray_converter import MicroarrayConverterTarget
 from helix.microarray.microarray_converter import MicroarrayConverter
+from helix.microarray.raw_file import RawFile
+from helix.microarray.template_bundle import TemplateBundle
 
 # def test_every_target_has_formatter():
 #     assert all(x in TARGET_FORMATTER_MAP for x in MicroarrayConverterTarget)
@@ -70,3 +74,131 @@ def test_inexistent_head_folder_raise():
 #     sut = MicroarrayConverter(config)
 #     sut.convert(Path("foo"), MicroarrayConverterTarget.Ancestry_v1)
 #     pass
+
+
+def test_convert_joins_template_and_query(tmp_path):
+    config = RepositoryConfig()
+    config.metadata = tmp_path
+    (tmp_path / "microarray_templates").mkdir()
+    template = tmp_path / "template.txt"
+    template.write_text(
+        "# Template\n"
+        "rs1\t1\t10\n"
+        "rs2\t1\t20\n"
+        "rs3\t1\t20\n"
+        "rs4\t2\t5\n"
+        "rs5\tX\t7\n"
+        # Not sorted: the query must be searched again.
+        "rs6\t1\t15\n"
+    )
+    query = tmp_path / "kit.csv"
+    query.write_text(
+        '##{"input_format": "{id}\\t{chromosome}\\t{position}\\t{result}\\n"}\n'
+        "q6\tchr1\t15\tGG\n"
+        "q5\tchrX\t7\tTT\n"
+        "q2\tchr1\t20\tCC\n"
+        "q1\tchr1\t10\tAA\n"
+    )
+
+    output = MicroarrayConverter(config).convert(query, template)
+
+    assert output.name == "kit_template.txt.txt"
+    assert output.read_text() == (
+        "# Template\n"
+        "rs1\t1\t10\tAA\n"
+        "rs2\t1\t20\tCC\n"
+        "rs3\t1\t20\tCC\n"
+        "rs4\t2\t5\t--\n"
+        "rs5\tX\t7\tTT\n"
+        "rs6\t1\t15\tGG\n"
+    )
+
+
+# Captured at import: some tests replace gzip.open and never restore it.
+GZIP_OPEN = gzip.open
+
+
+def test_export_reads_the_query_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(gzip, "open", GZIP_OPEN)
+    config = RepositoryConfig()
+    config.metadata = tmp_path
+    templates = tmp_path / "microarray_templates"
+    templates.mkdir()
+    for target in ["TwentyThreeAndMe_v5", "FTDNA_v3"]:
+        with gzip.open(templates / f"{target}.txt.gz", "wt") as f:
+            f.write("rs1\t1\t10\nrs2\t2\t20\n")
+    query = tmp_path / "kit_CombinedKit.txt"
+    query.write_text(
+        '##{"input_format": "{id}\\t{chromosome}\\t{position}\\t{result}\\n"}\n'
+        "q1\t1\t10\tAA\n"
+    )
+    loads = []
+    load_table = RawFile.load_table
+    monkeypatch.setattr(
+        RawFile, "load_table", lambda self: loads.append(self.path) or load_table(self)
+    )
+
+    outputs = MicroarrayConverter(config).export(query, [MicroarrayConverterTarget.All])
+
+    assert loads == [query]
+    assert [x.name for x in outputs] == [
+        "kit_FTDNA_v3.csv",
+        "kit_TwentyThreeAndMe_v5.txt",
+    ]
+    assert outputs[0].read_text() == "rs1,1,10,AA\nrs2,2,20,--\n"
+    assert outputs[1].read_text() == "rs1\t1\t10\tAA\nrs2\t2\t20\t--\n"
+
+
+def test_ingested_template_is_read_from_its_bundle(tmp_path, monkeypatch):
+    monkeypatch.setattr(gzip, "open", GZIP_OPEN)
+    config = RepositoryConfig()
+    config.metadata = tmp_path
+    (tmp_path / "microarray_templates").mkdir()
+    source = tmp_path / "template.txt"
+    source.write_text("# Template\nrs2\t2\t5\nrs1\t1\t10\nrs3\tX\t7\n")
+    query = tmp_path / "kit.txt"
+    query.write_text(
+        '##{"input_format": "{id}\\t{chromosome}\\t{position}\\t{result}\\n"}\n'
+        "q1\tchr1\t10\tAA\n"
+        "q3\tchrX\t7\tTT\n"
+    )
+    converter = MicroarrayConverter(config)
+    template = converter.ingest(source)
+    bundle = tmp_path / "microarray_templates" / "template.hxt"
+    assert bundle.exists()
+    opened = []
+    open_file = RawFile.open
+    monkeypatch.setattr(
+        RawFile, "open", lambda self: opened.append(self.path) or open_file(self)
+    )
+
+    output = converter.convert(query, template)
+
+    assert opened == [query]
+    assert output.name == "kit_template.txt.gz.txt"
+    assert output.read_text() == (
+        "# Template\nrs1\t1\t10\tAA\nrs2\t2\t5\t--\nrs3\tX\t7\tTT\n"
+    )
+    with TemplateBundle(bundle) as compiled:
+        assert len(compiled) == 3
+        assert list(compiled.get_chromosomes()) == ["1", "2", "X"]
+        assert compiled._positions % 8 == 0
+
+
+@pytest.mark.parametrize("size", [0, 40, -1])
+def test_broken_bundle_falls_back_to_the_template(tmp_path, monkeypatch, size):
+    monkeypatch.setattr(gzip, "open", GZIP_OPEN)
+    config = RepositoryConfig()
+    config.metadata = tmp_path
+    (tmp_path / "microarray_templates").mkdir()
+    source = tmp_path / "template.txt"
+    source.write_text("rs1\t1\t10\nrs2\t2\t5\n")
+    converter = MicroarrayConverter(config)
+    template = converter.ingest(source)
+    # Empty, truncated in the metadata and in the strings.
+    bundle = tmp_path / "microarray_templates" / "template.hxt"
+    bundle.write_bytes(bundle.read_bytes()[0:size])
+
+    with converter.open_template(template) as opened:
+        assert not isinstance(opened, TemplateBundle)
+        assert [x[0] for x in opened] == ["rs1", "rs2"]
@@ -0,0 +1,115 @@
+import gzip
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from helix.configuration import RepositoryConfig
+from helix.data.genome import Genome
+from helix.data.microarray_converter import MicroarrayConverterTarget
+from helix.files.bgzf_writer import BGZFWriter
+from helix.microarray.microarray_generator import MicroarrayGenerator
+
+# Captured at import: some tests replace gzip.open and never restore it.
+GZIP_OPEN = gzip.open
+
+
+@pytest.fixture()
+def sequences():
+    generator = random.Random(7)
+    return {
+        name: "".join(generator.choices("ACGT", k=length))
+        for name, length in [("chr1", 200000), ("chrY", 5000)]
+    }
+
+
+@pytest.fixture()
+def reference(tmp_path, sequences):
+    genome = Genome("http://localhost/genome.fa.gz", parent_folder=tmp_path)
+    with BGZFWriter(genome.fasta, gzi=genome.gzi, fai=genome.fai) as writer:
+        for name, bases in sequences.items():
+            lines = [bases[x : x + 60] for x in range(0, len(bases), 60)]
+            writer.write(f">{name}\n".encode() + "\n".join(lines).encode() + b"\n")
+    return SimpleNamespace(ready_reference=genome)
+
+
+def test_variants_and_reference_are_combined(
+    tmp_path, monkeypatch, reference, sequences
+):
+    monkeypatch.setattr(gzip, "open", GZIP_OPEN)
+    config = RepositoryConfig()
+    config.metadata = tmp_path
+    templates = tmp_path / "microarray_templates"
+    templates.mkdir()
+    with gzip.open(templates / "TwentyThreeAndMe_v5.txt.gz", "wt") as f:
+        f.write("rs1\t1\t100\nrs2\t1\t150000\nrs3\t1\t170000\nrs4\tY\t10\n")
+    vcf = tmp_path / "sample_SNP.vcf"
+    vcf.write_text(
+        "##fileformat=VCFv4.2\n"
+        "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tsample\n"
+        "chr1\t50\t.\tA\tG\t50\tPASS\t.\tGT:PL\t0/1:1,2,3\n"
+        "chr1\t100\t.\tC\tT,G\t50\tPASS\t.\tGT:PL\t2/1:1,2,3\n"
+        "chr1\t170000\t.\tA\tAT\t50\tPASS\t.\tGT\t1/1\n"
+    )
+
+    outputs = MicroarrayGenerator(vcf, reference, config=config).do(
+        [MicroarrayConverterTarget.TwentyThreeAndMe_v5]
+    )
+
+    assert [x.name for x in outputs] == ["sample_SNP_TwentyThreeAndMe_v5.txt"]
+    expected = sequences["chr1"][150000 - 1] * 2
+    # InDels can't be represented; no variant on Y means no Y at all.
+    assert outputs[0].read_text() == (
+        "rs1\t1\t100\tGT\n"
+        f"rs2\t1\t150000\t{expected}\n"
+        "rs3\t1\t170000\t--\n"
+        "rs4\tY\t10\t--\n"
+    )
+
+
+def test_haploid_calls_are_doubled_for_ancestry(
+    tmp_path, monkeypatch, reference, sequences
+):
+    monkeypatch.setattr(gzip, "open", GZIP_OPEN)
+    config = RepositoryConfig()
+    config.metadata = tmp_path
+    templates = tmp_path / "microarray_templates"
+    templates.mkdir()
+    with gzip.open(templates / "Ancestry_v2.txt.gz", "wt") as f:
+        f.write("rs1\t1\t100\nrs2\tY\t10\nrs3\tY\t20\n")
+    vcf = tmp_path / "sample.v2_SNP.vcf"
+    vcf.write_text(
+        "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tsample\n"
+        "chr1\t100\t.\tC\tT\t50\tPASS\t.\tGT\t0/1\n"
+        "chrY\t10\t.\tA\tG\t50\tPASS\t.\tGT\t1\n"
+    )
+
+    outputs = MicroarrayGenerator(vcf, reference, config=config).do(
+        [MicroarrayConverterTarget.Ancestry_v2]
+    )
+
+    assert outputs[0].name == "sample.v2_SNP_Ancestry_v2.txt"
+    lines = outputs[0].read_text().splitlines()
+    # Ancestry swaps CT; Y:20 has the base of the reference.
+    base = sequences["chrY"][20 - 1]
+    assert lines == [
+        "rs1\t1\t100\tT\tC",
+        "rs2\tY\t10\tG\tG",
+        f"rs3\tY\t20\t{base}\t{base}",
+    ]
+
+
+def test_unsupported_targets_are_rejected_before_calling(tmp_path, reference):
+    config = RepositoryConfig()
+    config.metadata = tmp_path
+    (tmp_path / "microarray_templates").mkdir()
+    caller = SimpleNamespace(run=lambda: pytest.fail("variants were called"))
+    sut = MicroarrayGenerator(
+        tmp_path / "missing.vcf", reference, caller=caller, config=config
+    )
+
+    # No formatter, and a formatter without a template.
+    with pytest.raises(RuntimeError):
+        sut.do(
+            [MicroarrayConverterTarget.TellMeGen, MicroarrayConverterTarget.FTDNA_v3]
+        )
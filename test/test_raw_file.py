@@ -2,7 +2,7 @@ from pathlib import Path
 from test.utility import MockFile
 from unittest.mock import Mock, patch
 
-from helix.microarray.raw_file import RawEntry, RawFile
+from helix.microarray.raw_file import RawEntry, RawFile, compile_format
 
 
 def test_raw_entry():
@@ -60,3 +60,43 @@ def test_raw_entry():
 #     assert elements[1].chromosome == "X"
 #     assert elements[1].position == 123
 #     assert elements[1].result == "BB"
+
+
+def test_table_is_sorted_and_grouped(tmp_path):
+    path = tmp_path / "kit.txt"
+    path.write_text(
+        '##{"skip": 1, "input_format": "{id}\\t{chromosome}\\t{position}\\t{result}\\n"}\n'
+        "# rsid chromosome position genotype\n"
+        "header\n"
+        "rs3\tchr2\t30\tAG\n"
+        "rs2\t1\t20\tCC\n"
+        "rs1\tchr1\t10\tAA\n"
+        "rs2\t1\t20\tCC\n"
+        "rs4\tX\t5\tTT"
+    )
+
+    table = RawFile(path).load_table()
+
+    assert table.comments == ["# rsid chromosome position genotype\n"]
+    assert table.meta.file_extension == ".txt"
+    assert len(table) == 4
+    assert [name for name, _ in table] == ["1", "2", "X"]
+    assert list(table.get("1")) == [
+        ("rs1", "chr1", 10, "AA"),
+        ("rs2", "1", 20, "CC"),
+    ]
+    assert table.get("1").find(20) == range(1, 2)
+    assert len(table.get("2").find(20)) == 0
+
+
+def test_invalid_lines_are_skipped(tmp_path):
+    path = tmp_path / "kit.txt"
+    path.write_text("rs1\t1\t10\nrs2\t1\tnot a position\nrs3\n")
+    assert list(RawFile(path).load_table().get("1")) == [("rs1", "1", 10, None)]
+
+
+def test_format_with_quotes_is_matched():
+    fields, split = compile_format('"{id}","{chromosome}",{position:d},"{result}"\n')
+    assert fields == ["id", "chromosome", "position", "result"]
+    assert split('"rs1","1",10,"AA"\n') == ["rs1", "1", "10", "AA"]
+    assert split('"rs1","1",ten,"AA"\n') is None
@@ -162,3 +162,22 @@ def test_no_matches():
     )
 
     assert Reference(query_sequences).status == ReferenceStatus.Unknown
+
+
+def test_candidates_restrict_matching_genomes():
+    genome_1 = Genome("https://reference_1.com/fasta.fa", source="Fake", build="38")
+    genome_1.sequences = [Sequence("chr1", 122, "a", genome_1)]
+    genome_2 = Genome("https://reference_2.com/fasta.fa", source="Fake", build="38")
+    genome_2.sequences = [Sequence("chr1", 122, "a", genome_2)]
+
+    query_sequences = OrderedDict(
+        [
+            (
+                Sequence("chr1", 122, "a"),
+                [genome_1.sequences[0], genome_2.sequences[0]],
+            ),
+        ]
+    )
+
+    assert len(Reference(query_sequences).matching) == 2
+    assert Reference(query_sequences, candidates={genome_2}).matching == [genome_2]
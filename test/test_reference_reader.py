@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from helix.data.genome import Genome
+from helix.files.bgzf_writer import BGZFWriter
+from helix.reference.reference_reader import ReferenceReader
+
+
+@pytest.fixture()
+def sequences():
+    generator = random.Random(3)
+    return {
+        name: "".join(generator.choices("ACGT", k=length))
+        for name, length in [("chr1", 300000), ("chrM", 16569)]
+    }
+
+
+@pytest.fixture()
+def genome(tmp_path, sequences):
+    genome = Genome("http://localhost/genome.fa.gz", parent_folder=tmp_path)
+    with BGZFWriter(genome.fasta, gzi=genome.gzi, fai=genome.fai) as writer:
+        for name, bases in sequences.items():
+            lines = [bases[x : x + 60] for x in range(0, len(bases), 60)]
+            writer.write(f">{name}\n".encode() + "\n".join(lines).encode() + b"\n")
+    return genome
+
+
+def test_regions_are_fetched(genome, sequences):
+    with ReferenceReader(genome) as sut:
+        assert sut.fetch("chrM") == sequences["chrM"]
+        assert sut.fetch("chr1", 65000, 140000) == sequences["chr1"][65000:140000]
+
+
+def test_bases_are_returned_in_query_order(genome, sequences):
+    positions = random.Random(5).sample(range(300000), 2000) + [-1, 300000]
+
+    with ReferenceReader(genome) as sut:
+        bases = sut.get_bases("chr1", positions)
+
+    assert bases[:-2] == [sequences["chr1"][x] for x in positions[:-2]]
+    assert bases[-2:] == [None, None]
+
+
+def test_blocks_are_inflated_once(genome, monkeypatch):
+    inflated = []
+    with ReferenceReader(genome, cached_blocks=2) as sut:
+        get_block = sut._get_block.__func__
+        monkeypatch.setattr(
+            ReferenceReader,
+            "_get_block",
+            lambda self, block: inflated.append(block) or get_block(self, block),
+        )
+        sut.get_bases("chr1", list(range(299999, 0, -997)))
+
+    assert len(inflated) == len(set(inflated))
+
+
+def test_sequences_are_found_by_canonical_name(genome):
+    with ReferenceReader(genome) as sut:
+        assert sut.find_sequence("1") == "chr1"
+        assert sut.find_sequence("MT") == "chrM"
+        assert sut.find_sequence("chr2") is None
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from helix.configuration import RepositoryConfig
+from helix.data.sequence import Sequence
+from helix.utility.regions import Regions, RegionType
+
+
+@pytest.fixture()
+def config(tmp_path):
+    config = RepositoryConfig()
+    config.metadata = tmp_path / "metadata"
+    config.temporary = tmp_path / "temp"
+    templates = config.metadata / "bed_templates"
+    templates.mkdir(parents=True)
+    templates.joinpath("38_y_mt.csv").write_text(
+        "Y,500,900\nMT,1,16569\nY,100,200\nY,150,300\n"
+    )
+    return config
+
+
+def test_regions_are_renamed_sorted_and_merged(config):
+    sequences = [Sequence("chrY", 57227415), Sequence("chrM", 16569)]
+
+    path = Regions(config).get_path("38", RegionType.Y | RegionType.MT, sequences)
+
+    assert path.read_text() == "chrY\t100\t300\nchrY\t500\t900\nchrM\t1\t16569\n"
+
+
+def test_files_are_reused_for_the_same_naming(config):
+    sut = Regions(config)
+    first = sut.get_path("38", RegionType.Y | RegionType.MT, [Sequence("chrY", 1)])
+    second = sut.get_path("38", RegionType.Y | RegionType.MT, [Sequence("chrY", 1)])
+    other = sut.get_path("38", RegionType.Y | RegionType.MT, [Sequence("Y", 1)])
+
+    assert first == second
+    assert other != first
+    assert len(list(first.parent.iterdir())) == 2
+
+
+def test_least_recently_used_files_are_evicted(config, monkeypatch):
+    monkeypatch.setattr(Regions, "EVICTION_GRACE", 0)
+    config.regions_cache_files = 2
+    sut = Regions(config)
+    paths = [
+        sut.get_path("38", RegionType.Y | RegionType.MT, [Sequence(x, 1)])
+        for x in ["chrY", "Y", "CM000686.2"]
+    ]
+
+    assert [x.exists() for x in paths] == [False, True, True]
+
+
+def test_recently_used_files_are_not_evicted(config):
+    config.regions_cache_files = 1
+    sut = Regions(config)
+    paths = [
+        sut.get_path("38", RegionType.Y | RegionType.MT, [Sequence(x, 1)])
+        for x in ["chrY", "Y"]
+    ]
+
+    # Another process may be about to read the first one.
+    assert all(x.exists() for x in paths)
+
+
+def test_files_are_built_again_when_the_template_changes(config):
+    sut = Regions(config)
+    first = sut.get_path("38", RegionType.Y | RegionType.MT)
+    template = config.metadata / "bed_templates" / "38_y_mt.csv"
+    template.write_text("Y,100,200\n")
+    stat = template.stat()
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    second = sut.get_path("38", RegionType.Y | RegionType.MT)
+
+    assert second != first
+    assert second.read_text() == "Y\t100\t200\n"
+
+
+def test_content_does_not_need_sequences(config):
+    content = Regions(config).get_content("38", RegionType.Y | RegionType.MT)
+
+    assert content == "Y\t100\t300\nY\t500\t900\nMT\t1\t16569\n"
+    assert not config.temporary.exists()
+
+
+def test_gaps_are_excluded(config, tmp_path):
+    gaps = tmp_path / "genome_nreg.bed"
+    gaps.write_text("#SN\tStart\tStop\nchrY\t120\t180\nchrY\t400\t600\n")
+    sequences = [Sequence("chrY", 57227415), Sequence("chrM", 16569)]
+
+    content = Regions(config).get_content(
+        "38", RegionType.Y | RegionType.MT, sequences, gaps
+    )
+
+    assert content == (
+        "chrY\t100\t120\nchrY\t180\t300\nchrY\t600\t900\nchrM\t1\t16569\n"
+    )
+
+
+def test_gaps_are_renamed_to_the_input_naming(config, tmp_path):
+    # Template: Y and MT, reference: RefSeq accessions, input: GenBank.
+    gaps = tmp_path / "genome_nreg.bed"
+    gaps.write_text("NC_000024.10\t120\t180\nNC_012920.1\t0\t100\n")
+    sequences = [Sequence("CM000686.2", 57227415), Sequence("J01415.2", 16569)]
+
+    content = Regions(config).get_content(
+        "38", RegionType.Y | RegionType.MT, sequences, gaps
+    )
+
+    assert content == (
+        "CM000686.2\t100\t120\nCM000686.2\t180\t300\n"
+        "CM000686.2\t500\t900\nJ01415.2\t100\t16569\n"
+    )
+
+
+def test_gaps_are_renamed_to_the_template_naming(config, tmp_path):
+    gaps = tmp_path / "genome_nreg.bed"
+    gaps.write_text("chrY\t120\t180\n")
+
+    content = Regions(config).get_content("38", RegionType.Y | RegionType.MT, gaps=gaps)
+
+    assert content.startswith("Y\t100\t120\nY\t180\t300\n")
@@ -0,0 +1,126 @@
+import random
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from helix.configuration import RepositoryConfig
+from helix.data.genome import Genome
+from helix.files.bgzf_writer import BGZFWriter
+from helix.reference.remote_reference import RemoteReference
+
+
+class RangeFileHandler(SimpleHTTPRequestHandler):
+    """HTTP server stand-in serving a folder and honouring Range headers."""
+
+    requested_ranges = []
+    ignore_ranges = False
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        if header is None or RangeFileHandler.ignore_ranges:
+            return super().do_GET()
+        path = Path(self.translate_path(self.path))
+        content = path.read_bytes()
+        start, end = header.removeprefix("bytes=").split("-")
+        start, end = int(start), min(int(end), len(content) - 1)
+        RangeFileHandler.requested_ranges.append((start, end))
+        body = content[start : end + 1]
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def sequences():
+    generator = random.Random(42)
+    return {
+        name: "".join(generator.choices("ACGT", k=length))
+        for name, length in [("chr1", 300000), ("chrM", 16569), ("chrY", 5000)]
+    }
+
+
+@pytest.fixture()
+def remote_genome(tmp_path, sequences):
+    served = tmp_path.joinpath("served")
+    served.mkdir()
+    fasta = served.joinpath("genome.fa.gz")
+    with BGZFWriter(
+        fasta, gzi=Path(str(fasta) + ".gzi"), fai=Path(str(fasta) + ".fai")
+    ) as writer:
+        for name, bases in sequences.items():
+            lines = [bases[x : x + 60] for x in range(0, len(bases), 60)]
+            writer.write(f">{name}\n".encode() + "\n".join(lines).encode() + b"\n")
+
+    RangeFileHandler.requested_ranges = []
+    RangeFileHandler.ignore_ranges = False
+    handler = partial(RangeFileHandler, directory=str(served))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/genome.fa.gz"
+    yield Genome(url, fai_url=url + ".fai", gzi_url=url + ".gzi", build="38")
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def config(tmp_path):
+    cfg = RepositoryConfig()
+    cfg.temporary = tmp_path.joinpath("temp")
+    return cfg
+
+
+def test_regions_are_fetched(remote_genome, config, sequences):
+    with RemoteReference(remote_genome, config) as sut:
+        assert sut.fetch("chrM") == sequences["chrM"]
+        assert sut.fetch("chr1", 100000, 100500) == sequences["chr1"][100000:100500]
+        assert sut.fetch("chrY", 4990, 6000) == sequences["chrY"][4990:]
+
+
+def test_only_needed_blocks_are_downloaded(remote_genome, config, sequences):
+    with RemoteReference(remote_genome, config) as sut:
+        sut.fetch("chrM")
+
+    downloaded = sum(x[1] - x[0] + 1 for x in RangeFileHandler.requested_ranges)
+    assert downloaded < 2 * 65536
+
+
+def test_cached_blocks_are_not_downloaded_again(remote_genome, config, sequences):
+    with RemoteReference(remote_genome, config) as sut:
+        sut.fetch("chr1", 0, 1000)
+    requests = len(RangeFileHandler.requested_ranges)
+
+    with RemoteReference(remote_genome, config) as sut:
+        assert sut.fetch("chr1", 0, 1000) == sequences["chr1"][0:1000]
+    assert len(RangeFileHandler.requested_ranges) == requests
+
+
+def test_only_recently_used_blocks_are_kept(remote_genome, config, sequences):
+    config.remote_cache_blocks = 2
+    with RemoteReference(remote_genome, config) as sut:
+        for start in [0, 100000, 200000]:
+            assert sut.fetch("chr1", start, start + 10) == (
+                sequences["chr1"][start : start + 10]
+            )
+        blocks = list(sut.folder.joinpath("blocks").iterdir())
+
+    assert len(blocks) == 2
+
+
+def test_ignored_ranges_are_rejected(remote_genome, config):
+    with RemoteReference(remote_genome, config) as sut:
+        sut.sequences
+        RangeFileHandler.ignore_ranges = True
+
+        with pytest.raises(RuntimeError):
+            sut.fetch("chrM")
+
+        assert list(sut.folder.joinpath("blocks").iterdir()) == []
@@ -0,0 +1,88 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from helix.files.segmented_download import SegmentedDownload, SegmentedDownloadError
+
+CONTENT = bytes(range(256)) * 40
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """Minimal HTTP server stand-in that serves CONTENT honouring Range headers."""
+
+    support_ranges = True
+    requested_ranges = []
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        if header is None or not self.support_ranges:
+            self.send_response(200)
+            body = CONTENT
+        else:
+            start, end = header.removeprefix("bytes=").split("-")
+            start, end = int(start), int(end)
+            RangeRequestHandler.requested_ranges.append((start, end))
+            body = CONTENT[start : end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def http_server():
+    RangeRequestHandler.support_ranges = True
+    RangeRequestHandler.requested_ranges = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/genome.fa.gz"
+    server.shutdown()
+    server.server_close()
+
+
+def test_segmented_download_matches(http_server, tmp_path):
+    target = tmp_path.joinpath("genome")
+    sut = SegmentedDownload(http_server, target, len(CONTENT), 4, 1000)
+    sut.perform()
+
+    assert target.read_bytes() == CONTENT
+    assert len(RangeRequestHandler.requested_ranges) == 11
+    assert not sut.manifest.exists()
+
+
+def test_only_missing_segments_are_resumed(http_server, tmp_path):
+    target = tmp_path.joinpath("genome")
+    partial = bytearray(len(CONTENT))
+    partial[0:2000] = CONTENT[0:2000]
+    target.write_bytes(partial)
+    manifest = SegmentedDownload.manifest_path(target)
+    manifest.write_text(
+        json.dumps(
+            {
+                "url": http_server,
+                "size": len(CONTENT),
+                "segment_size": 1000,
+                "completed": [0, 1],
+            }
+        )
+    )
+
+    SegmentedDownload(http_server, target, len(CONTENT), 2, 1000).perform()
+
+    assert target.read_bytes() == CONTENT
+    assert min(x[0] for x in RangeRequestHandler.requested_ranges) == 2000
+
+
+def test_range_not_supported_raise(http_server, tmp_path):
+    RangeRequestHandler.support_ranges = False
+    target = tmp_path.joinpath("genome")
+    with pytest.raises(SegmentedDownloadError) as e:
+        SegmentedDownload(http_server, target, len(CONTENT), 4, 1000).perform()
+    assert "not supported" in str(e.value)
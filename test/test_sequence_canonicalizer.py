@@ -76,3 +76,23 @@ def test_convert_to_accession():
 def test_lookup_values_uniqueness():
     for table in ACCESSION_TO_NUMBER:
         assert len(set(x for x in table.values())) == len(table)
+
+
+def test_accession_keys_are_not_prefixes_of_each_other():
+    # The prefix trie stops at the first key it finds.
+    keys = [x for table in ACCESSION_TO_NUMBER for x in table]
+    assert not any(x != y and y.startswith(x) for x in keys for y in keys)
+
+
+def test_versioned_accessions_are_canonicalized():
+    assert Converter.canonicalize("NC_000001.11") == "1"
+    assert Converter.canonicalize("NC_060948.1") == "Y"
+    assert Converter.canonicalize("CM000685.2") == "X"
+    assert Converter.canonicalize("CP068255.2") == "X"
+    assert Converter.canonicalize("NC_999999.1") == "NC_999999.1"
+
+
+def test_canonicalize_many_keeps_order():
+    names = ["chrX", "NC_000001.11", "chrX", "chrUn_KI270302v1"]
+
+    assert Converter.canonicalize_many(names) == ["X", "1", "X", "UN_KI270302V1"]
@@ -0,0 +1,32 @@
+from helix.utility.services import ServiceRegistry
+
+
+class Service:
+    created = 0
+
+    def __init__(self, value: int = 1) -> None:
+        Service.created += 1
+        self.value = value
+
+
+def test_service_is_created_once_on_first_use():
+    Service.created = 0
+    sut = ServiceRegistry()
+    assert not sut.is_created(Service)
+
+    assert sut.get(Service) is sut.get(Service)
+    assert Service.created == 1
+
+
+def test_explicit_instance_wins():
+    sut = ServiceRegistry()
+    instance = Service(2)
+    assert sut.resolve(instance, Service) is instance
+    assert not sut.is_created(Service)
+
+
+def test_registered_factory_is_used():
+    sut = ServiceRegistry()
+    sut.get(Service)
+    sut.register(Service, lambda: Service(3))
+    assert sut.get(Service).value == 3
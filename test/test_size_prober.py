@@ -0,0 +1,86 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from helix.files.size_prober import SizeProber, UrlMetadataCache
+
+FILES = {"/genome.fa.gz": 1000, "/genome.fa.gz.fai": 10}
+# Paths answered with an error status instead of the file.
+ERRORS = {"/busy.fa.gz": 503, "/limited.fa.gz": 429, "/gone.fa.gz": 410}
+
+
+class HeadRequestHandler(BaseHTTPRequestHandler):
+    """Minimal HTTP server stand-in that answers HEAD requests."""
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_HEAD(self):
+        HeadRequestHandler.requests.append(self.path)
+        if self.path in ERRORS:
+            self.send_response(ERRORS[self.path])
+            self.send_header("Content-Length", "0")
+        elif self.path not in FILES:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+        else:
+            self.send_response(200)
+            self.send_header("Content-Length", str(FILES[self.path]))
+            self.send_header("ETag", f'"{self.path}"')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def http_server():
+    HeadRequestHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HeadRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/genome.fa.gz"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sizes_are_probed(http_server):
+    urls = [http_server, http_server + ".fai", http_server + ".gzi"]
+    sizes = SizeProber(connections=2).probe(urls)
+
+    assert sizes == {http_server: 1000, http_server + ".fai": 10, urls[2]: None}
+
+
+def test_cache_avoids_probing_again(http_server, tmp_path):
+    urls = [http_server, http_server + ".gzi"]
+    cache_path = tmp_path.joinpath("cache.json")
+    SizeProber(UrlMetadataCache(cache_path)).probe(urls)
+    requests = len(HeadRequestHandler.requests)
+
+    sizes = SizeProber(UrlMetadataCache(cache_path)).probe(urls)
+
+    assert len(HeadRequestHandler.requests) == requests
+    assert sizes == {http_server: 1000, http_server + ".gzi": None}
+    assert UrlMetadataCache(cache_path).get(http_server)["etag"] == '"/genome.fa.gz"'
+
+
+def test_expired_entries_are_probed_again(http_server, tmp_path):
+    cache_path = tmp_path.joinpath("cache.json")
+    SizeProber(UrlMetadataCache(cache_path)).probe([http_server])
+
+    SizeProber(UrlMetadataCache(cache_path, ttl=0)).probe([http_server])
+
+    assert HeadRequestHandler.requests == ["/genome.fa.gz", "/genome.fa.gz"]
+
+
+def test_only_definitive_answers_are_cached(http_server, tmp_path):
+    root = http_server.removesuffix("/genome.fa.gz")
+    urls = [root + x for x in ["/busy.fa.gz", "/limited.fa.gz", "/gone.fa.gz"]]
+    cache_path = tmp_path.joinpath("cache.json")
+
+    sizes = SizeProber(UrlMetadataCache(cache_path)).probe(urls)
+
+    cache = UrlMetadataCache(cache_path)
+    assert sizes == {x: None for x in urls}
+    assert [x in cache for x in urls] == [False, False, True]
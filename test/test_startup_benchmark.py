@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BASELINE = Path(__file__).parent.joinpath("data", "startup_baseline.json")
+
+
+# Wall-clock times depend on the machine: only run where the baseline was
+# measured, with HELIX_BENCHMARK=1.
+@pytest.mark.skipif(
+    os.environ.get("HELIX_BENCHMARK") != "1", reason="set HELIX_BENCHMARK=1"
+)
+def test_cold_start_is_within_baseline(tmp_path):
+    pytest.importorskip("PySide6")
+    report = tmp_path.joinpath("startup.json")
+    environment = {**os.environ, "QT_QPA_PLATFORM": "offscreen"}
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "helix.main",
+            "--profile-startup",
+            str(report),
+            "--exit-after-startup",
+        ],
+        env=environment,
+        timeout=120,
+        check=True,
+    )
+
+    baseline = json.loads(BASELINE.read_text())
+    measured = json.loads(report.read_text())
+    tolerance = baseline["tolerance"]
+    first_window = measured["milestones"]["first_window"]
+    assert first_window <= baseline["first_window"] * tolerance
+    assert measured["imports"]["total"] <= baseline["imports"] * tolerance
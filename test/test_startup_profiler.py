@@ -0,0 +1,55 @@
+import json
+import sys
+
+from helix.utility.startup_profiler import StartupProfiler
+
+
+def test_imports_are_timed(tmp_path, monkeypatch):
+    tmp_path.joinpath("profiled_outer.py").write_text("import profiled_inner\n")
+    tmp_path.joinpath("profiled_inner.py").write_text("import time\ntime.sleep(0.05)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    sut = StartupProfiler(tmp_path.joinpath("report.json"))
+    sut.start()
+    try:
+        import profiled_outer  # noqa: F401
+    finally:
+        sut.stop()
+        sys.modules.pop("profiled_outer", None)
+        sys.modules.pop("profiled_inner", None)
+
+    outer = sut.modules["profiled_outer"]
+    inner = sut.modules["profiled_inner"]
+    assert inner["cumulative"] >= 0.05
+    assert outer["cumulative"] >= inner["cumulative"]
+    assert outer["self"] < inner["self"]
+    assert StartupProfiler.active is None
+
+
+def test_report_is_saved(tmp_path):
+    sut = StartupProfiler(tmp_path.joinpath("report.json"))
+    with sut.phase("prerequisites"):
+        sut.record_probe("samtools", 0.5)
+    sut.mark("first_window")
+    sut.save()
+
+    report = json.loads(tmp_path.joinpath("report.json").read_text())
+    assert report["probes"] == {"samtools": 0.5}
+    assert "prerequisites" in report["phases"]
+    assert "first_window" in report["milestones"]
+    assert "modules" in report["imports"]
+
+
+def test_profiler_is_enabled_by_argument_or_environment(tmp_path, monkeypatch):
+    monkeypatch.delenv(StartupProfiler.ENVIRONMENT_VARIABLE, raising=False)
+    assert StartupProfiler.from_arguments(["helix"]) is None
+
+    report = tmp_path.joinpath("report.json")
+    sut = StartupProfiler.from_arguments(["helix", "--profile-startup", str(report)])
+    sut.stop()
+    assert sut.report == report
+
+    monkeypatch.setenv(StartupProfiler.ENVIRONMENT_VARIABLE, str(report))
+    sut = StartupProfiler.from_arguments(["helix"])
+    sut.stop()
+    assert sut.report == report